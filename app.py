@@ -1,13 +1,17 @@
 import logging
 import os
 
+import click
 from flask import Flask, jsonify, redirect, render_template, request, url_for
-from flask_login import LoginManager, current_user
+from flask_login import LoginManager, current_user, user_logged_out
 from flask_talisman import Talisman
 
 from config import Config
 from models import User, db
+from models.migrations import run_migrations, schema_lock
+from models.sqlite_tuning import apply_sqlite_pragmas
 from services.exam_service import ExamService
+from services.user_cache import UserCache
 
 # Create Flask app
 app = Flask(__name__)
@@ -31,6 +35,9 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 
+# Logged-in users' rows, so authenticated requests do not each query them
+user_cache = UserCache(app.config['USER_CACHE_TTL']) if app.config['USER_CACHE_TTL'] > 0 else None
+
 # Initialize exam service
 exam_service = ExamService(app.config['EXAMS_FILE'])
 app.config['EXAM_SERVICE'] = exam_service
@@ -97,7 +104,15 @@ def unauthorized():
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    if user_cache is not None:
+        return user_cache.get(int(user_id))
+    return db.session.get(User, int(user_id))
+
+
+@user_logged_out.connect_via(app)
+def forget_logged_out_user(sender, user):
+    if user_cache is not None:
+        user_cache.invalidate(user.id)
 
 
 @app.context_processor
@@ -121,7 +136,14 @@ if not os.path.exists(app.config['TEMP_CODE_DIR']):
 # Import and register blueprints
 from routes.auth import auth_bp
 from routes.exam import exam_bp
-from routes.practice import practice_bp
+from routes.practice import (
+    attempt_writer,
+    compiler_service,
+    grader_service,
+    grading_queue,
+    practice_bp,
+    question_loader,
+)
 from routes.progress import progress_bp
 
 app.register_blueprint(auth_bp)
@@ -129,6 +151,9 @@ app.register_blueprint(practice_bp)
 app.register_blueprint(progress_bp)
 app.register_blueprint(exam_bp)
 
+if attempt_writer is not None:
+    attempt_writer.init_app(app)
+
 
 @app.route('/')
 def index():
@@ -156,6 +181,18 @@ def readyz():
         return jsonify({'status': 'unavailable', 'error': str(exc)}), 503
 
 
+@app.route('/metrics')
+def metrics():
+    """Operational counters (compile cache, ...) for capacity planning."""
+    return jsonify({
+        'compiler': compiler_service.stats(),
+        'grading': {'pending': grading_queue.pending()},
+        'questions': question_loader.stats(),
+        'users': user_cache.stats() if user_cache is not None else None,
+        'write_behind': attempt_writer.stats() if attempt_writer is not None else None,
+    }), 200
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     if request.accept_mimetypes.accept_json:
@@ -173,28 +210,88 @@ def internal_error(error):
 
 # Create database tables and run migrations
 with app.app_context():
-    db.create_all()
-
-    # Auto-migrate: add exam_id column to existing tables if missing
-    from sqlalchemy import inspect, text
-    inspector = inspect(db.engine)
-
-    for table_name in ['attempts', 'progress']:
-        columns = [col['name'] for col in inspector.get_columns(table_name)]
-        if 'exam_id' not in columns:
-            logger.info('Migrating %s: adding exam_id column...', table_name)
-            db.session.execute(text(
-                f"ALTER TABLE {table_name} ADD COLUMN exam_id VARCHAR(50) NOT NULL DEFAULT 'c_programming'"
-            ))
-            db.session.commit()
-            logger.info('  -> %s.exam_id added (existing rows default to c_programming)', table_name)
-
-    # Update unique constraint on progress table if needed
-    # SQLite doesn't support ALTER CONSTRAINT, but the new constraint will apply to new rows
-    # Existing rows already have unique (user_id, category) which is a subset of (user_id, category, exam_id)
+    apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+    with schema_lock(db.engine):
+        db.create_all()
+
+        # Bring existing databases up to the current schema
+        run_migrations(db.engine)
+
+    # Write attempts journaled by processes that died before flushing them
+    if attempt_writer is not None:
+        attempt_writer.recover()
 
     logger.info('Database initialized.')
 
+@app.cli.command('backfill-streaks')
+def backfill_streaks():
+    """Recompute every user's practice streaks from their attempt history."""
+    from models import Attempt
+    from services.streaks import StreakService
+
+    pairs = db.session.query(Attempt.user_id, Attempt.exam_id).distinct().all()
+    for user_id, exam_id in pairs:
+        StreakService(user_id, exam_id).rebuild()
+    db.session.commit()
+    print(f'Rebuilt streaks for {len(pairs)} user/exam pair(s).')
+
+
+@app.cli.command('rebuild-summaries')
+@click.option('--check', is_flag=True, help='Only report summaries that disagree with the attempt history.')
+def rebuild_summaries(check):
+    """Recompute every dashboard summary (and streak) from the attempt history."""
+    from models import Attempt
+    from services.dashboard_summary import DashboardSummaryService
+
+    pairs = db.session.query(Attempt.user_id, Attempt.exam_id).distinct().all()
+    stale = [pair for pair in pairs if DashboardSummaryService(*pair).rebuild()]
+    if check:
+        db.session.rollback()
+        for user_id, exam_id in stale:
+            print(f'Out of date: user {user_id}, exam {exam_id}')
+        print(f'{len(stale)} of {len(pairs)} summaries out of date.')
+        if stale:
+            raise SystemExit(1)
+        return
+    db.session.commit()
+    print(f'Rebuilt {len(pairs)} summaries ({len(stale)} were out of date).')
+
+
+@app.cli.command('backfill-reviews')
+def backfill_reviews():
+    """Recompute every user's spaced-repetition reviews from their attempt history."""
+    from models import Attempt
+    from services.reviews import ReviewService
+
+    pairs = db.session.query(Attempt.user_id, Attempt.exam_id).distinct().all()
+    reviewed = sum(ReviewService(*pair).rebuild() for pair in pairs)
+    db.session.commit()
+    print(f'Rebuilt {reviewed} question review(s) for {len(pairs)} user/exam pair(s).')
+
+
+@app.cli.command('calibrate-difficulty')
+@click.option('--exam', 'exam_ids', multiple=True, help='Exam to calibrate (repeatable); default: every exam.')
+@click.option('--chunk-size', default=20_000, show_default=True, help='Attempts read and processed at a time.')
+@click.option('--iterations', default=30, show_default=True, help='Upper bound on fitting passes.')
+def calibrate_difficulty(exam_ids, chunk_size, iterations):
+    """Fit per-question difficulties from the attempt history (needs requirements-calibration.txt)."""
+    from services.calibration import calibrate
+
+    calibrated = calibrate(list(exam_ids) or None, chunk_size=chunk_size, iterations=iterations)
+    for exam_id, count in calibrated.items():
+        print(f'{exam_id}: calibrated {count} question(s).')
+
+
+# Parse the question corpus up front. Under gunicorn with preload_app this runs
+# once in the master and the forked workers share the pages copy-on-write. The
+# templates' #include preludes are precompiled here too; submissions only reuse them.
+if app.config['PRELOAD_QUESTIONS']:
+    for _exam in exam_service.get_all_exams():
+        _by_category = question_loader.load_all_questions(
+            exam_id=_exam['id'], categories=exam_service.get_category_ids_for_exam(_exam['id'])
+        )
+        grader_service.prepare_templates(q for questions in _by_category.values() for q in questions)
+
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', '8000'))
@@ -11,25 +11,144 @@ BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_DEV_SECRET = 'dev-secret-key'
 
 
+# PRAGMAs run on every new SQLite connection, by SQLITE_PROFILE. "default"
+# leaves SQLite's own settings; on a single-CPU host "production" measured the
+# same submit throughput (scripts/bench_sqlite_submit.py), so it is opt-in. It
+# uses WAL so readers never block the writer (and vice versa), waits for the
+# write lock instead of failing with "database is locked", and trades the
+# fsync per commit for one per checkpoint (synchronous=NORMAL is durable
+# against application crashes, and consistent after power loss, in WAL mode).
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # KiB
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def _database_uri(raw: str) -> str:
+    """Pin PostgreSQL URLs to the psycopg 3 driver (``postgres://`` is what most hosts hand out)."""
+    for prefix in ('postgres://', 'postgresql://'):
+        if raw.startswith(prefix):
+            return 'postgresql+psycopg://' + raw[len(prefix):]
+    return raw
+
+
+def _engine_options(database_uri: str, pool_size: int, max_connections: int, web_workers: int,
+                    pool_recycle: int) -> dict:
+    """SQLAlchemy engine options for the configured backend (in-memory SQLite uses Flask-SQLAlchemy's defaults)."""
+    if database_uri.startswith('postgresql'):
+        # Every gunicorn worker has its own pool; together they must stay
+        # within the connections the server grants this app
+        per_worker = max(max_connections // max(web_workers, 1), 1)
+        return {
+            'pool_size': min(pool_size, per_worker),
+            'max_overflow': max(per_worker - pool_size, 0),
+            'pool_timeout': 10,
+            # Replace connections dropped by the server, a proxy or a failover
+            'pool_pre_ping': True,
+            'pool_recycle': pool_recycle,
+        }
+    if not database_uri.startswith('sqlite') or ':memory:' in database_uri:
+        return {}
+    return {
+        # Keep connections (and their per-connection pragmas and page cache) open
+        'pool_size': pool_size,
+        'max_overflow': pool_size,
+        'pool_timeout': 10,
+    }
+
+
 class ConfigError(RuntimeError):
     """Raised when required configuration is missing or unsafe in production."""
 
 
+# Backends the atomic upserts (models/upsert.py) are written for
+SUPPORTED_DATABASES = ('sqlite', 'postgresql')
+
+
 class Config:
     """Application configuration"""
 
     SECRET_KEY = os.getenv('FLASK_SECRET_KEY', DEFAULT_DEV_SECRET)
-    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', f'sqlite:///{BASE_DIR / "instance" / "practice.db"}')
+    SQLALCHEMY_DATABASE_URI = _database_uri(
+        os.getenv('DATABASE_URL', f'sqlite:///{BASE_DIR / "instance" / "practice.db"}')
+    )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Seconds a worker may reuse a logged-in user's row without querying it; 0 disables
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '60'))
+    SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'default')
+    SQLITE_PRAGMAS = SQLITE_PROFILES.get(SQLITE_PROFILE, {})  # an unknown name fails in validate()
 
     # Code execution settings
     MAX_CODE_EXECUTION_TIME = int(os.getenv('MAX_CODE_EXECUTION_TIME', '3'))
     MAX_MEMORY_MB = int(os.getenv('MAX_MEMORY_MB', '50'))
 
+    # On-disk cache of compiled binaries shared by all workers; 0 disables it
+    COMPILE_CACHE_DIR = os.getenv('COMPILE_CACHE_DIR', str(BASE_DIR / 'temp' / 'compile_cache'))
+    COMPILE_CACHE_MAX_MB = int(os.getenv('COMPILE_CACHE_MAX_MB', '256'))
+
+    # Buffer attempts in a local journal and write them to the database in batches
+    WRITE_BEHIND = os.getenv('WRITE_BEHIND', 'false').lower() == 'true'
+    WRITE_BEHIND_DIR = os.getenv('WRITE_BEHIND_DIR', str(BASE_DIR / 'instance' / 'journal'))
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '50'))
+    WRITE_BEHIND_FLUSH_MS = int(os.getenv('WRITE_BEHIND_FLUSH_MS', '200'))
+    # Attempts rejected by the database this many times go to the journal's dead-letter file
+    WRITE_BEHIND_MAX_FAILURES = int(os.getenv('WRITE_BEHIND_MAX_FAILURES', '3'))
+
+    # Where practice run state lives; the session cookie only carries the run's id.
+    # 'database' (practice_sessions.state) or 'file' (one JSON file per run, single host)
+    PRACTICE_STORE = os.getenv('PRACTICE_STORE', 'database')
+    PRACTICE_STORE_DIR = os.getenv('PRACTICE_STORE_DIR', str(BASE_DIR / 'instance' / 'practice_sessions'))
+
+    # Precompiled headers for the #include prelude of question templates; empty disables it
+    PCH_DIR = os.getenv('PCH_DIR', str(BASE_DIR / 'temp' / 'pch'))
+    PCH_MAX_MB = int(os.getenv('PCH_MAX_MB', '64'))
+
+    # Pre-started sandbox processes that run gcc and student programs; 0 runs them in-process
+    SANDBOX_POOL_SIZE = int(os.getenv('SANDBOX_POOL_SIZE', '0'))
+    SANDBOX_QUEUE_DEPTH = int(os.getenv('SANDBOX_QUEUE_DEPTH', '16'))
+    SANDBOX_SCRATCH_DIR = os.getenv('SANDBOX_SCRATCH_DIR', str(BASE_DIR / 'temp' / 'sandbox'))
+
+    # Host-wide cap on concurrent gcc processes (shared by all workers); 0 disables it
+    COMPILER_MAX_CONCURRENT = int(os.getenv('COMPILER_MAX_CONCURRENT', str(os.cpu_count() or 2)))
+    COMPILER_MAX_WAITING = int(os.getenv('COMPILER_MAX_WAITING', str(2 * (os.cpu_count() or 2))))
+    COMPILER_MAX_WAIT_SECONDS = float(os.getenv('COMPILER_MAX_WAIT_SECONDS', '5'))
+    COMPILER_LOCK_DIR = os.getenv('COMPILER_LOCK_DIR', str(BASE_DIR / 'temp' / 'admission'))
+
+    # Grade code questions on background threads and let the client poll for the result
+    ASYNC_GRADING = os.getenv('ASYNC_GRADING', 'true').lower() == 'true'
+    GRADING_WORKERS = int(os.getenv('GRADING_WORKERS', '4'))
+    # A job still queued/running this long after submission is reported failed
+    # (its worker died); finished jobs are deleted after GRADING_JOB_RETENTION_SECONDS
+    GRADING_JOB_STALE_SECONDS = int(os.getenv('GRADING_JOB_STALE_SECONDS', '300'))
+    GRADING_JOB_RETENTION_SECONDS = int(os.getenv('GRADING_JOB_RETENTION_SECONDS', '3600'))
+
+    # Database connection pools. Each gunicorn worker (WEB_CONCURRENCY, also
+    # read by gunicorn.conf.py) keeps one connection per thread that uses the
+    # database: the request thread, the grading threads and the write-behind
+    # flusher. On PostgreSQL the workers together never open more than
+    # DB_MAX_CONNECTIONS.
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '1'))
+    DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', '90'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(
+        SQLALCHEMY_DATABASE_URI, GRADING_WORKERS + 2, DB_MAX_CONNECTIONS, WEB_CONCURRENCY, DB_POOL_RECYCLE
+    )
+
     # Resolve to repo-relative paths so the app is independent of CWD
     TEMP_CODE_DIR = str(BASE_DIR / 'temp')
     QUESTIONS_DIR = str(BASE_DIR / 'questions')
+    # Precompiled question bundles (scripts/validate_questions.py --bundle-dir); empty disables
+    QUESTION_BUNDLE_DIR = os.getenv('QUESTION_BUNDLE_DIR', str(BASE_DIR / 'build' / 'question_bundles'))
     EXAMS_FILE = str(BASE_DIR / 'exams.json')
+    # Load every exam's questions at import time (in the gunicorn master with preload_app)
+    PRELOAD_QUESTIONS = os.getenv('PRELOAD_QUESTIONS', 'true').lower() == 'true'
 
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     TESTING = False
@@ -55,3 +174,14 @@ class Config:
                 "Refusing to start: FLASK_SECRET_KEY is the default dev value "
                 "while DEBUG=False. Set FLASK_SECRET_KEY in the environment."
             )
+        backend = cls.SQLALCHEMY_DATABASE_URI.split(':', 1)[0].split('+', 1)[0]
+        if backend not in SUPPORTED_DATABASES:
+            raise ConfigError(
+                f"Refusing to start: DATABASE_URL uses {backend!r}; "
+                f"supported databases are {', '.join(SUPPORTED_DATABASES)}."
+            )
+        if cls.SQLITE_PROFILE not in SQLITE_PROFILES:
+            raise ConfigError(
+                f"Refusing to start: SQLITE_PROFILE is {cls.SQLITE_PROFILE!r}; "
+                f"choose one of {', '.join(SQLITE_PROFILES)}."
+            )
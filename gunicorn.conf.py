@@ -0,0 +1,34 @@
+"""Gunicorn settings, picked up automatically when gunicorn starts in the repo root.
+
+With ``preload_app`` the app (and with it the question corpus, see
+``PRELOAD_QUESTIONS``) is imported once in the master, so every worker
+shares those pages copy-on-write instead of holding its own parsed copy.
+Set ``GUNICORN_PRELOAD=false`` to import the app in each worker instead
+(e.g. for ``--reload`` during development).
+"""
+
+import gc
+import os
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+# Also read by config.py to split DB_MAX_CONNECTIONS between the workers
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        # Move everything loaded so far into the permanent generation: the
+        # workers' cyclic GC then never writes to (and so never copies) the
+        # shared pages. Refcount updates on objects a request touches still do.
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        # Connections opened by the master during startup must not be reused
+        # by several processes; drop them without closing the parent's sockets.
+        from app import app
+        from models import db
+
+        with app.app_context():
+            db.engine.dispose(close=False)
@@ -37,6 +37,17 @@ class Attempt(db.Model):
     submitted_answer = db.Column(db.Text)
     hints_used = db.Column(db.Integer, default=0)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    journal_id = db.Column(db.String(32))  # set for attempts written via the write-behind journal
+    session_id = db.Column(db.String(32), db.ForeignKey('practice_sessions.id'))  # NULL outside a practice session
+
+    __table_args__ = (
+        # Dashboard, stats and streak queries: one user's attempts in one exam, by time
+        db.Index('ix_attempts_user_exam_timestamp', 'user_id', 'exam_id', 'timestamp'),
+        # Replaying a journal must not write the same attempt twice
+        db.Index('ix_attempts_journal_id', 'journal_id', unique=True),
+        # Session summary: the attempts of one practice session
+        db.Index('ix_attempts_session_timestamp', 'session_id', 'timestamp'),
+    )
 
     def __repr__(self):
         return f'<Attempt {self.question_id} by User {self.user_id}>'
@@ -56,6 +67,7 @@ class Progress(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'category', 'exam_id', name='unique_user_category_exam'),
+        db.Index('ix_progress_user_exam', 'user_id', 'exam_id'),
     )
 
     @property
@@ -67,3 +79,109 @@ class Progress(db.Model):
 
     def __repr__(self):
         return f'<Progress User {self.user_id} - {self.exam_id}/{self.category}: {self.accuracy}%>'
+
+
+class UserExamStats(db.Model):
+    """Per-user, per-exam summary maintained as attempts are recorded"""
+    __tablename__ = 'user_exam_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    exam_id = db.Column(db.String(50), nullable=False)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)  # consecutive days ending last_active_day
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_active_day = db.Column(db.Date)  # UTC day of the latest attempt
+    # Dashboard summary (services/dashboard_summary.py), folded in as attempts are recorded
+    total_attempted = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_correct = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    category_progress = db.Column(db.Text)  # JSON {category: {attempted, correct, last_practiced}}; NULL until summarized
+    recent_attempts = db.Column(db.Text)  # JSON list of the latest attempts, newest first
+    last_attempt_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'exam_id', name='unique_user_exam_stats'),
+    )
+
+    def __repr__(self):
+        return f'<UserExamStats User {self.user_id} - {self.exam_id}: streak {self.current_streak}>'
+
+
+class QuestionReview(db.Model):
+    """Spaced-repetition state of one question for one user and exam (services/reviews.py)"""
+    __tablename__ = 'question_reviews'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    exam_id = db.Column(db.String(50), nullable=False)
+    question_id = db.Column(db.String(50), nullable=False)
+    ease = db.Column(db.Float, nullable=False, default=2.5)  # SM-2 ease factor
+    interval_days = db.Column(db.Integer, nullable=False, default=0)
+    repetitions = db.Column(db.Integer, nullable=False, default=0)  # correct reviews in a row
+    last_correct = db.Column(db.Boolean, nullable=False)
+    last_reviewed_at = db.Column(db.DateTime, nullable=False)
+    due_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'exam_id', 'question_id', name='unique_user_exam_question_review'),
+        # Due and not-yet-due questions of one user, answered from the index alone
+        db.Index('ix_question_reviews_user_exam_due', 'user_id', 'exam_id', 'due_at', 'question_id'),
+    )
+
+    def __repr__(self):
+        return f'<QuestionReview User {self.user_id} - {self.exam_id}/{self.question_id} due {self.due_at}>'
+
+
+class QuestionDifficulty(db.Model):
+    """Calibrated difficulty of one question, written by ``flask calibrate-difficulty``"""
+    __tablename__ = 'question_difficulty'
+
+    id = db.Column(db.Integer, primary_key=True)
+    exam_id = db.Column(db.String(50), nullable=False)
+    question_id = db.Column(db.String(50), nullable=False)
+    difficulty = db.Column(db.Float, nullable=False)  # Rasch difficulty in logits; 0 is average
+    attempts = db.Column(db.Integer, nullable=False)
+    correct_rate = db.Column(db.Float, nullable=False)
+    calibrated_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('exam_id', 'question_id', name='unique_exam_question_difficulty'),
+    )
+
+    def __repr__(self):
+        return f'<QuestionDifficulty {self.exam_id}/{self.question_id}: {self.difficulty:.2f}>'
+
+
+class PracticeSession(db.Model):
+    """One practice run: the questions drawn for it and the attempts made in it"""
+    __tablename__ = 'practice_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    exam_id = db.Column(db.String(50), nullable=False)
+    mode = db.Column(db.String(20), nullable=False)  # smart/category/random
+    question_ids = db.Column(db.Text, nullable=False)  # JSON list, in the order they are asked
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    state = db.Column(db.Text)  # JSON progress through the run, see services.practice_store
+
+    attempts = db.relationship('Attempt', backref='practice_session', lazy=True)
+
+    def __repr__(self):
+        return f'<PracticeSession {self.id} User {self.user_id} - {self.exam_id}>'
+
+
+class GradingJob(db.Model):
+    """A code submission waiting for, or finished with, background grading"""
+    __tablename__ = 'grading_jobs'
+
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    question_id = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued/running/done/busy/error
+    result = db.Column(db.Text)  # JSON response payload once status is done/busy
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<GradingJob {self.id} {self.status}>'
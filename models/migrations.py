@@ -0,0 +1,215 @@
+"""Versioned schema migrations for existing databases.
+
+``db.create_all()`` only creates missing tables, so every change to a table
+that already exists in a deployed database (a new column, a new index) is
+added here as a numbered step. Steps run once, in order, at startup; the
+applied versions are recorded in ``schema_migrations``. Each step must be
+idempotent, because a fresh database already has the current schema from
+``create_all`` when the steps first run.
+"""
+
+import logging
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from models import Attempt, Progress, UserExamStats
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for the PostgreSQL advisory lock below
+SCHEMA_LOCK_KEY = 7_310_501
+
+schema_migrations = Table(
+    'schema_migrations',
+    MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def _add_exam_id_columns(conn: Connection) -> None:
+    """Attempts and progress became per-exam; old rows belong to c_programming."""
+    inspector = inspect(conn)
+    for table_name in ('attempts', 'progress'):
+        columns = [col['name'] for col in inspector.get_columns(table_name)]
+        if 'exam_id' not in columns:
+            conn.execute(text(
+                f"ALTER TABLE {table_name} ADD COLUMN exam_id VARCHAR(50) NOT NULL DEFAULT 'c_programming'"
+            ))
+
+
+def _add_query_indexes(conn: Connection) -> None:
+    """Composite indexes for the dashboard, stats, streak and session summary queries."""
+    wanted = {'ix_attempts_user_exam_timestamp', 'ix_progress_user_exam'}
+    for table in (Attempt.__table__, Progress.__table__):
+        for index in table.indexes:
+            if index.name in wanted:
+                index.create(conn, checkfirst=True)
+
+
+def _add_attempt_journal_id(conn: Connection) -> None:
+    """Attempts written behind through the journal carry a unique journal id."""
+    columns = [col['name'] for col in inspect(conn).get_columns('attempts')]
+    if 'journal_id' not in columns:
+        conn.execute(text('ALTER TABLE attempts ADD COLUMN journal_id VARCHAR(32)'))
+    for index in Attempt.__table__.indexes:
+        if index.name == 'ix_attempts_journal_id':
+            index.create(conn, checkfirst=True)
+
+
+def _add_dashboard_summary_columns(conn: Connection) -> None:
+    """Streak rows became the materialized dashboard summary; NULL category_progress marks rows to summarize."""
+    inspector = inspect(conn)
+    if not inspector.has_table('user_exam_stats'):
+        return
+    columns = [col['name'] for col in inspector.get_columns('user_exam_stats')]
+    for name in ('total_attempted', 'total_correct', 'category_progress', 'recent_attempts', 'last_attempt_at'):
+        if name in columns:
+            continue
+        column = UserExamStats.__table__.c[name]
+        ddl = f'ALTER TABLE user_exam_stats ADD COLUMN {name} {column.type.compile(conn.dialect)}'
+        if column.server_default is not None:
+            ddl += f" NOT NULL DEFAULT {column.server_default.arg}"
+        conn.execute(text(ddl))
+
+
+def _add_attempt_session_id(conn: Connection) -> None:
+    """Attempts made in a practice session point at its practice_sessions row.
+
+    The session summary used to find its attempts by question id; that
+    index has no other query and is dropped.
+    """
+    columns = [col['name'] for col in inspect(conn).get_columns('attempts')]
+    if 'session_id' not in columns:
+        conn.execute(text('ALTER TABLE attempts ADD COLUMN session_id VARCHAR(32) REFERENCES practice_sessions (id)'))
+    for index in Attempt.__table__.indexes:
+        if index.name == 'ix_attempts_session_timestamp':
+            index.create(conn, checkfirst=True)
+    conn.execute(text('DROP INDEX IF EXISTS ix_attempts_user_question'))
+
+
+def _add_practice_session_state(conn: Connection) -> None:
+    """Practice run state moved out of the session cookie into practice_sessions.state."""
+    inspector = inspect(conn)
+    if not inspector.has_table('practice_sessions'):
+        return
+    columns = [col['name'] for col in inspector.get_columns('practice_sessions')]
+    if 'state' not in columns:
+        conn.execute(text('ALTER TABLE practice_sessions ADD COLUMN state TEXT'))
+
+
+def _fix_progress_unique_constraint(conn: Connection) -> None:
+    """Progress rows are unique per (user, category, exam), the conflict target of its upsert.
+
+    Databases from before exam_id was added still have UNIQUE(user_id,
+    category) and no unique index on the three columns. Rows duplicated
+    per (user, category, exam) are merged. SQLite cannot drop a table
+    constraint, so there the table is rebuilt.
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table('progress'):
+        return
+    wanted = sorted(['user_id', 'category', 'exam_id'])
+    uniques = [
+        (constraint['name'], sorted(constraint['column_names']))
+        for constraint in inspector.get_unique_constraints('progress')
+    ]
+    unique_indexes = [
+        (index['name'], sorted(name for name in index['column_names'] if name is not None))
+        for index in inspector.get_indexes('progress') if index['unique']
+    ]
+    has_wanted = any(columns == wanted for _name, columns in uniques + unique_indexes)
+    stale = [(name, columns) for name, columns in uniques + unique_indexes if columns != wanted]
+    if has_wanted and not stale:
+        return
+
+    merged = (
+        'SELECT MIN(id) AS id, user_id, category, exam_id, SUM(total_attempted) AS total_attempted, '
+        'SUM(total_correct) AS total_correct, MAX(last_practiced) AS last_practiced '
+        'FROM {table} GROUP BY user_id, category, exam_id'
+    )
+    copied = 'id, user_id, category, exam_id, total_attempted, total_correct, last_practiced'
+    if conn.dialect.name == 'sqlite':
+        for index in inspector.get_indexes('progress'):
+            conn.execute(text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+        conn.execute(text('ALTER TABLE progress RENAME TO progress_legacy'))
+        Progress.__table__.create(conn)
+        conn.execute(text(f'INSERT INTO progress ({copied}) ' + merged.format(table='progress_legacy')))
+        conn.execute(text('DROP TABLE progress_legacy'))
+        return
+
+    for name, columns in uniques:
+        if columns != wanted:
+            conn.execute(text(f'ALTER TABLE progress DROP CONSTRAINT "{name}"'))
+    for name, index_columns in unique_indexes:
+        if index_columns != wanted:
+            # Indexes backing a dropped constraint went with it
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    conn.execute(text(f'CREATE TEMPORARY TABLE progress_merged AS {merged.format(table="progress")}'))
+    conn.execute(text('DELETE FROM progress'))
+    conn.execute(text(f'INSERT INTO progress ({copied}) SELECT * FROM progress_merged'))
+    conn.execute(text('DROP TABLE progress_merged'))
+    if not has_wanted:
+        conn.execute(text(
+            'ALTER TABLE progress ADD CONSTRAINT unique_user_category_exam UNIQUE (user_id, category, exam_id)'
+        ))
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, 'add exam_id columns', _add_exam_id_columns),
+    (2, 'add composite query indexes', _add_query_indexes),
+    (3, 'add attempts.journal_id', _add_attempt_journal_id),
+    (4, 'add dashboard summary columns', _add_dashboard_summary_columns),
+    (5, 'add attempts.session_id', _add_attempt_session_id),
+    (6, 'add practice_sessions.state', _add_practice_session_state),
+    (7, 'make progress unique per exam', _fix_progress_unique_constraint),
+]
+
+
+@contextmanager
+def schema_lock(engine: Engine) -> Iterator[None]:
+    """Hold a PostgreSQL advisory lock so processes starting together change the schema one at a time.
+
+    Without it, workers that each run ``create_all`` and the migrations (no
+    ``preload_app``) race on the same ``CREATE``/``ALTER`` statements. On
+    SQLite the write lock already serializes them.
+    """
+    if engine.dialect.name != 'postgresql':
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': SCHEMA_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': SCHEMA_LOCK_KEY})
+
+
+def run_migrations(engine: Engine) -> list[int]:
+    """Apply all pending migrations; returns the versions applied by this call."""
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    newly_applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            with engine.begin() as conn:
+                migrate(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=version, name=name, applied_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            # Another worker applied the same step concurrently
+            continue
+        logger.info('Applied migration %s: %s', version, name)
+        newly_applied.append(version)
+    return newly_applied
@@ -0,0 +1,19 @@
+"""Per-connection PRAGMAs for SQLite engines (see ``SQLITE_PROFILES`` in config.py)."""
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict) -> None:
+    """Run ``PRAGMA name=value`` for each entry on every new connection of ``engine``."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
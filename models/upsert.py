@@ -0,0 +1,26 @@
+"""Dialect-specific ``INSERT ... ON CONFLICT DO UPDATE`` for counter-style rows."""
+
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import ConfigError
+from models import db
+
+
+def upsert(table: Table, values: dict, conflict_columns: list[str], set_: dict, where=None) -> None:
+    """Insert ``values`` into ``table``, or apply ``set_`` to the row that conflicts with it.
+
+    Runs in the current session's transaction (it does not commit), so a
+    row is created or updated atomically without a prior SELECT and without
+    racing concurrent writers on the unique constraint. With ``where``, a
+    conflicting row is only updated if it matches that condition.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        sqlite_stmt = sqlite.insert(table).values(**values)
+        db.session.execute(sqlite_stmt.on_conflict_do_update(index_elements=conflict_columns, set_=set_, where=where))
+    elif dialect == 'postgresql':
+        pg_stmt = postgresql.insert(table).values(**values)
+        db.session.execute(pg_stmt.on_conflict_do_update(index_elements=conflict_columns, set_=set_, where=where))
+    else:
+        raise ConfigError(f'Unsupported database {dialect!r}: DATABASE_URL must point at SQLite or PostgreSQL')
@@ -1,6 +1,8 @@
-from flask import Blueprint, current_app, flash, redirect, request, session, url_for
+from flask import Blueprint, current_app, flash, redirect, request, url_for
 from flask_login import login_required
 
+from routes.practice import end_practice_session
+
 exam_bp = Blueprint('exam', __name__, url_prefix='/exam')
 
 
@@ -18,11 +20,7 @@ def switch_exam():
     if exam_service.set_active_exam(exam_id):
         exam = exam_service.get_exam(exam_id)
         # Clear any active practice session when switching exams
-        session.pop('practice_questions', None)
-        session.pop('current_question_index', None)
-        session.pop('session_start_time', None)
-        session.pop('question_start_time', None)
-        session.pop('answered_questions', None)
+        end_practice_session()
         flash(f'Switched to {exam["name"]}', 'success')
     else:
         flash('Invalid exam selected.', 'error')
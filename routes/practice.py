@@ -1,22 +1,119 @@
+import json
+import logging
 import re
-from datetime import datetime
+import time
+import uuid
+from datetime import datetime, timedelta
 
 from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, session, url_for
 from flask_login import current_user, login_required
 
 from config import Config
-from models import Attempt, db
+from models import Attempt, GradingJob, PracticeSession, db
 from services.adaptive import AdaptiveLearningService
-from services.compiler import CompilerService
+from services.admission import AdmissionController
+from services.compile_cache import CompileCache
+from services.compiler import BUSY_STAGES, CompilerService
+from services.difficulty import DifficultyCache
 from services.grader import GraderService
+from services.grading_queue import CODE_QUESTION_TYPES, GradingQueue
+from services.practice_store import create_practice_store
+from services.prelude import PreludeCache
 from services.question_loader import QuestionLoader
+from services.sandbox_pool import SandboxPool
+from services.write_behind import AttemptWriter, apply_attempt
 
 practice_bp = Blueprint('practice', __name__, url_prefix='/practice')
 
+logger = logging.getLogger(__name__)
+
+# Seconds a client is told to wait before polling an unfinished grading job again
+POLL_RETRY_SECONDS = 1
+
 # Initialize services
-question_loader = QuestionLoader(Config.QUESTIONS_DIR)
-grader_service = GraderService()
-compiler_service = CompilerService()
+question_loader = QuestionLoader(Config.QUESTIONS_DIR, bundle_dir=Config.QUESTION_BUNDLE_DIR or None)
+_compile_cache = (
+    CompileCache(Config.COMPILE_CACHE_DIR, Config.COMPILE_CACHE_MAX_MB * 1024 * 1024)
+    if Config.COMPILE_CACHE_MAX_MB > 0 else None
+)
+_admission = (
+    AdmissionController(
+        Config.COMPILER_LOCK_DIR,
+        Config.COMPILER_MAX_CONCURRENT,
+        Config.COMPILER_MAX_WAITING,
+        Config.COMPILER_MAX_WAIT_SECONDS,
+    )
+    if Config.COMPILER_MAX_CONCURRENT > 0 else None
+)
+_preludes = PreludeCache(Config.PCH_DIR, max_bytes=Config.PCH_MAX_MB * 1024 * 1024) if Config.PCH_DIR else None
+compiler_service = CompilerService(
+    timeout=Config.MAX_CODE_EXECUTION_TIME,
+    max_memory_mb=Config.MAX_MEMORY_MB,
+    cache=_compile_cache,
+    admission=_admission,
+    preludes=_preludes,
+    pool=(
+        SandboxPool(
+            Config.SANDBOX_POOL_SIZE,
+            Config.SANDBOX_QUEUE_DEPTH,
+            Config.SANDBOX_SCRATCH_DIR,
+            timeout=Config.MAX_CODE_EXECUTION_TIME,
+            max_memory_mb=Config.MAX_MEMORY_MB,
+            cache=_compile_cache,
+            admission=_admission,
+            preludes=_preludes,
+        )
+        if Config.SANDBOX_POOL_SIZE > 0 else None
+    ),
+)
+grader_service = GraderService(compiler=compiler_service)
+grading_queue = GradingQueue(max_workers=Config.GRADING_WORKERS)
+attempt_writer = (
+    AttemptWriter(
+        Config.WRITE_BEHIND_DIR,
+        batch_size=Config.WRITE_BEHIND_BATCH_SIZE,
+        flush_interval=Config.WRITE_BEHIND_FLUSH_MS / 1000,
+        max_failures=Config.WRITE_BEHIND_MAX_FAILURES,
+    )
+    if Config.WRITE_BEHIND else None
+)
+practice_store = create_practice_store(Config.PRACTICE_STORE, Config.PRACTICE_STORE_DIR)
+difficulty_cache = DifficultyCache()
+# When this worker last deleted old finished grading jobs (time.monotonic())
+_grading_jobs_pruned_at = 0.0
+
+# Practice state the session cookie used to carry itself; dropped from older cookies
+_LEGACY_SESSION_KEYS = (
+    'practice_questions', 'current_question_index', 'session_start_time',
+    'question_start_time', 'answered_questions', 'practice_exam_id',
+)
+
+
+def sync_attempts(user_id: int) -> None:
+    """Make attempts still buffered by the write-behind journal visible to reads."""
+    if attempt_writer is not None:
+        attempt_writer.sync_user(user_id)
+
+
+def _practice_state() -> tuple[str | None, dict | None]:
+    """The current practice run: its id from the session cookie and its state from the store."""
+    practice_session_id = session.get('practice_session_id')
+    if not practice_session_id:
+        return None, None
+    state = practice_store.load(practice_session_id)
+    if state is None or state.get('user_id') != current_user.id:
+        return None, None
+    return practice_session_id, state
+
+
+def end_practice_session() -> None:
+    """Forget the current practice run, in the cookie and in the store. Commits."""
+    practice_session_id = session.pop('practice_session_id', None)
+    if practice_session_id:
+        practice_store.delete(practice_session_id)
+        db.session.commit()
+    for key in _LEGACY_SESSION_KEYS:
+        session.pop(key, None)
 
 
 def _get_exam_context():
@@ -37,11 +134,7 @@ def start_practice():
 
     if request.method == 'POST':
         # Clear any existing session data before starting a new one
-        session.pop('practice_questions', None)
-        session.pop('current_question_index', None)
-        session.pop('session_start_time', None)
-        session.pop('question_start_time', None)
-        session.pop('answered_questions', None)
+        end_practice_session()
 
         mode = request.form.get('mode', 'smart')
         category = request.form.get('category', None)
@@ -51,9 +144,6 @@ def start_practice():
             requested_count = 10
         requested_count = max(1, min(requested_count, 50))
 
-        # Store exam_id in session for the practice run
-        session['practice_exam_id'] = exam_id
-
         # Load questions for this exam
         all_questions = question_loader.load_all_questions(
             exam_id=exam_id, categories=category_ids
@@ -61,8 +151,10 @@ def start_practice():
 
         if mode == 'smart':
             # Adaptive learning mode
+            sync_attempts(current_user.id)
             adaptive_service = AdaptiveLearningService(
-                current_user.id, categories=category_ids, exam_id=exam_id
+                current_user.id, categories=category_ids, exam_id=exam_id,
+                difficulties=difficulty_cache.get(exam_id)
             )
             questions = adaptive_service.generate_practice_session(
                 all_questions,
@@ -71,14 +163,10 @@ def start_practice():
         elif mode == 'category':
             if not category:
                 flash('Please select a category before starting.', 'error')
-                question_ids = session.get('practice_questions', [])
-                current_index = session.get('current_question_index', 0)
-                has_active_session = bool(question_ids) and current_index < len(question_ids)
-                remaining_questions = max(len(question_ids) - current_index, 0)
                 return render_template(
                     'start_practice.html',
-                    has_active_session=has_active_session,
-                    remaining_questions=remaining_questions,
+                    has_active_session=False,
+                    remaining_questions=0,
                     categories=categories
                 )
             # Specific category practice
@@ -94,17 +182,36 @@ def start_practice():
             unique_questions = list({q.get('id'): q for q in all_q}.values())
             questions = random.sample(unique_questions, min(requested_count, len(unique_questions)))
 
-        # Store session data
-        session['practice_questions'] = [q['id'] for q in questions]
-        session['current_question_index'] = 0
-        session['session_start_time'] = datetime.utcnow().isoformat()
-        session['question_start_time'] = datetime.utcnow().isoformat()
+        practice_session = PracticeSession(
+            id=uuid.uuid4().hex,
+            user_id=current_user.id,
+            exam_id=exam_id,
+            mode=mode,
+            question_ids=json.dumps([q['id'] for q in questions]),
+        )
+        db.session.add(practice_session)
+        db.session.flush()
+
+        # Store session data server-side; the cookie only carries the id
+        now = datetime.utcnow().isoformat()
+        practice_store.save(practice_session.id, {
+            'user_id': current_user.id,
+            'exam_id': exam_id,
+            'question_ids': [q['id'] for q in questions],
+            'index': 0,
+            'answered': [],
+            'started_at': now,
+            'question_started_at': now,
+        })
+        db.session.commit()
+        session['practice_session_id'] = practice_session.id
 
         return redirect(url_for('practice.question'))
 
     # Show practice mode selection
-    question_ids = session.get('practice_questions', [])
-    current_index = session.get('current_question_index', 0)
+    _, state = _practice_state()
+    question_ids = state['question_ids'] if state else []
+    current_index = state['index'] if state else 0
     has_active_session = bool(question_ids) and current_index < len(question_ids)
     remaining_questions = max(len(question_ids) - current_index, 0)
 
@@ -127,27 +234,23 @@ def start_practice():
 @login_required
 def question():
     """Display current question"""
-    if 'practice_questions' not in session:
+    _, state = _practice_state()
+    if state is None:
         return redirect(url_for('practice.start_practice'))
 
-    question_ids = session.get('practice_questions', [])
-    current_index = session.get('current_question_index', 0)
-    practice_exam_id = session.get('practice_exam_id')
+    question_ids = state['question_ids']
+    current_index = state['index']
 
     if current_index >= len(question_ids):
         return redirect(url_for('practice.session_complete'))
 
     question_id = question_ids[current_index]
-    question_data = question_loader.get_question_by_id(question_id, exam_id=practice_exam_id)
+    question_data = question_loader.get_question_by_id(question_id, exam_id=state['exam_id'])
 
     if not question_data:
         return redirect(url_for('practice.session_complete'))
 
-    # Track question start time
-    session['question_start_time'] = datetime.utcnow().isoformat()
-
-    answered_questions = set(session.get('answered_questions', []))
-    has_answered = question_id in answered_questions
+    has_answered = question_id in state['answered']
 
     _attach_fill_blanks_segments(question_data)
 
@@ -187,7 +290,12 @@ def _attach_fill_blanks_segments(question_data: dict) -> None:
 @practice_bp.route('/submit', methods=['POST'])
 @login_required
 def submit_answer():
-    """Submit and grade an answer"""
+    """Submit and grade an answer.
+
+    Code questions are graded in the background: the response is a 202 with
+    a job id and a ``poll_url`` to fetch the result from. All other question
+    types are graded inline.
+    """
     data = request.get_json(silent=True) or {}
     question_id = data.get('question_id')
     user_answer = data.get('answer', '')
@@ -195,9 +303,9 @@ def submit_answer():
     if not question_id:
         return jsonify({'error': 'Missing question_id'}), 400
 
-    practice_exam_id = session.get('practice_exam_id')
+    practice_session_id, state = _practice_state()
     exam_service = current_app.config['EXAM_SERVICE']
-    exam_id = practice_exam_id or exam_service.get_active_exam_id()
+    exam_id = state['exam_id'] if state else exam_service.get_active_exam_id()
     category_ids = exam_service.get_category_ids_for_exam(exam_id)
 
     # Load question
@@ -205,104 +313,255 @@ def submit_answer():
     if not question:
         return jsonify({'error': 'Question not found'}), 404
 
-    # Grade the answer
-    result = grader_service.grade(question, user_answer)
-
     # Calculate time spent
-    start_time_str = session.get('question_start_time')
+    start_time_str = state['question_started_at'] if state else None
     time_spent = 0
     if start_time_str:
         start_time = datetime.fromisoformat(start_time_str)
         time_spent = int((datetime.utcnow() - start_time).total_seconds())
 
-    # Save attempt to database
-    attempt = Attempt(
-        user_id=current_user.id,
-        question_id=question_id,
-        category=question['category'],
-        exam_id=exam_id,
-        correct=result['correct'],
-        time_spent=time_spent,
-        submitted_answer=user_answer,
-        hints_used=hints_used
-    )
-    db.session.add(attempt)
+    submission = {
+        'user_id': current_user.id,
+        'exam_id': exam_id,
+        'category_ids': category_ids,
+        'user_answer': user_answer,
+        'time_spent': time_spent,
+        'hints_used': hints_used,
+        # Attempts at the session's questions belong to the practice session
+        'session_id': practice_session_id if state and question_id in state['question_ids'] else None,
+    }
+
+    if current_app.config['ASYNC_GRADING'] and question.get('type') in CODE_QUESTION_TYPES:
+        _prune_grading_jobs()
+        job = GradingJob(id=uuid.uuid4().hex, user_id=current_user.id, question_id=question_id)
+        db.session.add(job)
+        db.session.commit()
+        grading_queue.submit(
+            job.id, _run_grading_job, current_app._get_current_object(), job.id, question, submission
+        )
+        return jsonify({
+            'status': 'queued',
+            'job_id': job.id,
+            'poll_url': url_for('practice.grading_result', job_id=job.id),
+        }), 202
+
+    payload = _grade_and_record(question, submission)
+    if payload.get('busy'):
+        return _busy_response(payload)
+    # The attempt and the question marked answered commit together
+    _mark_answered(practice_session_id, state, question_id)
+    db.session.commit()
+    return jsonify(payload)
 
-    # Update progress
-    adaptive_service = AdaptiveLearningService(
-        current_user.id, categories=category_ids, exam_id=exam_id
-    )
-    adaptive_service.update_progress(question['category'], result['correct'])
 
-    answered_questions = session.get('answered_questions', [])
-    if question_id not in answered_questions:
-        answered_questions.append(question_id)
-        session['answered_questions'] = answered_questions
+def _mark_answered(practice_session_id: str | None, state: dict | None, question_id: str) -> None:
+    """Add ``question_id`` to the run's answered questions; the caller commits."""
+    if practice_session_id is None or state is None or question_id in state['answered']:
+        return
+    state['answered'].append(question_id)
+    practice_store.save(practice_session_id, state)
+
 
+def _prune_grading_jobs() -> None:
+    """Delete finished grading jobs older than GRADING_JOB_RETENTION_SECONDS.
+
+    Runs at most once per 1/24 of the retention period per worker.
+    """
+    global _grading_jobs_pruned_at
+    now = time.monotonic()
+    retention = current_app.config['GRADING_JOB_RETENTION_SECONDS']
+    if now - _grading_jobs_pruned_at < retention / 24:
+        return
+    _grading_jobs_pruned_at = now
+    GradingJob.query.filter(
+        GradingJob.finished_at < datetime.utcnow() - timedelta(seconds=retention)
+    ).delete(synchronize_session=False)
     db.session.commit()
 
-    return jsonify({
+
+def _busy_response(payload: dict):
+    """503 + Retry-After for a submission the code runner had no capacity for"""
+    retry_after = int(payload.get('retry_after') or 1)
+    response = jsonify({
+        'status': 'busy',
+        'error': payload.get('error') or 'The code runner is busy.',
+        'retry_after': retry_after,
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def _grade_and_record(question: dict, submission: dict) -> dict:
+    """Grade an answer, stage the attempt and progress, and build the response payload.
+
+    The attempt is written in the caller's transaction (or handed to the
+    write-behind journal); the caller commits. When the code runner is
+    saturated nothing is recorded and the payload carries
+    ``busy``/``retry_after`` instead of a verdict.
+    """
+    result = grader_service.grade(question, submission['user_answer'])
+    if result.get('busy'):
+        return {'busy': True, 'retry_after': result.get('retry_after'), 'error': result.get('error')}
+
+    # Stage the attempt with its progress and streak updates, or hand it to
+    # the write-behind journal
+    entry = {
+        'user_id': submission['user_id'],
+        'question_id': question['id'],
+        'category': question['category'],
+        'exam_id': submission['exam_id'],
+        'correct': result['correct'],
+        'time_spent': submission['time_spent'],
+        'submitted_answer': submission['user_answer'],
+        'hints_used': submission['hints_used'],
+        'timestamp': datetime.utcnow().isoformat(),
+        'session_id': submission.get('session_id'),
+    }
+    if attempt_writer is not None:
+        attempt_writer.record(entry)
+    else:
+        apply_attempt(entry)
+
+    return {
         'correct': result['correct'],
         'explanation': result.get('explanation', ''),
         'expected': result.get('expected'),
         'received': result.get('received'),
         'test_results': result.get('test_results'),
         'memory_layout': result.get('memory_layout')
-    })
+    }
+
+
+def _run_grading_job(app, job_id: str, question: dict, submission: dict) -> None:
+    """Background half of submit_answer for code questions."""
+    with app.app_context():
+        job = db.session.get(GradingJob, job_id)
+        if job is None:
+            return
+        job.status = 'running'
+        db.session.commit()
+        try:
+            payload = _grade_and_record(question, submission)
+            # The attempt commits together with the job's result
+            _finish_grading_job(job_id, {
+                'status': 'busy' if payload.get('busy') else 'done', 'result': json.dumps(payload),
+            })
+        except Exception as e:
+            logger.exception('Grading job %s failed', job_id)
+            db.session.rollback()
+            _finish_grading_job(job_id, {'status': 'error', 'error': str(e)})
+
+
+def _finish_grading_job(job_id: str, outcome: dict) -> None:
+    GradingJob.query.filter_by(id=job_id).update({**outcome, 'finished_at': datetime.utcnow()})
+    db.session.commit()
+
+
+@practice_bp.route('/submit/<job_id>')
+@login_required
+def grading_result(job_id):
+    """Poll for a background grading result.
+
+    Answers immediately: an unfinished job is a 202 with ``retry_after``, so
+    no web worker is held for the length of a grade. A job still unfinished
+    GRADING_JOB_STALE_SECONDS after it was queued (its worker died) is
+    marked failed.
+    """
+    job = db.session.get(GradingJob, job_id)
+    if job is None or job.user_id != current_user.id:
+        return jsonify({'error': 'Grading job not found'}), 404
+
+    stale_before = datetime.utcnow() - timedelta(seconds=current_app.config['GRADING_JOB_STALE_SECONDS'])
+    if job.status in ('queued', 'running') and job.created_at < stale_before:
+        logger.warning('Grading job %s was never finished; marking it failed', job_id)
+        GradingJob.query.filter(
+            GradingJob.id == job_id, GradingJob.status.in_(('queued', 'running'))
+        ).update({'status': 'error', 'error': 'stale', 'finished_at': datetime.utcnow()},
+                 synchronize_session=False)
+        db.session.commit()
+        db.session.expire(job)
+
+    if job.status == 'done':
+        practice_session_id, state = _practice_state()
+        if state is not None and job.question_id in state['question_ids']:
+            _mark_answered(practice_session_id, state, job.question_id)
+            db.session.commit()
+        return jsonify({'status': 'done', **json.loads(job.result)})
+    if job.status == 'busy':
+        return _busy_response(json.loads(job.result))
+    if job.status == 'error':
+        return jsonify({'status': 'error', 'error': 'Grading failed. Please try again.'}), 500
+    response = jsonify({'status': job.status, 'job_id': job.id, 'retry_after': POLL_RETRY_SECONDS})
+    response.status_code = 202
+    response.headers['Retry-After'] = str(POLL_RETRY_SECONDS)
+    return response
 
 
 @practice_bp.route('/next')
 @login_required
 def next_question():
     """Move to next question"""
-    if 'practice_questions' not in session:
+    practice_session_id, state = _practice_state()
+    if state is None:
         return redirect(url_for('practice.start_practice'))
 
-    session['current_question_index'] = session.get('current_question_index', 0) + 1
+    # Track question start time; reloading the question page does not restart it
+    state['index'] += 1
+    state['question_started_at'] = datetime.utcnow().isoformat()
+    practice_store.save(practice_session_id, state)
+    db.session.commit()
     return redirect(url_for('practice.question'))
 
 
+def session_attempts_query(user_id: int, session_id: str):
+    """The attempts made in one of the user's practice sessions, newest first."""
+    return Attempt.query.filter(
+        Attempt.session_id == session_id,
+        Attempt.user_id == user_id
+    ).order_by(Attempt.timestamp.desc())
+
+
 @practice_bp.route('/complete')
 @login_required
 def session_complete():
     """Practice session completion summary"""
-    question_ids = session.get('practice_questions', [])
+    practice_session_id, state = _practice_state()
 
-    if not question_ids:
+    if state is None or not state['question_ids']:
         return redirect(url_for('practice.start_practice'))
 
-    # Get all attempts from this session
-    attempts = Attempt.query.filter(
-        Attempt.user_id == current_user.id,
-        Attempt.question_id.in_(question_ids)
-    ).order_by(Attempt.timestamp.desc()).limit(len(question_ids)).all()
+    # Get all attempts from this session; a question answered more than once
+    # counts with its latest attempt
+    sync_attempts(current_user.id)
+    latest: dict[str, Attempt] = {}
+    for attempt in session_attempts_query(current_user.id, practice_session_id):
+        latest.setdefault(attempt.question_id, attempt)
+    attempts = list(latest.values())
 
     correct_count = sum(1 for a in attempts if a.correct)
     total_time = sum(a.time_spent for a in attempts)
 
-    practice_exam_id = session.get('practice_exam_id')
-
-    incorrect_details = []
-    for attempt in attempts:
-        if not attempt.correct:
-            q = question_loader.get_question_by_id(attempt.question_id, exam_id=practice_exam_id)
-            if q:
-                incorrect_details.append({
-                    'attempt': attempt,
-                    'question': q
-                })
-
-    # Clear session
-    session.pop('practice_questions', None)
-    session.pop('current_question_index', None)
-    session.pop('session_start_time', None)
-    session.pop('answered_questions', None)
-    session.pop('practice_exam_id', None)
+    incorrect = [attempt for attempt in attempts if not attempt.correct]
+    questions = question_loader.get_questions_by_ids(
+        [attempt.question_id for attempt in incorrect], exam_id=state['exam_id']
+    )
+    incorrect_details = [
+        {'attempt': attempt, 'question': questions[attempt.question_id]}
+        for attempt in incorrect
+        if attempt.question_id in questions
+    ]
+
+    PracticeSession.query.filter_by(id=practice_session_id, user_id=current_user.id).update(
+        {'completed_at': datetime.utcnow()}
+    )
+    # Clear session; commits the completion with it
+    end_practice_session()
 
     return render_template('session_complete.html',
                          attempts=attempts,
                          correct_count=correct_count,
-                         total_questions=len(question_ids),
+                         total_questions=len(state['question_ids']),
                          total_time=total_time,
                          incorrect_details=incorrect_details)
 
@@ -316,5 +575,7 @@ def compile_code():
     input_data = data.get('input', '')
 
     result = compiler_service.compile_and_run(code, input_data)
+    if result.get('stage') in BUSY_STAGES:
+        return _busy_response(result)
 
     return jsonify(result)
@@ -1,10 +1,14 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 
 from flask import Blueprint, current_app, jsonify, render_template
 from flask_login import current_user, login_required
+from sqlalchemy import case, func
 
-from models import Attempt
+from models import Attempt, db
+from routes.practice import sync_attempts
 from services.adaptive import AdaptiveLearningService
+from services.dashboard_summary import DashboardSummaryService
+from services.streaks import attempt_day, parse_sql_date
 
 progress_bp = Blueprint('progress', __name__, url_prefix='/progress')
 
@@ -22,24 +26,19 @@ def _get_exam_context():
 def dashboard():
     """Main dashboard showing user progress"""
     exam_id, category_ids = _get_exam_context()
+    sync_attempts(current_user.id)
 
+    # Everything the page shows comes from the user's materialized summary row
+    summary = DashboardSummaryService(current_user.id, exam_id).read()
     adaptive_service = AdaptiveLearningService(
         current_user.id, categories=category_ids, exam_id=exam_id
     )
-    progress_summary = adaptive_service.get_progress_summary()
-
-    # Get recent attempts for this exam
-    recent_attempts = Attempt.query.filter_by(
-        user_id=current_user.id, exam_id=exam_id
-    ).order_by(Attempt.timestamp.desc()).limit(10).all()
-
-    # Calculate streak
-    streak = calculate_streak(current_user.id, exam_id)
+    progress_summary = adaptive_service.summarize(summary['category_counts'])
 
     return render_template('dashboard.html',
                          progress=progress_summary,
-                         recent_attempts=recent_attempts,
-                         streak=streak,
+                         recent_attempts=summary['recent_attempts'],
+                         streak=summary['current_streak'],
                          user=current_user)
 
 
@@ -48,60 +47,31 @@ def dashboard():
 def stats():
     """Detailed statistics page"""
     exam_id, category_ids = _get_exam_context()
+    sync_attempts(current_user.id)
 
     adaptive_service = AdaptiveLearningService(
         current_user.id, categories=category_ids, exam_id=exam_id
     )
     progress_summary = adaptive_service.get_progress_summary()
 
-    # Get all attempts for this exam
-    all_attempts = Attempt.query.filter_by(
-        user_id=current_user.id, exam_id=exam_id
-    ).order_by(Attempt.timestamp.desc()).all()
-
-    # Calculate additional statistics
-    total_time = sum(a.time_spent for a in all_attempts)
-    avg_time_per_question = total_time / len(all_attempts) if all_attempts else 0
-
-    # Category breakdown - initialize all categories for this exam
-    category_stats = {}
-
-    # Initialize all categories with zero stats
-    for category in category_ids:
-        category_stats[category] = {
-            'correct': 0,
-            'total': 0,
-            'time': 0
-        }
-
-    # Fill in actual attempt data
-    for attempt in all_attempts:
-        if attempt.category not in category_stats:
-            category_stats[attempt.category] = {
-                'correct': 0,
-                'total': 0,
-                'time': 0
-            }
-        category_stats[attempt.category]['total'] += 1
-        if attempt.correct:
-            category_stats[attempt.category]['correct'] += 1
-        category_stats[attempt.category]['time'] += attempt.time_spent
+    # Per-category totals, aggregated in SQL so only summary rows come back
+    category_stats = {category: {'correct': 0, 'total': 0, 'time': 0} for category in category_ids}
+    category_stats.update(category_totals(current_user.id, exam_id))
+
+    attempts_count = sum(c['total'] for c in category_stats.values())
+    total_time = sum(c['time'] for c in category_stats.values())
+    avg_time_per_question = total_time / attempts_count if attempts_count else 0
 
     # Build trend data for the last 14 days
     today = datetime.utcnow().date()
     last_days = [today - timedelta(days=i) for i in range(13, -1, -1)]
-    attempts_by_day = {}
-    for attempt in all_attempts:
-        attempt_day = attempt.timestamp.date()
-        attempts_by_day.setdefault(attempt_day, []).append(attempt)
+    attempts_by_day = daily_totals(current_user.id, exam_id, since=last_days[0])
 
     trend_labels = [day.strftime('%b %d') for day in last_days]
     trend_accuracy = []
     trend_attempts = []
     for day in last_days:
-        day_attempts = attempts_by_day.get(day, [])
-        total = len(day_attempts)
-        correct = sum(1 for a in day_attempts if a.correct)
+        total, correct = attempts_by_day.get(day, (0, 0))
         trend_attempts.append(total)
         if total == 0:
             trend_accuracy.append(None)
@@ -130,7 +100,7 @@ def stats():
                          category_stats=category_stats,
                          total_time=total_time,
                          avg_time=avg_time_per_question,
-                         attempts_count=len(all_attempts),
+                         attempts_count=attempts_count,
                          trend_labels=trend_labels,
                          trend_accuracy=trend_accuracy,
                          trend_attempts=trend_attempts,
@@ -144,6 +114,7 @@ def stats():
 def api_progress():
     """API endpoint for progress data (for charts)"""
     exam_id, category_ids = _get_exam_context()
+    sync_attempts(current_user.id)
 
     adaptive_service = AdaptiveLearningService(
         current_user.id, categories=category_ids, exam_id=exam_id
@@ -152,42 +123,45 @@ def api_progress():
     return jsonify(progress_summary)
 
 
-def calculate_streak(user_id: int, exam_id: str = None) -> int:
-    """
-    Calculate the current practice streak in days
-
-    Args:
-        user_id: User ID
-        exam_id: Optional exam to filter by
-
-    Returns:
-        Number of consecutive days practiced
-    """
-    query = Attempt.query.filter_by(user_id=user_id)
-    if exam_id:
-        query = query.filter_by(exam_id=exam_id)
-
-    attempts = query.order_by(Attempt.timestamp.desc()).all()
-
-    if not attempts:
-        return 0
-
-    today = datetime.utcnow().date()
-    current_date = today
-    streak = 0
-
-    # Group attempts by date
-    attempt_dates = set()
-    for attempt in attempts:
-        attempt_dates.add(attempt.timestamp.date())
-
-    # Check consecutive days
-    while current_date in attempt_dates:
-        streak += 1
-        current_date -= timedelta(days=1)
-
-    # If no practice today, don't count streak
-    if today not in attempt_dates:
-        return 0
-
-    return streak
+def category_totals_query(user_id: int, exam_id: str):
+    """(category, attempts, correct, time spent) rows for one user and exam."""
+    return db.session.query(
+        Attempt.category,
+        func.count(Attempt.id),
+        func.sum(case((Attempt.correct, 1), else_=0)),
+        func.coalesce(func.sum(Attempt.time_spent), 0),
+    ).filter(
+        Attempt.user_id == user_id, Attempt.exam_id == exam_id
+    ).group_by(Attempt.category)
+
+
+def category_totals(user_id: int, exam_id: str) -> dict[str, dict]:
+    """Attempt count, correct count and time spent per category, via GROUP BY."""
+    rows = category_totals_query(user_id, exam_id).all()
+    return {
+        category: {'correct': int(correct or 0), 'total': total, 'time': int(time_spent)}
+        for category, total, correct, time_spent in rows
+    }
+
+
+def daily_totals_query(user_id: int, exam_id: str, since: date):
+    """(day, attempts, correct) rows for one user and exam from ``since`` onwards."""
+    day = attempt_day()
+    return db.session.query(
+        day,
+        func.count(Attempt.id),
+        func.sum(case((Attempt.correct, 1), else_=0)),
+    ).filter(
+        Attempt.user_id == user_id,
+        Attempt.exam_id == exam_id,
+        Attempt.timestamp >= datetime.combine(since, time.min),
+    ).group_by(day)
+
+
+def daily_totals(user_id: int, exam_id: str, since: date) -> dict[date, tuple[int, int]]:
+    """(attempts, correct) per UTC day from ``since`` onwards, via GROUP BY."""
+    rows = daily_totals_query(user_id, exam_id, since).all()
+    return {
+        parse_sql_date(row_day): (total, int(correct or 0))
+        for row_day, total, correct in rows
+    }
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Time smart-mode question selection across session and pool sizes.
+
+Usage:
+    python scripts/bench_adaptive_selection.py
+    python scripts/bench_adaptive_selection.py --pool-sizes 100 10000 --session-sizes 10 50
+
+Builds a synthetic pool of 8 categories and times
+``AdaptiveLearningService.generate_practice_session`` next to the old
+selection, which rebuilt each category's candidate list and called
+``list.remove`` on every pick. The weak categories are fixed, so no
+database is involved.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from services.adaptive import AdaptiveLearningService  # noqa: E402
+
+CATEGORIES = [f'category_{i}' for i in range(8)]
+WEAK = CATEGORIES[:3]
+
+
+def legacy_session(questions_pool: dict, session_size: int) -> list[dict]:
+    """generate_practice_session as it selected questions before"""
+    all_categories = list(questions_pool.keys())
+    weak_count = int(session_size * 0.7)
+    review_count = session_size - weak_count
+    session_questions: list[dict] = []
+    used_ids: set = set()
+    remaining = {cat: list(questions) for cat, questions in questions_pool.items()}
+
+    def pick_unique(categories: list[str], count: int) -> list[dict]:
+        picks: list[dict] = []
+        available = [cat for cat in categories if remaining.get(cat)]
+        while len(picks) < count and available:
+            category = random.choice(available)
+            candidates = [q for q in remaining[category] if q.get('id') not in used_ids]
+            if not candidates:
+                available.remove(category)
+                continue
+            question = random.choice(candidates)
+            picks.append(question)
+            used_ids.add(question.get('id'))
+            remaining[category].remove(question)
+            if not remaining[category]:
+                available.remove(category)
+        return picks
+
+    session_questions.extend(pick_unique(WEAK, weak_count))
+    session_questions.extend(pick_unique([c for c in all_categories if c not in WEAK], review_count))
+    if len(session_questions) < session_size:
+        session_questions.extend(pick_unique(all_categories, session_size - len(session_questions)))
+    random.shuffle(session_questions)
+    return session_questions[:session_size]
+
+
+class _FixedWeakAreas(AdaptiveLearningService):
+    """Recommends WEAK without reading progress from the database."""
+
+    def get_recommended_categories(self, categories: list[str] | None = None) -> list[str]:
+        return WEAK
+
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='questions per category')
+    parser.add_argument('--session-sizes', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    service = _FixedWeakAreas(user_id=0, categories=CATEGORIES)
+
+    print(f'{"per category":>12} {"session":>8} {"old ms":>9} {"new ms":>9} {"speedup":>8}')
+    for pool_size in args.pool_sizes:
+        pool = {
+            cat: [{'id': f'{cat}_{i}', 'category': cat} for i in range(pool_size)]
+            for cat in CATEGORIES
+        }
+        for session_size in args.session_sizes:
+            old = _median_ms(lambda p=pool, n=session_size: legacy_session(p, n), args.repeat)
+            new = _median_ms(lambda p=pool, n=session_size: service.generate_practice_session(p, n), args.repeat)
+            print(f'{pool_size:>12} {session_size:>8} {old:>9.3f} {new:>9.3f} {old / new:>7.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
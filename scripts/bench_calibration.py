@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Time the difficulty calibration job on a synthetic attempt history.
+
+Usage:
+    python scripts/bench_calibration.py
+    python scripts/bench_calibration.py --attempts 5000000 --chunk-size 100000
+
+Seeds a throwaway SQLite database with attempts simulated from a Rasch
+model (762 questions, one user per 200 attempts), then runs
+``calibrate_exam`` and reports its wall time and how well the fitted
+difficulties match the true ones. A second run under ``tracemalloc``
+reports the job's peak Python and NumPy allocations (RSS would mostly show
+SQLite's memory-mapped database file). Needs requirements-calibration.txt.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+_TMP = tempfile.mkdtemp(prefix='bench-calibration-')
+os.environ.update({
+    'DEBUG': 'True',
+    'FLASK_SECRET_KEY': 'bench-only-secret',
+    'FORCE_HTTPS': 'false',
+    'DATABASE_URL': f'sqlite:///{_TMP}/bench.db',
+    'PRELOAD_QUESTIONS': 'false',
+})
+
+import numpy as np  # noqa: E402
+
+from app import app  # noqa: E402
+from models import Attempt, QuestionDifficulty, User, db  # noqa: E402
+from services.calibration import calibrate_exam  # noqa: E402
+
+EXAM = 'c_programming'
+QUESTIONS = 762
+SEED_CHUNK = 20_000
+
+
+def seed(attempts: int, rng) -> np.ndarray:
+    """Insert simulated attempts; returns the true difficulty of each question."""
+    n_users = max(attempts // 200, 1)
+    abilities = rng.normal(0, 1, n_users)
+    difficulties = rng.normal(0, 1.2, QUESTIONS)
+    db.session.execute(User.__table__.insert(), [
+        {'name': f'U{i}', 'email': f'u{i}@example.com', 'password_hash': 'x'} for i in range(n_users)
+    ])
+    timestamp = datetime(2024, 1, 1)
+    for start in range(0, attempts, SEED_CHUNK):
+        size = min(SEED_CHUNK, attempts - start)
+        users = rng.integers(0, n_users, size)
+        questions = rng.integers(0, QUESTIONS, size)
+        correct = rng.random(size) < 1 / (1 + np.exp(difficulties[questions] - abilities[users]))
+        db.session.execute(Attempt.__table__.insert(), [
+            {
+                'user_id': int(u) + 1, 'question_id': f'q{q:04d}', 'category': 'arrays', 'exam_id': EXAM,
+                'correct': bool(c), 'timestamp': timestamp,
+            }
+            for u, q, c in zip(users, questions, correct, strict=True)
+        ])
+        db.session.commit()
+    return difficulties
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--attempts', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=20_000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        truth = seed(args.attempts, np.random.default_rng(1))
+        print(f'seeded {args.attempts} attempts in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        calibrated = calibrate_exam(EXAM, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+
+        rows = QuestionDifficulty.query.filter_by(exam_id=EXAM).all()
+        fitted = np.array([row.difficulty for row in rows])
+        expected = truth[[int(row.question_id[1:]) for row in rows]]
+        print(f'calibrated {calibrated} questions in {elapsed:.2f}s '
+              f'({args.attempts / elapsed / 1e6:.2f}M attempts/s)')
+        print(f'correlation with the true difficulties: {np.corrcoef(fitted, expected)[0, 1]:.3f}')
+
+        tracemalloc.start()
+        calibrate_exam(EXAM, chunk_size=args.chunk_size)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'peak allocations {peak / 2**20:.0f} MB (chunk size {args.chunk_size})')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Measure the session cookie of a practice run before and after moving its state server-side.
+
+Usage:
+    python scripts/bench_practice_cookie.py
+    python scripts/bench_practice_cookie.py --repeat 2000
+
+Starts a 50-question practice run against a throwaway SQLite database and
+marks every question answered (the cookie's worst case). Compares the
+cookie as it is now (only the run's id) with the cookie the same run
+produced when the session carried the question ids, answered questions and
+timestamps: its size and the time to sign (``dumps``, every request that
+modifies the session) and to verify (``loads``, every request). Then prints
+the median latency of ``GET /practice/question``, which now reads the
+run's state from the store, for both store backends.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from flask.sessions import SecureCookieSessionInterface
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+_TMP = tempfile.mkdtemp(prefix='bench-cookie-')
+os.environ.update({
+    'DEBUG': 'True',
+    'FLASK_SECRET_KEY': 'bench-only-secret',
+    'FORCE_HTTPS': 'false',
+    'DATABASE_URL': f'sqlite:///{_TMP}/bench.db',
+    'PRELOAD_QUESTIONS': 'false',
+})
+
+import app as app_module  # noqa: E402
+from models import db  # noqa: E402
+from routes import practice  # noqa: E402
+from services.practice_store import DatabasePracticeStore, FilePracticeStore  # noqa: E402
+
+
+def _median_us(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--questions', type=int, default=50)
+    args = parser.parse_args()
+
+    app = app_module.app
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'name': 'Bench', 'email': 'bench@example.com',
+        'password': 'bench-password', 'confirm_password': 'bench-password',
+    })
+    client.post('/auth/login', data={'email': 'bench@example.com', 'password': 'bench-password'})
+    client.post('/practice/start', data={'mode': 'random', 'question_count': args.questions})
+
+    with client.session_transaction() as sess:
+        current = dict(sess)
+    with app.app_context():
+        state = practice.practice_store.load(current['practice_session_id'])
+        if state is None:
+            raise SystemExit('The practice run was not started')
+        state['answered'] = list(state['question_ids'])
+        practice.practice_store.save(current['practice_session_id'], state)
+        db.session.commit()
+
+    # The same run as the session used to carry it
+    legacy = {
+        **current,
+        'practice_exam_id': state['exam_id'],
+        'practice_questions': state['question_ids'],
+        'current_question_index': len(state['question_ids']) - 1,
+        'session_start_time': state['started_at'],
+        'question_start_time': state['question_started_at'],
+        'answered_questions': state['answered'],
+    }
+
+    session_interface = app.session_interface
+    assert isinstance(session_interface, SecureCookieSessionInterface)
+    serializer = session_interface.get_signing_serializer(app)
+    assert serializer is not None
+    print(f'{len(state["question_ids"])} questions, all answered')
+    print(f'{"cookie":<8} {"bytes":>6} {"sign us":>8} {"verify us":>10}')
+    for name, data in (('legacy', legacy), ('id only', current)):
+        cookie = serializer.dumps(data)
+        sign = _median_us(lambda data=data: serializer.dumps(data), args.repeat)
+        verify = _median_us(lambda cookie=cookie: serializer.loads(cookie), args.repeat)
+        print(f'{name:<8} {len(cookie):>6} {sign:>8.1f} {verify:>10.1f}')
+
+    print(f'\n{"store":<9} {"GET /practice/question median ms":>33}')
+    for name, store in (('database', DatabasePracticeStore()), ('file', FilePracticeStore(f'{_TMP}/sessions'))):
+        with app.app_context():
+            store.save(current['practice_session_id'], {**state, 'index': 0})
+        practice.practice_store = store
+        client.get('/practice/question')  # warm up
+        samples = []
+        for _ in range(max(args.repeat // 10, 10)):
+            started = time.perf_counter()
+            assert client.get('/practice/question').status_code == 200
+            samples.append((time.perf_counter() - started) * 1000)
+        print(f'{name:<9} {statistics.median(samples):>33.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Time /progress/stats as a user's attempt history grows.
+
+Usage:
+    python scripts/bench_progress_stats.py
+    python scripts/bench_progress_stats.py --sizes 1000 10000 100000
+
+For each size, seeds a throwaway SQLite database with that many attempts
+for one user (spread over 60 days and all categories of the exam), then
+reports the median latency of the stats page next to the cost of the old
+approach — loading every attempt as an ORM object.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+_TMP = tempfile.mkdtemp(prefix='bench-stats-')
+os.environ.update({
+    'DEBUG': 'True',
+    'FLASK_SECRET_KEY': 'bench-only-secret',
+    'FORCE_HTTPS': 'false',
+    'DATABASE_URL': f'sqlite:///{_TMP}/bench.db',
+    'PRELOAD_QUESTIONS': 'false',
+})
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import app, exam_service  # noqa: E402
+from models import Attempt, User, db  # noqa: E402
+
+EXAM_ID = 'c_programming'
+
+
+def _seed(user_id: int, count: int) -> None:
+    categories = exam_service.get_category_ids_for_exam(EXAM_ID)
+    now = datetime.utcnow()
+    rng = random.Random(count)
+    # Insert in chronological order, like real traffic
+    offsets = sorted((rng.randint(0, 60 * 24 * 60) for _ in range(count)), reverse=True)
+    db.session.query(Attempt).delete()
+    db.session.execute(Attempt.__table__.insert(), [
+        {
+            'user_id': user_id,
+            'question_id': f'q{i % 700}',
+            'category': rng.choice(categories),
+            'exam_id': EXAM_ID,
+            'correct': rng.random() < 0.6,
+            'time_spent': rng.randint(5, 300),
+            'submitted_answer': 'A',
+            'hints_used': 0,
+            'timestamp': now - timedelta(minutes=offsets[i]),
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        user = User(name='Bench', email='bench@example.com',
+                    password_hash=generate_password_hash('bench-password'))
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    client.post('/auth/login', data={'email': 'bench@example.com', 'password': 'bench-password'})
+
+    print(f'{"attempts":>9} {"/progress/stats ms":>19} {"load all attempts ms":>21}')
+    for size in args.sizes:
+        with app.app_context():
+            _seed(user_id, size)
+
+        def page() -> None:
+            assert client.get('/progress/stats').status_code == 200
+
+        def load_all() -> None:
+            with app.app_context():
+                Attempt.query.filter_by(user_id=user_id, exam_id=EXAM_ID).all()
+
+        print(f'{size:>9} {_median_ms(page, args.repeat):>19.1f} {_median_ms(load_all, args.repeat):>21.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
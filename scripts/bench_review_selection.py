@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Time smart-mode selection as a user's spaced-repetition reviews grow.
+
+Usage:
+    python scripts/bench_review_selection.py
+    python scripts/bench_review_selection.py --sizes 1000 10000 50000
+
+For each size, seeds a throwaway SQLite database with that many reviewed
+questions for one user (a tenth of them due) and a pool with as many
+questions plus 200 never seen, then reports the median time of the due
+query and of a whole 20-question smart session.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+_TMP = tempfile.mkdtemp(prefix='bench-reviews-')
+os.environ.update({
+    'DEBUG': 'True',
+    'FLASK_SECRET_KEY': 'bench-only-secret',
+    'FORCE_HTTPS': 'false',
+    'DATABASE_URL': f'sqlite:///{_TMP}/bench.db',
+    'PRELOAD_QUESTIONS': 'false',
+})
+
+from app import app  # noqa: E402
+from models import QuestionReview, User, db  # noqa: E402
+from services.adaptive import AdaptiveLearningService  # noqa: E402
+from services.reviews import ReviewService  # noqa: E402
+
+EXAM = 'c_programming'
+CATEGORIES = [f'category_{i}' for i in range(8)]
+
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    print(f'{"reviews":>8} {"due query ms":>13} {"session ms":>11}')
+    with app.app_context():
+        for user_index, size in enumerate(args.sizes):
+            user = User(name='Bench', email=f'bench{user_index}@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+
+            now = datetime.utcnow()
+            db.session.execute(QuestionReview.__table__.insert(), [
+                {
+                    'user_id': user.id, 'exam_id': EXAM, 'question_id': f'q{i}',
+                    'ease': 2.5, 'interval_days': 6, 'repetitions': 2, 'last_correct': True,
+                    'last_reviewed_at': now - timedelta(days=6),
+                    # A tenth overdue, the rest due over the next weeks
+                    'due_at': now - timedelta(hours=1 + i) if i % 10 == 0 else now + timedelta(hours=1 + i % 500),
+                }
+                for i in range(size)
+            ])
+            db.session.commit()
+
+            pool: dict[str, list[dict]] = {cat: [] for cat in CATEGORIES}
+            for i in range(size + 200):
+                category = random.choice(CATEGORIES)
+                pool[category].append({'id': f'q{i}', 'category': category})
+
+            reviews = ReviewService(user.id, EXAM)
+            service = AdaptiveLearningService(user.id, categories=CATEGORIES, exam_id=EXAM)
+            due = _median_ms(lambda r=reviews: r.due_question_ids(limit=10), args.repeat)
+            session = _median_ms(lambda s=service, p=pool: s.generate_practice_session(p, 20), args.repeat)
+            print(f'{size:>8} {due:>13.3f} {session:>11.3f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Load-test concurrent answer submission against SQLite profiles.
+
+Usage:
+    python scripts/bench_sqlite_submit.py
+    python scripts/bench_sqlite_submit.py --workers 4 --clients 16 --seconds 10
+
+Starts the app under gunicorn once per ``SQLITE_PROFILE`` (``default`` and
+``production``) on a fresh database file, logs in one user per client
+thread, and has every client submit multiple-choice answers as fast as it
+can. Reports throughput, latency percentiles and failed requests (which
+is where "database is locked" shows up as HTTP 500s).
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.cookiejar
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+QUESTION_ID = 'div_001'
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _client(base: str, index: int) -> urllib.request.OpenerDirector:
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    email = f'load{index}@example.com'
+    form = {'name': f'Load {index}', 'email': email, 'password': 'load-test-pw', 'confirm_password': 'load-test-pw'}
+    opener.open(f'{base}/auth/register', urllib.parse.urlencode(form).encode())
+    opener.open(f'{base}/auth/login', urllib.parse.urlencode({'email': email, 'password': 'load-test-pw'}).encode())
+    return opener
+
+
+def _submit(opener: urllib.request.OpenerDirector, base: str) -> int:
+    request = urllib.request.Request(
+        f'{base}/practice/submit',
+        data=json.dumps({'question_id': QUESTION_ID, 'answer': 'A'}).encode(),
+        headers={'Content-Type': 'application/json'},
+    )
+    try:
+        with opener.open(request, timeout=30) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run(profile: str, workers: int, clients: int, seconds: float) -> dict:
+    port = _free_port()
+    base = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            'SQLITE_PROFILE': profile,
+            'DATABASE_URL': f'sqlite:///{tmp}/load.db',
+            'FLASK_SECRET_KEY': 'load-test-only-secret',
+            'FORCE_HTTPS': 'false',
+            'WRITE_BEHIND': 'false',
+            'SANDBOX_POOL_SIZE': '0',
+        }
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+            cwd=REPO_ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    urllib.request.urlopen(f'{base}/healthz', timeout=1)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline or server.poll() is not None:
+                        raise RuntimeError('gunicorn did not come up') from None
+                    time.sleep(0.2)
+
+            openers = [_client(base, i) for i in range(clients)]
+            latencies: list[float] = []
+            failures: list[int] = []
+            lock = threading.Lock()
+            stop_at = time.monotonic() + seconds
+
+            def load(opener: urllib.request.OpenerDirector) -> None:
+                while time.monotonic() < stop_at:
+                    started = time.perf_counter()
+                    status = _submit(opener, base)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        if status == 200:
+                            latencies.append(elapsed)
+                        else:
+                            failures.append(status)
+
+            threads = [threading.Thread(target=load, args=(opener,)) for opener in openers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    latencies.sort()
+    return {
+        'ok': len(latencies),
+        'failed': len(failures),
+        'throughput': len(latencies) / seconds,
+        'p50': statistics.median(latencies) if latencies else 0.0,
+        'p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--profiles', nargs='+', default=['default', 'production'])
+    args = parser.parse_args()
+
+    print(f'{"profile":<11} {"ok":>6} {"failed":>7} {"req/s":>7} {"p50 ms":>8} {"p95 ms":>8}')
+    for profile in args.profiles:
+        r = run(profile, args.workers, args.clients, args.seconds)
+        print(f'{profile:<11} {r["ok"]:>6} {r["failed"]:>7} {r["throughput"]:>7.1f} {r["p50"]:>8.1f} {r["p95"]:>8.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
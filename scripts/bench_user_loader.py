@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Count the SQL statements per page with and without the logged-in user cache.
+
+Usage:
+    python scripts/bench_user_loader.py
+    python scripts/bench_user_loader.py --repeat 50
+
+Logs one user in to a throwaway SQLite database and requests a few
+authenticated pages repeatedly, first loading the user from the database
+on every request (``USER_CACHE_TTL=0``), then through the cache. Prints
+the statements per request and the median latency of each page.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+_TMP = tempfile.mkdtemp(prefix='bench-users-')
+os.environ.update({
+    'DEBUG': 'True',
+    'FLASK_SECRET_KEY': 'bench-only-secret',
+    'FORCE_HTTPS': 'false',
+    'DATABASE_URL': f'sqlite:///{_TMP}/bench.db',
+    'PRELOAD_QUESTIONS': 'false',
+})
+
+from sqlalchemy import event  # noqa: E402
+
+import app as app_module  # noqa: E402
+from models import db  # noqa: E402
+from services.user_cache import UserCache  # noqa: E402
+
+PAGES = [
+    '/progress/dashboard',
+    '/progress/stats',
+    '/progress/api/progress',
+    '/auth/check-email?email=someone@example.com',
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = app_module.app
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'name': 'Bench', 'email': 'bench@example.com',
+        'password': 'bench-password', 'confirm_password': 'bench-password',
+    })
+    client.post('/auth/login', data={'email': 'bench@example.com', 'password': 'bench-password'})
+
+    statements = 0
+
+    def count(*_args) -> None:
+        nonlocal statements
+        statements += 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+
+    print(f'{"page":<45} {"mode":<9} {"queries/req":>11} {"median ms":>10}')
+    for page in PAGES:
+        for mode, cache in (('no cache', None), ('cache', UserCache(ttl_seconds=60))):
+            app_module.user_cache = cache
+            client.get(page)  # warm up (and fill the cache)
+            statements = 0
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                assert client.get(page).status_code == 200
+                samples.append((time.perf_counter() - started) * 1000)
+            print(f'{page:<45} {mode:<9} {statements / args.repeat:>11.1f} {statistics.median(samples):>10.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
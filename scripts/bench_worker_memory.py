@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Measure per-worker memory of gunicorn with and without ``preload_app``.
+
+Usage:
+    python scripts/bench_worker_memory.py               # 4 workers
+    python scripts/bench_worker_memory.py --workers 8
+
+Starts the app under gunicorn twice — once importing the app (and parsing
+the question corpus) in every worker, once in the master only — and
+prints each worker's RSS, PSS and private memory from
+``/proc/<pid>/smaps_rollup`` after startup. PSS (proportional set size)
+charges shared pages fractionally, so its sum over workers is what the
+host actually pays. Linux only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _memory_kb(pid: int) -> dict[str, int]:
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def _workers(master_pid: int) -> list[int]:
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def measure(preload: bool, workers: int, settle_seconds: float) -> list[dict[str, int]]:
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            'GUNICORN_PRELOAD': 'true' if preload else 'false',
+            'PRELOAD_QUESTIONS': 'true',
+            'DATABASE_URL': f'sqlite:///{tmp}/bench.db',
+            'FLASK_SECRET_KEY': 'bench-only-secret',
+            'SANDBOX_POOL_SIZE': '0',
+            'FORCE_HTTPS': 'false',
+        }
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+            cwd=REPO_ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    urllib.request.urlopen(f'http://127.0.0.1:{port}/healthz', timeout=1)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline or server.poll() is not None:
+                        raise RuntimeError('gunicorn did not come up') from None
+                    time.sleep(0.2)
+            # Give the remaining workers time to finish importing the app
+            time.sleep(settle_seconds)
+            return [_memory_kb(pid) for pid in _workers(server.pid)]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--settle', type=float, default=3.0,
+                        help='seconds to wait after the first worker answers')
+    args = parser.parse_args()
+
+    print(f'{"mode":<10} {"worker":>6} {"rss MiB":>9} {"pss MiB":>9} {"private MiB":>12}')
+    for preload in (False, True):
+        mode = 'preload' if preload else 'per-worker'
+        rows = measure(preload, args.workers, args.settle)
+        for i, row in enumerate(rows):
+            print(f'{mode:<10} {i:>6} {row["rss"] / 1024:>9.1f} {row["pss"] / 1024:>9.1f} '
+                  f'{row["private"] / 1024:>12.1f}')
+        print(f'{mode:<10} {"total":>6} {sum(r["rss"] for r in rows) / 1024:>9.1f} '
+              f'{sum(r["pss"] for r in rows) / 1024:>9.1f} '
+              f'{sum(r["private"] for r in rows) / 1024:>12.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
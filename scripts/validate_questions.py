@@ -4,6 +4,8 @@
 Usage:
     python scripts/validate_questions.py            # only fail on ERRORs
     python scripts/validate_questions.py --strict   # also fail on WARNINGs
+    python scripts/validate_questions.py --bundle-dir build/question_bundles
+                                                    # validate, then write per-exam bundles
 
 Walks every directory listed under ``exams[].id`` in ``exams.json``. Other
 top-level directories (e.g. ``old_categories``) are intentionally skipped
@@ -12,6 +14,10 @@ because they are not wired into the runtime.
 Exit codes:
     0 — clean (or only warnings, in non-strict mode)
     1 — at least one ERROR (always) or WARNING (with ``--strict``)
+
+With ``--bundle-dir``, a clean run also writes one precompiled bundle per
+wired exam (validated questions plus source file signatures) that
+``QuestionLoader`` loads at startup instead of parsing the JSON.
 """
 
 from __future__ import annotations
@@ -25,6 +31,7 @@ from pathlib import Path
 REPO_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(REPO_ROOT))
 
+from services.question_loader import QuestionLoader  # noqa: E402
 from services.question_validator import (  # noqa: E402
     LEVEL_ERROR,
     LEVEL_WARNING,
@@ -32,10 +39,24 @@ from services.question_validator import (  # noqa: E402
 )
 
 
-def _wired_exam_dirs(repo_root: Path) -> set[str]:
+def _wired_exams(repo_root: Path) -> list[dict]:
     with open(repo_root / 'exams.json', encoding='utf-8') as f:
         exams = json.load(f).get('exams', [])
-    return {e['id'] for e in exams if isinstance(e, dict) and 'id' in e}
+    return [e for e in exams if isinstance(e, dict) and 'id' in e]
+
+
+def _wired_exam_dirs(repo_root: Path) -> set[str]:
+    return {e['id'] for e in _wired_exams(repo_root)}
+
+
+def write_bundles(root: Path, bundle_dir: Path) -> None:
+    loader = QuestionLoader(str(root))
+    # The exams of the tree being bundled: its exams.json sits beside the questions root
+    for exam in _wired_exams(root.parent):
+        categories = [c['id'] for c in exam.get('categories', []) if isinstance(c, dict) and 'id' in c]
+        path = bundle_dir / f'{exam["id"]}.pickle'
+        count = loader.write_bundle(str(path), exam_id=exam['id'], categories=categories or None)
+        print(f'wrote {path} ({count} questions)', file=sys.stderr)
 
 
 def main() -> int:
@@ -46,6 +67,8 @@ def main() -> int:
                         help='questions root directory')
     parser.add_argument('--include-archive', action='store_true',
                         help='also validate top-level directories not in exams.json')
+    parser.add_argument('--bundle-dir',
+                        help='after a clean run, write a precompiled question bundle per exam here')
     args = parser.parse_args()
 
     root = Path(args.root)
@@ -75,6 +98,8 @@ def main() -> int:
         return 1
     if args.strict and warnings:
         return 1
+    if args.bundle_dir:
+        write_bundles(root, Path(args.bundle_dir))
     return 0
 
 
@@ -1,6 +1,35 @@
 import random
+from datetime import datetime
 
-from models import Progress, db
+from sqlalchemy import func
+
+from models import Progress
+from models.upsert import upsert
+from services.reviews import ReviewService
+
+
+class _Draw:
+    """Draws the items of a list in uniformly random order, without replacement.
+
+    A Fisher-Yates shuffle done lazily: each draw is O(1) and only the
+    swapped positions are recorded, so the list is neither copied nor
+    mutated.
+    """
+
+    __slots__ = ('items', 'left', '_moved')
+
+    def __init__(self, items: list):
+        self.items = items
+        self.left = len(items)
+        self._moved: dict[int, int] = {}
+
+    def next(self):
+        pick = random.randrange(self.left)
+        self.left -= 1
+        index = self._moved.get(pick, pick)
+        # The last undrawn position takes the drawn one's place
+        self._moved[pick] = self._moved.pop(self.left, self.left)
+        return self.items[index]
 
 
 class AdaptiveLearningService:
@@ -18,10 +47,16 @@ class AdaptiveLearningService:
         'programming_challenges'
     ]
 
-    def __init__(self, user_id: int, categories: list[str] = None, exam_id: str = None):
+    # At most this share of a smart session goes to questions due for review
+    MAX_DUE_SHARE = 0.5
+
+    def __init__(self, user_id: int, categories: list[str] = None, exam_id: str = None,
+                 difficulties: dict[str, float] | None = None):
         self.user_id = user_id
         self.categories = categories or self.DEFAULT_CATEGORIES
         self.exam_id = exam_id
+        # Calibrated question difficulties (see services/calibration.py), if any
+        self.difficulties = difficulties or {}
 
     def get_recommended_categories(self, categories: list[str] = None) -> list[str]:
         """
@@ -39,11 +74,16 @@ class AdaptiveLearningService:
         else:
             progress_records = Progress.query.filter_by(user_id=self.user_id).all()
 
+        return self._weakest({record.category: record.accuracy for record in progress_records}, categories)
+
+    @staticmethod
+    def _weakest(accuracy_by_category: dict[str, int], categories: list[str]) -> list[str]:
+        """The 3 lowest-accuracy categories out of ``categories``; unattempted ones count as 0%"""
         # Calculate accuracy for each category
         category_scores = {}
-        for record in progress_records:
-            if record.category in categories:
-                category_scores[record.category] = record.accuracy
+        for category, accuracy in accuracy_by_category.items():
+            if category in categories:
+                category_scores[category] = accuracy
 
         # Add categories with no attempts (0% accuracy)
         for category in categories:
@@ -60,6 +100,12 @@ class AdaptiveLearningService:
         """
         Generate an adaptive practice session
 
+        Questions due for spaced-repetition review come first (up to
+        MAX_DUE_SHARE of the session). Questions reviewed recently enough that
+        they are not due yet are only used when nothing else is left. With
+        calibrated difficulties the session runs from easiest to hardest
+        (uncalibrated questions count as average).
+
         Args:
             questions_pool: Dictionary mapping category -> list of questions
             session_size: Number of questions in the session
@@ -70,29 +116,34 @@ class AdaptiveLearningService:
         all_categories = list(questions_pool.keys()) or self.categories
         weak_categories = self.get_recommended_categories(all_categories)
 
+        due_questions, scheduled_ids = self._review_schedule(questions_pool, int(session_size * self.MAX_DUE_SHARE))
+        new_count = session_size - len(due_questions)
+
         # 70% weak areas, 30% review from other areas
-        weak_count = int(session_size * 0.7)
-        review_count = session_size - weak_count
+        weak_count = int(new_count * 0.7)
+        review_count = new_count - weak_count
 
-        session_questions = []
-        used_ids = set()
-        remaining = {cat: list(questions) for cat, questions in questions_pool.items()}
+        session_questions = list(due_questions)
+        used_ids = {q.get('id') for q in due_questions} | scheduled_ids
+        remaining = {cat: _Draw(questions) for cat, questions in questions_pool.items() if questions}
 
         def pick_unique(categories: list[str], count: int) -> list[dict]:
+            # Each pick: a category uniformly among those with unused questions,
+            # then a question uniformly among that category's unused ones
             picks = []
-            available = [cat for cat in categories if remaining.get(cat)]
+            available = [cat for cat in categories if cat in remaining and remaining[cat].left]
             while len(picks) < count and available:
-                category = random.choice(available)
-                candidates = [q for q in remaining[category] if q.get('id') not in used_ids]
-                if not candidates:
-                    available.remove(category)
-                    continue
-                question = random.choice(candidates)
-                picks.append(question)
-                used_ids.add(question.get('id'))
-                remaining[category].remove(question)
-                if not remaining[category]:
-                    available.remove(category)
+                slot = random.randrange(len(available))
+                draw = remaining[available[slot]]
+                while draw.left:
+                    question = draw.next()
+                    if question.get('id') not in used_ids:
+                        picks.append(question)
+                        used_ids.add(question.get('id'))
+                        break
+                if not draw.left:
+                    available[slot] = available[-1]
+                    available.pop()
             return picks
 
         # Select questions from weak categories
@@ -108,11 +159,39 @@ class AdaptiveLearningService:
                 pick_unique(all_categories, session_size - len(session_questions))
             )
 
+        # Only questions that are not due yet are left; serve them rather than a short session
+        if len(session_questions) < session_size and scheduled_ids:
+            used_ids = {q.get('id') for q in session_questions}
+            remaining = {cat: _Draw(questions) for cat, questions in questions_pool.items() if questions}
+            session_questions.extend(
+                pick_unique(all_categories, session_size - len(session_questions))
+            )
+
         # Shuffle to mix weak and review questions
         random.shuffle(session_questions)
+        if self.difficulties:
+            session_questions.sort(key=lambda q: self.difficulties.get(q.get('id'), 0.0))
 
         return session_questions[:session_size]
 
+    def _review_schedule(self, questions_pool: dict, due_limit: int) -> tuple[list[dict], set[str]]:
+        """Questions of the pool due for review (most overdue first) and the ids not due yet"""
+        if not self.exam_id:
+            return [], set()
+        reviews = ReviewService(self.user_id, self.exam_id)
+        due_ids = reviews.due_question_ids(limit=due_limit) if due_limit > 0 else []
+        scheduled_ids = reviews.scheduled_question_ids()
+        if not due_ids:
+            return [], scheduled_ids
+
+        wanted = set(due_ids)
+        found = {}
+        for questions in questions_pool.values():
+            for question in questions:
+                if question.get('id') in wanted:
+                    found.setdefault(question.get('id'), question)
+        return [found[question_id] for question_id in due_ids if question_id in found], scheduled_ids
+
     def get_progress_summary(self, categories: list[str] = None) -> dict:
         """
         Get overall progress summary for the user
@@ -127,20 +206,40 @@ class AdaptiveLearningService:
         else:
             progress_records = Progress.query.filter_by(user_id=self.user_id).all()
 
-        total_attempted = sum(p.total_attempted for p in progress_records)
-        total_correct = sum(p.total_correct for p in progress_records)
+        return self.summarize({
+            record.category: {
+                'attempted': record.total_attempted,
+                'correct': record.total_correct,
+                'last_practiced': record.last_practiced.isoformat() if record.last_practiced else None
+            }
+            for record in progress_records
+        }, categories)
+
+    def summarize(self, category_counts: dict[str, dict], categories: list[str] = None) -> dict:
+        """
+        Build the progress summary from per-category counts
+
+        Args:
+            category_counts: category -> {'attempted', 'correct', 'last_practiced'}
+
+        Returns:
+            Dictionary with progress statistics, as returned by get_progress_summary
+        """
+        total_attempted = sum(c['attempted'] for c in category_counts.values())
+        total_correct = sum(c['correct'] for c in category_counts.values())
 
         overall_accuracy = 0
         if total_attempted > 0:
             overall_accuracy = int((total_correct / total_attempted) * 100)
 
         category_progress = {}
-        for record in progress_records:
-            category_progress[record.category] = {
-                'attempted': record.total_attempted,
-                'correct': record.total_correct,
-                'accuracy': record.accuracy,
-                'last_practiced': record.last_practiced.isoformat() if record.last_practiced else None
+        for category, counts in category_counts.items():
+            attempted = counts['attempted'] or 0
+            category_progress[category] = {
+                'attempted': attempted,
+                'correct': counts['correct'],
+                'accuracy': int((counts['correct'] / attempted) * 100) if attempted else 0,
+                'last_practiced': counts['last_practiced']
             }
 
         # Add categories with no attempts
@@ -154,7 +253,9 @@ class AdaptiveLearningService:
                     'last_practiced': None
                 }
 
-        weak_areas = self.get_recommended_categories(categories)
+        weak_areas = self._weakest(
+            {category: data['accuracy'] for category, data in category_progress.items()}, categories
+        )
 
         return {
             'overall_accuracy': overall_accuracy,
@@ -182,35 +283,34 @@ class AdaptiveLearningService:
 
         return recommendations
 
-    def update_progress(self, category: str, correct: bool) -> None:
+    def add_progress(self, category: str, attempted: int, correct: int) -> None:
         """
-        Update progress after a question attempt
+        Add attempt counts to a category's progress
+
+        The counters are incremented with a single upsert in the current
+        transaction; the caller commits.
 
         Args:
             category: Question category
-            correct: Whether the answer was correct
+            attempted: Number of new attempts
+            correct: How many of them were correct
         """
-        filter_kwargs = dict(user_id=self.user_id, category=category)
-        if self.exam_id:
-            filter_kwargs['exam_id'] = self.exam_id
-
-        progress = Progress.query.filter_by(**filter_kwargs).first()
-
-        if not progress:
-            progress = Progress(
+        table = Progress.__table__
+        now = datetime.utcnow()
+        upsert(
+            table,
+            values=dict(
                 user_id=self.user_id,
                 category=category,
                 exam_id=self.exam_id or 'c_programming',
-                total_attempted=0,
-                total_correct=0
-            )
-            db.session.add(progress)
-
-        progress.total_attempted = (progress.total_attempted or 0) + 1
-        if correct:
-            progress.total_correct = (progress.total_correct or 0) + 1
-
-        from datetime import datetime
-        progress.last_practiced = datetime.utcnow()
-
-        db.session.commit()
+                total_attempted=attempted,
+                total_correct=correct,
+                last_practiced=now,
+            ),
+            conflict_columns=['user_id', 'category', 'exam_id'],
+            set_=dict(
+                total_attempted=func.coalesce(table.c.total_attempted, 0) + attempted,
+                total_correct=func.coalesce(table.c.total_correct, 0) + correct,
+                last_practiced=now,
+            ),
+        )
@@ -0,0 +1,200 @@
+import math
+import os
+import random
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no host-wide limit
+    fcntl = None  # type: ignore[assignment]
+
+# How often a queued caller re-checks for a free slot.
+_POLL_INTERVAL_SECONDS = 0.05
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+COUNTERS = (
+    'admitted', 'queued', 'rejected', 'timed_out',
+    'wait_seconds_total', 'wait_seconds_max', 'hold_seconds_total',
+)
+
+
+def pid_alive(pid: int) -> bool:
+    """Whether a process with ``pid`` exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class AdmissionRejected(Exception):
+    """Raised when no slot is free and the wait queue is full (or the wait timed out)."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'Compiler busy, retry in {retry_after} s')
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Host-wide limit on concurrent compiler processes.
+
+    Slots are ``flock``-ed files in ``lock_dir``, so the limit is shared by
+    every gunicorn worker (and sandbox process) on the machine, and a
+    crashed holder releases its slot automatically. Callers that find no
+    free slot take one of ``max_waiting`` waiter files and poll for up to
+    ``max_wait_seconds``; when even the waiter files are taken the caller is
+    rejected immediately with a retry hint instead of queueing unboundedly.
+
+    Admission happens inside the sandbox processes when the pool is on, so
+    the counters are kept in a small SQLite file in ``lock_dir`` (as the
+    compile cache keeps its own) and every process reports the same totals.
+    A holder writes its pid into the file it locked, which lets ``stats``
+    count busy slots without touching the locks.
+    """
+
+    def __init__(self, lock_dir: str, max_concurrent: int, max_waiting: int, max_wait_seconds: float):
+        self.lock_dir = lock_dir
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait_seconds = max_wait_seconds
+        os.makedirs(lock_dir, exist_ok=True)
+        self._slot_paths = [os.path.join(lock_dir, f'slot-{i}.lock') for i in range(max_concurrent)]
+        self._waiter_paths = [os.path.join(lock_dir, f'waiter-{i}.lock') for i in range(max_waiting)]
+        self.counters_path = os.path.join(lock_dir, 'counters.sqlite3')
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            conn.executemany(
+                'INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)',
+                [(name,) for name in COUNTERS],
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.counters_path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _try_lock_any(paths: list[str]) -> int | None:
+        """Lock the first free file of ``paths`` (probing from a random offset)."""
+        if not paths:
+            return None
+        offset = random.randrange(len(paths))
+        for i in range(len(paths)):
+            fd = os.open(paths[(offset + i) % len(paths)], os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, str(os.getpid()).encode(), 0)
+            return fd
+        return None
+
+    @staticmethod
+    def _release(fd: int) -> None:
+        os.ftruncate(fd, 0)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _counters(self) -> dict[str, float]:
+        with self._connect() as conn:
+            return dict(conn.execute('SELECT name, value FROM counters').fetchall())
+
+    def retry_after(self) -> int:
+        """Seconds a rejected caller should back off, from the observed slot hold time."""
+        counters = self._counters()
+        admitted = counters['admitted']
+        avg_hold = counters['hold_seconds_total'] / admitted if admitted else 1.0
+        backlog = (self.max_waiting + self.max_concurrent) / max(self.max_concurrent, 1)
+        return max(1, min(math.ceil(avg_hold * backlog), math.ceil(self.max_wait_seconds) or 1))
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._connect() as conn:
+            conn.execute('UPDATE counters SET value = value + ? WHERE name = ?', (amount, name))
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one compiler slot for the duration of the ``with`` block."""
+        if fcntl is None:
+            yield
+            return
+        started = time.monotonic()
+        fd = self._try_lock_any(self._slot_paths)
+        if fd is None:
+            waiter = self._try_lock_any(self._waiter_paths)
+            if waiter is None:
+                self._count('rejected')
+                raise AdmissionRejected(self.retry_after())
+            self._count('queued')
+            try:
+                deadline = started + self.max_wait_seconds
+                while fd is None and time.monotonic() < deadline:
+                    time.sleep(_POLL_INTERVAL_SECONDS)
+                    fd = self._try_lock_any(self._slot_paths)
+            finally:
+                self._release(waiter)
+            if fd is None:
+                self._count('timed_out')
+                raise AdmissionRejected(self.retry_after())
+
+        admitted = time.monotonic()
+        waited = admitted - started
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'admitted'")
+            conn.execute("UPDATE counters SET value = value + ? WHERE name = 'wait_seconds_total'", (waited,))
+            conn.execute("UPDATE counters SET value = MAX(value, ?) WHERE name = 'wait_seconds_max'", (waited,))
+            conn.execute('COMMIT')
+        try:
+            yield
+        finally:
+            self._release(fd)
+            self._count('hold_seconds_total', time.monotonic() - admitted)
+
+    @staticmethod
+    def _held(paths: list[str]) -> int:
+        """Files of ``paths`` whose holder is alive, read from the pid each holder writes."""
+        held = 0
+        for path in paths:
+            try:
+                with open(path) as f:
+                    pid = f.read().strip()
+            except FileNotFoundError:
+                continue
+            # A holder that crashed leaves its pid behind, but no longer holds the lock
+            if pid.isdigit() and pid_alive(int(pid)):
+                held += 1
+        return held
+
+    def stats(self) -> dict:
+        """Host-wide gauges (slots in use, queue depth) and counters."""
+        counters = self._counters()
+        admitted = int(counters['admitted'])
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_waiting': self.max_waiting,
+            'in_use': self._held(self._slot_paths),
+            'queue_depth': self._held(self._waiter_paths),
+            'admitted': admitted,
+            'queued': int(counters['queued']),
+            'rejected': int(counters['rejected']),
+            'timed_out': int(counters['timed_out']),
+            'wait_seconds_avg': counters['wait_seconds_total'] / admitted if admitted else 0.0,
+            'wait_seconds_max': counters['wait_seconds_max'],
+        }
@@ -0,0 +1,183 @@
+"""Offline item-difficulty calibration over the attempts table (``flask calibrate-difficulty``).
+
+Fits a Rasch (1PL IRT) model per exam: a student with ability ``theta``
+answers a question with difficulty ``b`` correctly with probability
+``1 / (1 + exp(b - theta))``. Abilities are fitted jointly so a question is
+not rated hard just because weak students happened to answer it; only the
+difficulties are stored.
+
+Needs NumPy (``requirements-calibration.txt``); the web app does not.
+"""
+
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+
+from models import Attempt, QuestionDifficulty, db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 20_000
+DEFAULT_ITERATIONS = 30
+# Standard deviation of the normal prior on abilities and difficulties, in
+# logits. Keeps questions everyone (or no one) got right finite.
+PRIOR_SD = 2.0
+# Largest change of one parameter per Newton step, in logits
+MAX_STEP = 1.0
+TOLERANCE = 1e-3
+
+
+class _Responses:
+    """One exam's attempts as (user, question, correct) index arrays spilled to disk.
+
+    Memory use is bounded by the chunk size plus the id maps, whatever the
+    number of attempts; the fitting passes read the files back as memmaps.
+    """
+
+    def __init__(self, directory: str):
+        self._paths = {name: os.path.join(directory, f'{name}.bin') for name in ('users', 'questions', 'correct')}
+        self._files = {name: open(path, 'wb') for name, path in self._paths.items()}
+        self.user_index: dict[int, int] = {}
+        self.question_index: dict[str, int] = {}
+        self.count = 0
+
+    @staticmethod
+    def _codes(values: tuple, index: dict) -> np.ndarray:
+        """Dense indexes of ``values``, extending ``index`` with the ones not seen before"""
+        unique, inverse = np.unique(np.asarray(values), return_inverse=True)
+        codes = np.fromiter((index.setdefault(value, len(index)) for value in unique.tolist()), np.int32, len(unique))
+        return codes[inverse]
+
+    def append(self, rows: list[tuple]) -> None:
+        users, questions, correct = zip(*rows, strict=True)
+        self._codes(users, self.user_index).tofile(self._files['users'])
+        self._codes(questions, self.question_index).tofile(self._files['questions'])
+        np.asarray(correct, dtype=np.int8).tofile(self._files['correct'])
+        self.count += len(rows)
+
+    def close(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        for f in self._files.values():
+            f.close()
+        if not self.count:
+            empty = np.empty(0, dtype=np.int32)
+            return empty, empty, np.empty(0, dtype=np.int8)
+        return (
+            np.memmap(self._paths['users'], dtype=np.int32, mode='r'),
+            np.memmap(self._paths['questions'], dtype=np.int32, mode='r'),
+            np.memmap(self._paths['correct'], dtype=np.int8, mode='r'),
+        )
+
+
+def fit_rasch(users: np.ndarray, questions: np.ndarray, correct: np.ndarray, n_users: int, n_questions: int,
+              chunk_size: int = DEFAULT_CHUNK_SIZE, iterations: int = DEFAULT_ITERATIONS
+              ) -> tuple[np.ndarray, np.ndarray]:
+    """Abilities and difficulties by joint maximum a posteriori estimation.
+
+    Each iteration is one chunked pass accumulating the per-user and
+    per-question gradient and information with ``np.bincount``, followed by
+    a Newton step for every parameter at once.
+    """
+    theta = np.zeros(n_users)
+    b = np.zeros(n_questions)
+    prior = 1 / PRIOR_SD ** 2
+    for iteration in range(iterations):
+        residual_u = np.zeros(n_users)
+        info_u = np.zeros(n_users)
+        residual_q = np.zeros(n_questions)
+        info_q = np.zeros(n_questions)
+        for start in range(0, len(correct), chunk_size):
+            u = users[start:start + chunk_size]
+            q = questions[start:start + chunk_size]
+            p = 1 / (1 + np.exp(b[q] - theta[u]))
+            residual = correct[start:start + chunk_size] - p
+            info = p * (1 - p)
+            residual_u += np.bincount(u, residual, n_users)
+            info_u += np.bincount(u, info, n_users)
+            residual_q += np.bincount(q, residual, n_questions)
+            info_q += np.bincount(q, info, n_questions)
+
+        step_theta = np.clip((residual_u - theta * prior) / (info_u + prior), -MAX_STEP, MAX_STEP)
+        step_b = np.clip(-(residual_q + b * prior) / (info_q + prior), -MAX_STEP, MAX_STEP)
+        theta += step_theta
+        b += step_b
+        largest = max(np.abs(step_theta).max(initial=0), np.abs(step_b).max(initial=0))
+        if largest < TOLERANCE:
+            logger.info('Converged after %s iterations', iteration + 1)
+            break
+    return theta, b
+
+
+def calibrate_exam(exam_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   iterations: int = DEFAULT_ITERATIONS) -> int:
+    """Fit one exam's question difficulties and replace its rows in ``question_difficulty``.
+
+    Streams the exam's attempts in chunks of ``chunk_size`` rows. Commits;
+    returns the number of questions calibrated.
+    """
+    stmt = select(Attempt.user_id, Attempt.question_id, Attempt.correct).where(Attempt.exam_id == exam_id)
+    with tempfile.TemporaryDirectory(prefix='calibration-') as directory:
+        responses = _Responses(directory)
+        try:
+            with db.engine.connect() as conn:
+                # Plain driver tuples: building a SQLAlchemy Row per attempt
+                # costs more than the whole fit. A named cursor streams from
+                # the server on PostgreSQL.
+                sql = str(stmt.compile(conn, compile_kwargs={'literal_binds': True}))
+                driver = conn.connection.driver_connection
+                assert driver is not None
+                cursor = driver.cursor(name='calibration') if conn.dialect.name == 'postgresql' else driver.cursor()
+                try:
+                    cursor.execute(sql)
+                    while rows := cursor.fetchmany(chunk_size):
+                        responses.append(rows)
+                finally:
+                    cursor.close()
+        finally:
+            users, questions, correct = responses.close()
+
+        n_questions = len(responses.question_index)
+        _theta, b = fit_rasch(users, questions, correct, len(responses.user_index), n_questions,
+                              chunk_size=chunk_size, iterations=iterations)
+        attempts = np.zeros(n_questions, dtype=np.int64)
+        correct_count = np.zeros(n_questions)
+        for start in range(0, len(correct), chunk_size):
+            q = questions[start:start + chunk_size]
+            attempts += np.bincount(q, minlength=n_questions)
+            correct_count += np.bincount(q, correct[start:start + chunk_size], n_questions)
+        del users, questions, correct  # release the memmaps before the directory goes
+
+    now = datetime.utcnow()
+    QuestionDifficulty.query.filter_by(exam_id=exam_id).delete()
+    if n_questions:
+        db.session.execute(QuestionDifficulty.__table__.insert(), [
+            {
+                'exam_id': exam_id,
+                'question_id': question_id,
+                'difficulty': float(b[index]),
+                'attempts': int(attempts[index]),
+                'correct_rate': float(correct_count[index] / attempts[index]),
+                'calibrated_at': now,
+            }
+            for question_id, index in responses.question_index.items()
+        ])
+    db.session.commit()
+    return n_questions
+
+
+def calibrate(exam_ids: list[str] | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              iterations: int = DEFAULT_ITERATIONS) -> dict[str, int]:
+    """Calibrate the given exams (default: every exam with attempts); exam id -> questions calibrated."""
+    if exam_ids is None:
+        exam_ids = list(db.session.scalars(select(Attempt.exam_id).distinct()).all())
+    calibrated = {}
+    for exam_id in exam_ids:
+        started = time.perf_counter()
+        calibrated[exam_id] = calibrate_exam(exam_id, chunk_size=chunk_size, iterations=iterations)
+        logger.info('Calibrated %s questions of %s in %.1fs',
+                    calibrated[exam_id], exam_id, time.perf_counter() - started)
+    return calibrated
@@ -0,0 +1,161 @@
+import functools
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+COUNTERS = ('hits', 'misses', 'stores', 'evictions')
+
+
+@functools.lru_cache(maxsize=1)
+def compiler_version(compiler: str = 'gcc') -> str:
+    """Identify the installed compiler so an upgrade invalidates cached binaries."""
+    try:
+        result = subprocess.run([compiler, '--version'], capture_output=True, text=True, timeout=5)
+        return result.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+
+class CompileCache:
+    """Content-addressed, size-bounded LRU cache of compiled binaries.
+
+    Binaries live as files named by their key inside ``cache_dir``; a small
+    SQLite index alongside them tracks sizes, recency and hit/miss/eviction
+    counters. Everything is on disk, so the cache (and its counters) is shared
+    by all gunicorn workers on the host and survives worker restarts.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, 'index.sqlite3')
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            conn.executemany(
+                'INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)',
+                [(name,) for name in COUNTERS],
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A short-lived connection per operation keeps the cache safe to use
+        # from grading threads and across fork without any shared handles.
+        conn = sqlite3.connect(self.index_path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    @staticmethod
+    def key_for(source: str, flags: Sequence[str], compiler: str = 'gcc') -> str:
+        """Hash of compiler version, flags and source — the cache identity of a binary."""
+        digest = hashlib.sha256()
+        for part in (compiler_version(compiler), '\0'.join(flags), source):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def fetch(self, key: str, dest: str) -> bool:
+        """Copy the cached binary for ``key`` to ``dest``. Returns False on a miss."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                try:
+                    # Copy rather than link: a student program must never be
+                    # able to touch the inode other submissions will execute.
+                    shutil.copyfile(self._entry_path(key), dest)
+                    os.chmod(dest, 0o700)
+                except OSError:
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    row = None
+            if row is None:
+                self._bump(conn, 'misses')
+                return False
+            conn.execute('UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), key))
+            self._bump(conn, 'hits')
+            return True
+
+    def store(self, key: str, src: str) -> None:
+        """Add a freshly compiled binary to the cache, evicting LRU entries if needed."""
+        try:
+            size = os.path.getsize(src)
+            if size > self.max_bytes:
+                return
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.incoming-')
+            os.close(fd)
+            shutil.copyfile(src, tmp_path)
+            os.chmod(tmp_path, 0o500)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError as e:
+            logger.warning('Could not store compiled binary in cache: %s', e)
+            return
+
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, size, last_used) VALUES (?, ?, ?)',
+                (key, size, time.time()),
+            )
+            self._bump(conn, 'stores')
+            self._evict(conn)
+            conn.execute('COMMIT')
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        while total > self.max_bytes:
+            row = conn.execute('SELECT key, size FROM entries ORDER BY last_used LIMIT 1').fetchone()
+            if row is None:
+                break
+            key, size = row
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            try:
+                os.remove(self._entry_path(key))
+            except FileNotFoundError:
+                pass
+            total -= size
+            self._bump(conn, 'evictions')
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, name: str) -> None:
+        conn.execute('UPDATE counters SET value = value + 1 WHERE name = ?', (name,))
+
+    def stats(self) -> dict:
+        """Host-wide counters plus current entry count and size."""
+        with self._connect() as conn:
+            counters = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+            entries, size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()
+        return {
+            **{name: counters.get(name, 0) for name in COUNTERS},
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+        }
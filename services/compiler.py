@@ -1,14 +1,71 @@
 import os
+import shutil
 import subprocess
 import tempfile
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING
+
+from services.admission import AdmissionController, AdmissionRejected
+from services.compile_cache import CompileCache
+from services.prelude import HEADER_NAME, PreludeCache, split_prelude
+
+if TYPE_CHECKING:
+    from services.sandbox_pool import SandboxPool
+
+GCC_FLAGS = ['-Wall', '-Wextra', '-std=c11']
+DEFAULT_PARALLEL_RUNS = 4
+
+# Result stages meaning "not attempted, the runner is saturated" rather than a verdict
+BUSY_STAGES = frozenset({'admission', 'queue', 'sandbox'})
+
+
+def _limited(exec_file: str, max_memory_mb: int) -> list[str]:
+    """Command running ``exec_file`` under an address-space limit (Unix only)
+
+    The limit is set by a shell that then execs the program, rather than
+    with ``preexec_fn``, which is unsafe in a threaded parent and runs are
+    started from worker threads.
+    """
+    if os.name == 'nt':
+        return [exec_file]
+    # Silently unlimited where the limit cannot be lowered, as before
+    return ['sh', '-c', f'ulimit -v {max_memory_mb * 1024} 2>/dev/null; exec "$0"', exec_file]
 
 
 class CompilerService:
     """Service for safely compiling and running C code"""
 
-    def __init__(self, timeout: int = 3, max_memory_mb: int = 50):
+    def __init__(
+        self,
+        timeout: int = 3,
+        max_memory_mb: int = 50,
+        max_parallel_runs: int = DEFAULT_PARALLEL_RUNS,
+        cache: CompileCache | None = None,
+        scratch_dir: str | None = None,
+        pool: 'SandboxPool | None' = None,
+        admission: AdmissionController | None = None,
+        preludes: PreludeCache | None = None,
+    ):
         self.timeout = timeout
         self.max_memory_mb = max_memory_mb
+        self.max_parallel_runs = max(1, max_parallel_runs)
+        self.cache = cache
+        # Reused working directory (sandbox workers); None means a fresh tempdir per job
+        self.scratch_dir = scratch_dir
+        # When set, jobs are shipped to pre-started sandbox processes instead of run here
+        self.pool = pool
+        # Host-wide cap on concurrent gcc processes
+        self.admission = admission
+        # Precompiled headers for the shared #include prelude of templates (looked up, never built here)
+        self.preludes = preludes
+
+    def prepare_preludes(self, templates: Iterable[str]) -> int:
+        """Precompile the #include preludes of question templates; returns how many are ready"""
+        if self.preludes is None:
+            return 0
+        return self.preludes.prepare_templates(templates, GCC_FLAGS)
 
     def compile_and_run(self, code: str, input_data: str = "") -> dict:
         """
@@ -21,34 +78,120 @@ class CompilerService:
         Returns:
             Dictionary with compilation/execution results
         """
-        with tempfile.TemporaryDirectory() as tmpdir:
+        return self.compile_and_run_many(code, [input_data])[0]
+
+    def compile_and_run_many(self, code: str, inputs: list[str]) -> list[dict]:
+        """
+        Compile C code once and run the resulting binary once per input
+
+        Runs are executed concurrently (bounded by ``max_parallel_runs``);
+        the returned list is in the same order as ``inputs``. If writing or
+        compiling fails, that failure is returned for every input.
+
+        Args:
+            code: C source code to compile and run
+            inputs: stdin payloads, one program run per entry
+
+        Returns:
+            List of compilation/execution result dictionaries
+        """
+        if not inputs:
+            return []
+
+        if self.pool is not None:
+            return self.pool.run_job(code, inputs)
+
+        with self._workspace() as tmpdir:
             code_file = os.path.join(tmpdir, 'code.c')
             exec_file = os.path.join(tmpdir, 'program')
 
-            # Write code to file
-            try:
-                with open(code_file, 'w') as f:
-                    f.write(code)
-            except Exception as e:
-                return {
-                    'success': False,
-                    'stage': 'write',
-                    'error': f'Failed to write code: {str(e)}'
-                }
-
-            # Compile the code
-            compile_result = self._compile(code_file, exec_file)
+            # Compile the code, or reuse an identical earlier build
+            compile_result = self._compile_cached(code, code_file, exec_file)
             if not compile_result['success']:
-                return compile_result
+                return [dict(compile_result) for _ in inputs]
+
+            # Run the compiled program against every input
+            if len(inputs) == 1:
+                return [self._run(exec_file, inputs[0])]
 
-            # Run the compiled program
-            return self._run(exec_file, input_data)
+            workers = min(len(inputs), self.max_parallel_runs)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(lambda data: self._run(exec_file, data), inputs))
+
+    @contextmanager
+    def _workspace(self) -> Iterator[str]:
+        """Directory for one job's source and binary, emptied afterwards"""
+        if self.scratch_dir is None:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                yield tmpdir
+            return
+
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        try:
+            yield self.scratch_dir
+        finally:
+            for entry in os.scandir(self.scratch_dir):
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+    def _compile_cached(self, code: str, code_file: str, exec_file: str) -> dict:
+        """Produce ``exec_file`` from ``code``, going through the compile cache if configured"""
+        key = None
+        if self.cache is not None:
+            key = self.cache.key_for(code, GCC_FLAGS)
+            if self.cache.fetch(key, exec_file):
+                return {'success': True, 'cached': True}
+
+        try:
+            with self.admission.slot() if self.admission is not None else nullcontext():
+                result = self._write_and_compile(code, code_file, exec_file)
+        except AdmissionRejected as e:
+            return {
+                'success': False,
+                'stage': 'admission',
+                'error': str(e),
+                'retry_after': e.retry_after
+            }
 
-    def _compile(self, code_file: str, exec_file: str) -> dict:
+        if result['success'] and self.cache is not None and key is not None:
+            self.cache.store(key, exec_file)
+        return result
+
+    def _write_and_compile(self, code: str, code_file: str, exec_file: str) -> dict:
+        """Write ``code`` to disk and compile it, using a precompiled prelude when possible"""
+        extra_flags: list[str] = []
+        source = code
+        if self.preludes is not None:
+            prelude, rest, prelude_lines = split_prelude(code)
+            pch_dir = self.preludes.lookup(prelude, GCC_FLAGS) if prelude else None
+            if pch_dir is not None:
+                # #line keeps diagnostics pointing at the student's original line numbers
+                source = f'#include "{HEADER_NAME}"\n#line {prelude_lines + 1} "{code_file}"\n{rest}'
+                extra_flags = ['-I', pch_dir, '-Winvalid-pch']
+
+        # Write code to file
+        try:
+            with open(code_file, 'w') as f:
+                f.write(source)
+        except Exception as e:
+            return {
+                'success': False,
+                'stage': 'write',
+                'error': f'Failed to write code: {str(e)}'
+            }
+
+        return self._compile(code_file, exec_file, extra_flags)
+
+    def _compile(self, code_file: str, exec_file: str, extra_flags: list[str] | None = None) -> dict:
         """Compile C code with gcc"""
         try:
             result = subprocess.run(
-                ['gcc', '-Wall', '-Wextra', '-std=c11', '-o', exec_file, code_file],
+                ['gcc', *GCC_FLAGS, *(extra_flags or []), '-o', exec_file, code_file],
                 capture_output=True,
                 timeout=self.timeout,
                 text=True
@@ -89,23 +232,12 @@ class CompilerService:
     def _run(self, exec_file: str, input_data: str = "") -> dict:
         """Run compiled program with resource limits"""
         try:
-            # Set resource limits (Unix-like systems)
-            def set_limits():
-                # Memory limit (in bytes)
-                try:
-                    import resource
-                    max_memory = self.max_memory_mb * 1024 * 1024
-                    resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
-                except (ImportError, ValueError, OSError):
-                    pass  # Resource limits not available on all systems
-
             result = subprocess.run(
-                [exec_file],
+                _limited(exec_file, self.max_memory_mb),
                 input=input_data,
                 capture_output=True,
                 timeout=self.timeout,
-                text=True,
-                preexec_fn=set_limits if os.name != 'nt' else None  # Unix only
+                text=True
             )
 
             return {
@@ -133,6 +265,14 @@ class CompilerService:
                 'stderr': ''
             }
 
+    def stats(self) -> dict:
+        """Operational counters for the metrics endpoint"""
+        return {
+            'cache': self.cache.stats() if self.cache is not None else None,
+            'pool': self.pool.stats() if self.pool is not None else None,
+            'admission': self.admission.stats() if self.admission is not None else None,
+        }
+
     def validate_syntax(self, code: str) -> dict:
         """Quick syntax validation without running"""
         with tempfile.TemporaryDirectory() as tmpdir:
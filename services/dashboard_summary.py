@@ -0,0 +1,163 @@
+import json
+from datetime import date, datetime
+
+from sqlalchemy import case, func, select, update
+
+from models import Attempt, UserExamStats, db
+from models.upsert import upsert
+from services.streaks import StreakService
+
+# Latest attempts kept in the summary for the dashboard's activity table
+RECENT_ATTEMPTS = 10
+
+
+def _recent_entry(question_id: str, category: str, correct: bool, time_spent: int | None,
+                  timestamp: datetime) -> dict:
+    return {
+        'question_id': question_id,
+        'category': category,
+        'correct': bool(correct),
+        'time_spent': time_spent,
+        'timestamp': timestamp.isoformat(),
+    }
+
+
+class DashboardSummaryService:
+    """The dashboard's numbers for one user and exam, materialized in ``UserExamStats``.
+
+    Totals, per-category counts and the latest attempts are folded into the
+    stats row as attempts are recorded (:meth:`record`, in the same
+    transaction), so the dashboard renders from that one row. Rows from
+    before the summary existed have ``category_progress`` NULL and are
+    summarized from the attempt history on first use; :meth:`rebuild` does
+    the same for any row (used by the ``rebuild-summaries`` command).
+    """
+
+    def __init__(self, user_id: int, exam_id: str):
+        self.user_id = user_id
+        self.exam_id = exam_id
+
+    def _where(self):
+        table = UserExamStats.__table__
+        return (table.c.user_id == self.user_id) & (table.c.exam_id == self.exam_id)
+
+    def _from_history(self) -> dict:
+        """Summary column values recomputed from the attempt history."""
+        filters = (Attempt.user_id == self.user_id, Attempt.exam_id == self.exam_id)
+        rows = db.session.query(
+            Attempt.category,
+            func.count(Attempt.id),
+            func.sum(case((Attempt.correct, 1), else_=0)),
+            func.max(Attempt.timestamp),
+        ).filter(*filters).group_by(Attempt.category).order_by(func.min(Attempt.id)).all()
+        category_progress = {
+            category: {
+                'attempted': total,
+                'correct': int(correct or 0),
+                'last_practiced': last.isoformat() if last else None,
+            }
+            for category, total, correct, last in rows
+        }
+        recent = db.session.query(
+            Attempt.question_id, Attempt.category, Attempt.correct, Attempt.time_spent, Attempt.timestamp
+        ).filter(*filters).order_by(Attempt.timestamp.desc()).limit(RECENT_ATTEMPTS).all()
+        return {
+            'total_attempted': sum(c['attempted'] for c in category_progress.values()),
+            'total_correct': sum(c['correct'] for c in category_progress.values()),
+            'category_progress': json.dumps(category_progress),
+            'recent_attempts': json.dumps([_recent_entry(*row) for row in recent if row.timestamp]),
+            'last_attempt_at': recent[0].timestamp if recent else None,
+        }
+
+    def record(self, entries: list[dict]) -> None:
+        """Fold new attempts (see ``apply_attempts``) into the summary. Does not commit.
+
+        Must run after ``StreakService.record_activity`` for the same user and
+        exam in the same transaction, once the attempts are inserted: that
+        upsert creates the stats row and holds its write lock, so concurrent
+        writers fold their attempts in one after another.
+        """
+        table = UserExamStats.__table__
+        row = db.session.execute(select(
+            table.c.total_attempted, table.c.total_correct, table.c.category_progress,
+            table.c.recent_attempts, table.c.last_attempt_at,
+        ).where(self._where())).one()
+        if row.category_progress is None:
+            # Not summarized yet: the history already includes these attempts
+            db.session.execute(update(table).where(self._where()).values(**self._from_history()))
+            return
+
+        category_progress = json.loads(row.category_progress)
+        recent = json.loads(row.recent_attempts or '[]')
+        last_attempt_at = row.last_attempt_at
+        for entry in entries:
+            timestamp = datetime.fromisoformat(entry['timestamp'])
+            counts = category_progress.setdefault(
+                entry['category'], {'attempted': 0, 'correct': 0, 'last_practiced': None}
+            )
+            counts['attempted'] += 1
+            counts['correct'] += 1 if entry['correct'] else 0
+            if counts['last_practiced'] is None or counts['last_practiced'] < timestamp.isoformat():
+                counts['last_practiced'] = timestamp.isoformat()
+            recent.append(_recent_entry(
+                entry['question_id'], entry['category'], entry['correct'], entry['time_spent'], timestamp
+            ))
+            if last_attempt_at is None or timestamp > last_attempt_at:
+                last_attempt_at = timestamp
+        recent.sort(key=lambda attempt: attempt['timestamp'], reverse=True)
+
+        db.session.execute(update(table).where(self._where()).values(
+            total_attempted=row.total_attempted + len(entries),
+            total_correct=row.total_correct + sum(1 for e in entries if e['correct']),
+            category_progress=json.dumps(category_progress),
+            recent_attempts=json.dumps(recent[:RECENT_ATTEMPTS]),
+            last_attempt_at=last_attempt_at,
+        ))
+
+    def rebuild(self) -> bool:
+        """Recompute the summary and streak from the attempt history. Does not commit.
+
+        Returns whether the stored summary differed from the recomputed one.
+        """
+        stats = StreakService(self.user_id, self.exam_id).rebuild()
+        db.session.flush()
+        fresh = self._from_history()
+        stale = (
+            stats.total_attempted != fresh['total_attempted']
+            or stats.total_correct != fresh['total_correct']
+            or stats.last_attempt_at != fresh['last_attempt_at']
+            or stats.category_progress is None
+            or json.loads(stats.category_progress) != json.loads(fresh['category_progress'])
+            or sorted(json.loads(stats.recent_attempts or '[]'), key=json.dumps)
+            != sorted(json.loads(fresh['recent_attempts']), key=json.dumps)
+        )
+        for name, value in fresh.items():
+            setattr(stats, name, value)
+        return stale
+
+    def read(self, today: date | None = None) -> dict:
+        """Per-category counts, latest attempts and current streak from the summary row."""
+        query = UserExamStats.query.filter_by(user_id=self.user_id, exam_id=self.exam_id)
+        stats = query.first()
+        if stats is None or stats.category_progress is None:
+            # Summarize from the history with the write path's upsert, leaving
+            # a row a concurrent submit has summarized in the meantime alone
+            table = UserExamStats.__table__
+            fresh = {**StreakService(self.user_id, self.exam_id).from_history(), **self._from_history()}
+            upsert(
+                table,
+                values=dict(user_id=self.user_id, exam_id=self.exam_id, **fresh),
+                conflict_columns=['user_id', 'exam_id'],
+                set_=fresh,
+                where=table.c.category_progress.is_(None),
+            )
+            db.session.commit()
+            stats = query.populate_existing().one()
+        return {
+            'category_counts': json.loads(stats.category_progress),
+            'recent_attempts': [
+                {**attempt, 'timestamp': datetime.fromisoformat(attempt['timestamp'])}
+                for attempt in json.loads(stats.recent_attempts or '[]')
+            ],
+            'current_streak': StreakService.current_streak_of(stats, today),
+        }
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from models import QuestionDifficulty, db
+
+# How long a worker reuses an exam's loaded difficulties before reading them again
+DEFAULT_TTL_SECONDS = 300.0
+
+
+class DifficultyCache:
+    """Calibrated question difficulties per exam, as loaded dicts (question id -> logits).
+
+    The table is small (one row per question) and only changes when
+    ``flask calibrate-difficulty`` runs, so each worker loads an exam's rows
+    once and looks difficulties up in O(1) until ``ttl_seconds`` pass.
+    Questions without a calibration are absent.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._loaded: dict[str, tuple[float, dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, exam_id: str) -> dict[str, float]:
+        now = time.monotonic()
+        cached = self._loaded.get(exam_id)
+        if cached is not None and now - cached[0] < self.ttl_seconds:
+            return cached[1]
+        table = QuestionDifficulty.__table__
+        rows = db.session.execute(
+            db.select(table.c.question_id, table.c.difficulty).where(table.c.exam_id == exam_id)
+        ).all()
+        difficulties = {question_id: difficulty for question_id, difficulty in rows}
+        with self._lock:
+            self._loaded[exam_id] = (now, difficulties)
+        return difficulties
+
+    def invalidate(self, exam_id: str | None = None) -> None:
+        with self._lock:
+            if exam_id is None:
+                self._loaded.clear()
+            else:
+                self._loaded.pop(exam_id, None)
+
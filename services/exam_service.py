@@ -1,41 +1,103 @@
 import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
 
 from flask import session
 
+from services.question_loader import DEFAULT_RECHECK_SECONDS
 
-class ExamService:
-    """Service for managing exams/courses and the active exam selection"""
+logger = logging.getLogger(__name__)
 
-    def __init__(self, exams_file: str):
-        self.exams_file = exams_file
-        self._exams_cache = None
 
-    def _load_exams(self) -> dict:
-        if self._exams_cache:
-            return self._exams_cache
+@dataclass(frozen=True)
+class _ExamIndex:
+    """Parsed exams.json plus the lookup tables built from it."""
+
+    data: dict
+    exams: list[dict]
+    by_id: dict[str, dict]
+    category_ids: dict[str, list[str]]
+    category_names: dict[tuple[str, str], str]
+    signature: tuple[int, int] | None  # (st_mtime_ns, st_size) of the file when read
 
-        with open(self.exams_file) as f:
-            data = json.load(f)
+    @classmethod
+    def build(cls, data: dict, signature: tuple[int, int] | None) -> '_ExamIndex':
+        exams = data.get('exams', [])
+        by_id: dict[str, dict] = {}
+        category_ids: dict[str, list[str]] = {}
+        category_names: dict[tuple[str, str], str] = {}
+        for exam in exams:
+            # An exam id listed twice keeps its first entry
+            if exam['id'] in by_id:
+                continue
+            by_id[exam['id']] = exam
+            category_ids[exam['id']] = [cat['id'] for cat in exam.get('categories', [])]
+            for cat in exam.get('categories', []):
+                category_names.setdefault((exam['id'], cat['id']), cat['name'])
+        return cls(data, exams, by_id, category_ids, category_names, signature)
 
-        self._exams_cache = data
-        return data
+
+class ExamService:
+    """Service for managing exams/courses and the active exam selection
+
+    exams.json is parsed once into dict indexes, so every lookup is O(1).
+    The file is stat()ed at most every ``recheck_seconds`` and reloaded when
+    it changed; a file that fails to parse keeps the previous exams.
+    """
+
+    def __init__(self, exams_file: str, recheck_seconds: float = DEFAULT_RECHECK_SECONDS):
+        self.exams_file = exams_file
+        self.recheck_seconds = recheck_seconds
+        self._index: _ExamIndex | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _signature(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self.exams_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load_exams(self) -> _ExamIndex:
+        index = self._index
+        now = time.monotonic()
+        if index is not None and now - self._checked_at < self.recheck_seconds:
+            return index
+
+        with self._lock:
+            index = self._index
+            if index is not None and now - self._checked_at < self.recheck_seconds:
+                return index
+            signature = self._signature()
+            if index is None or signature != index.signature:
+                try:
+                    with open(self.exams_file) as f:
+                        index = _ExamIndex.build(json.load(f), signature)
+                except (OSError, ValueError, KeyError):
+                    if index is None:
+                        raise
+                    logger.exception('Could not reload %s; keeping the previous exams', self.exams_file)
+                    # Do not retry (and log again) until the file changes once more
+                    index = replace(index, signature=signature)
+                self._index = index
+            self._checked_at = now
+            return index
 
     def get_all_exams(self) -> list[dict]:
         """Return list of all exam definitions"""
-        data = self._load_exams()
-        return data.get('exams', [])
+        return self._load_exams().exams
 
     def get_exam(self, exam_id: str) -> dict | None:
         """Get a specific exam by ID"""
-        for exam in self.get_all_exams():
-            if exam['id'] == exam_id:
-                return exam
-        return None
+        return self._load_exams().by_id.get(exam_id)
 
     def get_default_exam_id(self) -> str:
         """Get the default exam ID from config"""
-        data = self._load_exams()
-        return data.get('default_exam', 'c_programming')
+        return self._load_exams().data.get('default_exam', 'c_programming')
 
     def get_active_exam_id(self) -> str:
         """Get the currently active exam from session, or fall back to default"""
@@ -51,11 +113,11 @@ class ExamService:
 
     def get_active_exam(self) -> dict:
         """Get the full exam definition for the active exam"""
-        exam_id = self.get_active_exam_id()
-        exam = self.get_exam(exam_id)
+        index = self._load_exams()
+        exam = index.by_id.get(self.get_active_exam_id())
         if not exam:
             # Fallback to default
-            exam = self.get_exam(self.get_default_exam_id())
+            exam = index.by_id.get(index.data.get('default_exam', 'c_programming'))
         return exam
 
     def get_categories_for_exam(self, exam_id: str) -> list[dict]:
@@ -67,16 +129,17 @@ class ExamService:
 
     def get_category_ids_for_exam(self, exam_id: str) -> list[str]:
         """Get just the category ID strings for a specific exam"""
-        return [cat['id'] for cat in self.get_categories_for_exam(exam_id)]
+        return list(self._load_exams().category_ids.get(exam_id, []))
 
     def get_category_name(self, exam_id: str, category_id: str) -> str:
         """Get display name for a category"""
-        for cat in self.get_categories_for_exam(exam_id):
-            if cat['id'] == category_id:
-                return cat['name']
-        return category_id.replace('_', ' ').title()
+        name = self._load_exams().category_names.get((exam_id, category_id))
+        if name is None:
+            return category_id.replace('_', ' ').title()
+        return name
 
     def reload(self):
         """Force reload exam config from file"""
-        self._exams_cache = None
+        with self._lock:
+            self._index = None
         self._load_exams()
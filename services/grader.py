@@ -1,13 +1,14 @@
 import re
+from collections.abc import Iterable
 
-from services.compiler import CompilerService
+from services.compiler import BUSY_STAGES, CompilerService
 
 
 class GraderService:
     """Service for grading different types of C programming exercises"""
 
-    def __init__(self):
-        self.compiler = CompilerService()
+    def __init__(self, compiler: CompilerService | None = None):
+        self.compiler = compiler or CompilerService()
 
     def _normalize_output(self, text: str) -> str:
         """Normalize multiline output by trimming line endings and trailing spaces."""
@@ -17,6 +18,13 @@ class GraderService:
         cleaned = [line.rstrip() for line in lines]
         return '\n'.join(cleaned).strip()
 
+    def prepare_templates(self, questions: Iterable[dict]) -> int:
+        """Precompile the #include prelude of every template graded by compiling it"""
+        return self.compiler.prepare_preludes(
+            q['code_template'] for q in questions
+            if q.get('type') in ('code_completion', 'code_writing') and isinstance(q.get('code_template'), str)
+        )
+
     def grade_output_prediction(self, question: dict, user_answer: str) -> dict:
         """Grade output prediction exercises"""
         correct_output = question['correct_answer'].strip()
@@ -72,13 +80,28 @@ class GraderService:
                     'expected_output': expected_output
                 })
 
-        for test_case in normalized_cases:
-            # Replace placeholder with user's code
+        # The spliced source is identical for every test case, so compile it
+        # once and run the single binary against each case's stdin.
+        run_results: list[dict] = []
+        if normalized_cases:
             full_code = question['code_template'].replace('/* YOUR CODE HERE */', user_code)
+            run_results = self.compiler.compile_and_run_many(
+                full_code, [test_case.get('input', '') for test_case in normalized_cases]
+            )
 
-            # Compile and run
-            result = self.compiler.compile_and_run(full_code, test_case.get('input', ''))
+        # A saturated runner is not a wrong answer: report it so the caller can retry.
+        busy = next((r for r in run_results if r.get('stage') in BUSY_STAGES), None)
+        if busy is not None:
+            return {
+                'correct': False,
+                'busy': True,
+                'retry_after': busy.get('retry_after', 1),
+                'error': busy.get('error', 'The code runner is busy.'),
+                'test_results': [],
+                'explanation': ''
+            }
 
+        for test_case, result in zip(normalized_cases, run_results, strict=True):
             if not result['success']:
                 all_passed = False
                 results.append({
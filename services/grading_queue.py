@@ -0,0 +1,37 @@
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Question types whose grading compiles and runs code; everything else is
+# cheap enough to grade inline in the request.
+CODE_QUESTION_TYPES = frozenset({'code_completion', 'code_writing'})
+
+
+class GradingQueue:
+    """In-process background executor for slow (code) grading jobs.
+
+    Job state and results are persisted by the caller (``GradingJob`` rows),
+    so any worker can answer a poll. This class only runs the work.
+    """
+
+    def __init__(self, max_workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='grading')
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: str, fn: Callable[..., None], *args) -> None:
+        future = self._executor.submit(fn, *args)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _f: self._forget(job_id))
+
+    def _forget(self, job_id: str) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._futures)
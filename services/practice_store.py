@@ -0,0 +1,122 @@
+import json
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+
+from models import PracticeSession, db
+
+_SESSION_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class PracticeStore(ABC):
+    """Server-side state of practice runs, keyed by the run's id.
+
+    Only the id travels in the (signed) session cookie; the drawn question
+    ids, the current position, answered questions and timestamps live here.
+    State is a JSON-serializable dict. Stores never commit the database
+    session: a write is part of the caller's transaction, and the caller
+    commits it.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str) -> dict | None:
+        """The run's state, or None if there is none."""
+
+    @abstractmethod
+    def save(self, session_id: str, state: dict) -> None:
+        """Store the run's state, replacing what was there."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Forget the run's state; a no-op if there is none."""
+
+
+class DatabasePracticeStore(PracticeStore):
+    """Keeps the state in the run's ``practice_sessions`` row (``state`` column).
+
+    Works across hosts sharing the database. ``save`` and ``delete`` update
+    the row in the current transaction, so a submit's attempt and the
+    question it marks answered are committed together.
+    """
+
+    def load(self, session_id: str) -> dict | None:
+        state = db.session.query(PracticeSession.state).filter_by(id=session_id).scalar()
+        return json.loads(state) if state else None
+
+    def save(self, session_id: str, state: dict) -> None:
+        PracticeSession.query.filter_by(id=session_id).update({'state': json.dumps(state)})
+
+    def delete(self, session_id: str) -> None:
+        # The row itself is the run's history; only its state goes
+        PracticeSession.query.filter_by(id=session_id).update({'state': None})
+
+
+class FilePracticeStore(PracticeStore):
+    """One JSON file per run in ``state_dir``, replaced atomically on every save.
+
+    Needs no database round trip, but every worker must see the same
+    directory (a single host). Files of runs untouched for ``max_age_seconds``
+    are removed, at most once per ``max_age_seconds / 24``.
+    """
+
+    def __init__(self, state_dir: str, max_age_seconds: float = 7 * 24 * 3600):
+        self.state_dir = state_dir
+        self.max_age_seconds = max_age_seconds
+        self._pruned_at = 0.0
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _path(self, session_id: str) -> str | None:
+        if not _SESSION_ID.match(session_id or ''):
+            return None
+        return os.path.join(self.state_dir, f'{session_id}.json')
+
+    def load(self, session_id: str) -> dict | None:
+        path = self._path(session_id)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, session_id: str, state: dict) -> None:
+        path = self._path(session_id)
+        if path is None:
+            raise ValueError(f'Invalid practice session id: {session_id!r}')
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+        self._prune()
+
+    def delete(self, session_id: str) -> None:
+        path = self._path(session_id)
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now - self._pruned_at < self.max_age_seconds / 24:
+            return
+        self._pruned_at = now
+        for entry in os.scandir(self.state_dir):
+            try:
+                if now - entry.stat().st_mtime > self.max_age_seconds:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+
+
+def create_practice_store(backend: str, state_dir: str) -> PracticeStore:
+    """The store for ``PRACTICE_STORE``: ``database`` or ``file``."""
+    if backend == 'database':
+        return DatabasePracticeStore()
+    if backend == 'file':
+        return FilePracticeStore(state_dir)
+    raise ValueError(f'Unknown PRACTICE_STORE: {backend!r}')
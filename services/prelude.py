@@ -0,0 +1,140 @@
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from collections.abc import Iterable, Sequence
+
+from services.compile_cache import compiler_version
+
+logger = logging.getLogger(__name__)
+
+# A prelude line is a system #include or blank; the prelude is the run of
+# such lines at the top of the source (the scaffolding most templates share).
+_PRELUDE_LINE = re.compile(r'^\s*(#\s*include\s*<[A-Za-z0-9_./]+>\s*)?$')
+
+HEADER_NAME = 'prelude.h'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def split_prelude(code: str) -> tuple[str, str, int]:
+    """Split ``code`` into (prelude, rest, number of prelude lines).
+
+    The prelude is empty when the source does not start with #includes.
+    """
+    lines = code.splitlines(keepends=True)
+    count = 0
+    for line in lines:
+        if not _PRELUDE_LINE.match(line):
+            break
+        count += 1
+    prelude = ''.join(lines[:count])
+    if '#' not in prelude:
+        return '', code, 0
+    return prelude, ''.join(lines[count:]), count
+
+
+def normalize_prelude(prelude: str) -> str:
+    """The #include lines of ``prelude``, stripped; blank lines and spacing do not change a PCH."""
+    return ''.join(line.strip() + '\n' for line in prelude.splitlines() if line.strip())
+
+
+class PreludeCache:
+    """Precompiled headers for the ``#include`` prelude of question templates.
+
+    Every submission of a question repeats the template's includes, so they
+    are compiled once into a GCC precompiled header (``prelude.h.gch``) and
+    each later compile only parses the student's part. Headers are built
+    when the questions are loaded (``prepare_templates``); compiling a
+    submission only looks them up, so arbitrary submitted code cannot add
+    entries. Headers are stored content-addressed (compiler version + flags
+    + normalized prelude) under ``pch_dir``, shared by every worker on the
+    host, and the least recently used are evicted beyond ``max_bytes``.
+    """
+
+    def __init__(self, pch_dir: str, timeout: int = 10, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.pch_dir = pch_dir
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        os.makedirs(pch_dir, exist_ok=True)
+
+    def _key(self, prelude: str, flags: Sequence[str]) -> str:
+        digest = hashlib.sha256()
+        for part in (compiler_version(), '\0'.join(flags), normalize_prelude(prelude)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def lookup(self, prelude: str, flags: Sequence[str]) -> str | None:
+        """Directory holding ``prelude.h`` + its PCH if one was prepared, else None."""
+        target = os.path.join(self.pch_dir, self._key(prelude, flags))
+        try:
+            os.utime(target)  # recency for eviction
+        except OSError:
+            return None
+        return target if os.path.exists(os.path.join(target, HEADER_NAME + '.gch')) else None
+
+    def prepare_templates(self, templates: Iterable[str], flags: Sequence[str]) -> int:
+        """Build the PCH of every distinct template prelude; returns how many are available."""
+        preludes = {normalize_prelude(split_prelude(template)[0]) for template in templates}
+        return sum(self.prepare(prelude, flags) is not None for prelude in preludes if prelude)
+
+    def prepare(self, prelude: str, flags: Sequence[str]) -> str | None:
+        """Return a directory holding ``prelude.h`` + its PCH, building it if needed.
+
+        Returns None if the header cannot be precompiled; callers then
+        compile the source unchanged.
+        """
+        target = self.lookup(prelude, flags)
+        if target is not None:
+            return target
+        target = os.path.join(self.pch_dir, self._key(prelude, flags))
+
+        build_dir = tempfile.mkdtemp(dir=self.pch_dir, prefix='.build-')
+        try:
+            header = os.path.join(build_dir, HEADER_NAME)
+            with open(header, 'w') as f:
+                f.write(normalize_prelude(prelude))
+            result = subprocess.run(
+                ['gcc', *flags, '-x', 'c-header', header, '-o', header + '.gch'],
+                capture_output=True,
+                timeout=self.timeout,
+                text=True
+            )
+            if result.returncode != 0:
+                return None
+            try:
+                os.rename(build_dir, target)
+            except OSError:
+                # Another worker published the same header first
+                if not os.path.isdir(target):
+                    return None
+            self._evict(keep=target)
+            return target
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning('Could not precompile prelude: %s', e)
+            return None
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    def _evict(self, keep: str) -> None:
+        """Remove the least recently used headers until the directory fits ``max_bytes``."""
+        entries = []
+        for entry in os.scandir(self.pch_dir):
+            if entry.name.startswith('.') or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+            except FileNotFoundError:
+                continue  # evicted by another worker meanwhile
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -1,8 +1,12 @@
 import json
 import logging
 import os
+import pickle
 import random
 import re
+import threading
+import time
+from dataclasses import dataclass, field
 
 from services.question_validator import (
     LEVEL_ERROR,
@@ -21,6 +25,51 @@ def _strict_validation_enabled() -> bool:
 # path-traversal — values that fail this check never even touch os.path.join.
 _SAFE_ID = re.compile(r'^[a-zA-Z0-9_\-]+$')
 
+# How long a loaded file (a question category, exams.json) is trusted before
+# it is stat()ed again.
+DEFAULT_RECHECK_SECONDS = 1.0
+
+# Bumped whenever the bundle layout changes; older bundles are ignored.
+BUNDLE_FORMAT = 1
+
+
+@dataclass
+class _CachedCategory:
+    """Validated questions of one category file plus what they were read from."""
+
+    path: str
+    signature: tuple[int, int]  # (st_mtime_ns, st_size) of the file when read
+    questions: list[dict]
+    checked_at: float
+
+
+@dataclass(frozen=True)
+class _ExamQuestions:
+    """Questions of one exam plus the id indexes built alongside them."""
+
+    by_category: dict[str, list[dict]]
+    by_id: dict[str, dict] = field(default_factory=dict)
+    category_by_id: dict[str, str] = field(default_factory=dict)
+    # Category ids and file signatures the exam was built from
+    sources: tuple[tuple[str, tuple[int, int] | None], ...] = ()
+
+    @classmethod
+    def build(
+        cls,
+        by_category: dict[str, list[dict]],
+        sources: tuple[tuple[str, tuple[int, int] | None], ...],
+    ) -> '_ExamQuestions':
+        by_id: dict[str, dict] = {}
+        category_by_id: dict[str, str] = {}
+        for category, questions in by_category.items():
+            for question in questions:
+                question_id = question.get('id')
+                # A question id found in two categories keeps its first one
+                if question_id is not None and question_id not in by_id:
+                    by_id[question_id] = question
+                    category_by_id[question_id] = category
+        return cls(by_category, by_id, category_by_id, sources)
+
 
 class QuestionLoader:
     """Service for loading and managing questions from JSON files.
@@ -30,11 +79,29 @@ class QuestionLoader:
 
     And falls back to the legacy flat layout:
         questions/<category>.json
+
+    With ``bundle_dir`` set, categories are first taken from the exam's
+    precompiled bundle (see ``write_bundle``), skipping JSON parsing and
+    validation; a category whose JSON file changed since the bundle was
+    built is read from JSON instead.
     """
 
-    def __init__(self, questions_dir: str):
+    def __init__(
+        self,
+        questions_dir: str,
+        recheck_seconds: float = DEFAULT_RECHECK_SECONDS,
+        bundle_dir: str | None = None,
+    ):
         self.questions_dir = os.path.realpath(questions_dir)
-        self._questions_cache: dict[str, dict[str, list[dict]]] = {}
+        self.recheck_seconds = recheck_seconds
+        self.bundle_dir = bundle_dir
+        self._questions_cache: dict[str, _ExamQuestions] = {}
+        # When each cached exam's category files were last checked (time.monotonic())
+        self._exam_checked_at: dict[str, float] = {}
+        self._category_cache: dict[tuple[str | None, str], _CachedCategory] = {}
+        self._bundles: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'disk_loads': 0, 'bundle_loads': 0}
 
     @staticmethod
     def _is_safe_id(value: str | None) -> bool:
@@ -91,21 +158,50 @@ class QuestionLoader:
         Returns:
             Dictionary mapping category -> list of questions
         """
+        return self._load_exam(exam_id, categories).by_category
+
+    def _load_exam(self, exam_id: str | None, categories: list[str] | None) -> _ExamQuestions:
+        """Load an exam and its id indexes, or return the cached copy.
+
+        The questions and indexes are built completely before being published
+        in a single assignment, so concurrent readers never see a half-built
+        index after a reload. A cached exam's category files are checked for
+        changes at most once every ``recheck_seconds``, so a lookup in between
+        costs one dict access whatever the number of categories.
+        """
         cache_key = exam_id or '__legacy__'
-        if cache_key in self._questions_cache:
-            return self._questions_cache[cache_key]
+        now = time.monotonic()
+        cached = self._questions_cache.get(cache_key)
+        if cached is not None:
+            if now - self._exam_checked_at.get(cache_key, float('-inf')) < self.recheck_seconds:
+                self._count('hits')
+                return cached
+            # Rebuild only if one of the category files changed on disk
+            current = tuple(
+                (category, self._cached_category(category, exam_id, count_hit=False)[1])
+                for category, _signature in cached.sources
+            )
+            if current == cached.sources:
+                self._exam_checked_at[cache_key] = now
+                self._count('hits')
+                return cached
+            categories = [category for category, _signature in cached.sources]
 
         if categories is None:
             categories = self._discover_categories(exam_id)
 
         questions: dict[str, list[dict]] = {}
+        sources = []
         for category in categories:
-            loaded = self.load_category(category, exam_id=exam_id)
+            loaded, signature = self._cached_category(category, exam_id)
+            sources.append((category, signature))
             if loaded:
                 questions[category] = loaded
 
-        self._questions_cache[cache_key] = questions
-        return questions
+        exam = _ExamQuestions.build(questions, tuple(sources))
+        self._questions_cache[cache_key] = exam
+        self._exam_checked_at[cache_key] = now
+        return exam
 
     def _discover_categories(self, exam_id: str | None = None) -> list[str]:
         """Auto-discover categories by scanning JSON files in the exam directory."""
@@ -133,14 +229,138 @@ class QuestionLoader:
 
     def load_category(self, category: str, exam_id: str | None = None) -> list[dict]:
         """Load questions for a specific category."""
+        return list(self._cached_category(category, exam_id)[0])
+
+    def _cached_category(
+        self, category: str, exam_id: str | None, count_hit: bool = True
+    ) -> tuple[list[dict], tuple[int, int] | None]:
+        """Return the validated questions of a category and the file signature they came from.
+
+        Parsed categories are kept in memory and re-read only when the file's
+        mtime or size changes; the file is stat()ed at most once every
+        ``recheck_seconds``. The returned list is shared and must not be mutated.
+        With ``count_hit`` False a cache hit is not counted (the caller counts
+        its own lookup once).
+        """
+        key = (exam_id, category)
+        now = time.monotonic()
+        entry = self._category_cache.get(key)
+        if entry is not None and now - entry.checked_at < self.recheck_seconds:
+            if count_hit:
+                self._count('hits')
+            return entry.questions, entry.signature
+
         file_path = self._resolve_category_path(exam_id, category)
         if not file_path:
-            return []
-
-        if not os.path.exists(file_path):
+            return [], None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
             logger.warning('Question file not found: %s', file_path)
-            return []
+            self._category_cache.pop(key, None)
+            return [], None
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if entry is not None and entry.path == file_path and entry.signature == signature:
+            entry.checked_at = now
+            if count_hit:
+                self._count('hits')
+            return entry.questions, entry.signature
+
+        questions = self._bundled_category(exam_id, category, file_path, signature)
+        if questions is not None:
+            self._count('bundle_loads')
+        else:
+            questions = self._read_category(file_path)
+            self._count('disk_loads')
+        self._category_cache[key] = _CachedCategory(file_path, signature, questions, now)
+        return questions, signature
+
+    def _bundle_path(self, exam_id: str | None) -> str | None:
+        if not self.bundle_dir:
+            return None
+        return os.path.join(self.bundle_dir, f'{exam_id or "__legacy__"}.pickle')
 
+    def _bundle(self, exam_id: str | None) -> dict:
+        """The precompiled bundle of an exam (read once), or {} if there is none."""
+        cache_key = exam_id or '__legacy__'
+        bundle = self._bundles.get(cache_key)
+        if bundle is not None:
+            return bundle
+
+        bundle = {}
+        path = self._bundle_path(exam_id)
+        if path and os.path.exists(path):
+            try:
+                # Bundles are build artifacts produced by our own script
+                # (scripts/validate_questions.py --bundle-dir), never user input.
+                with open(path, 'rb') as f:
+                    data = pickle.load(f)
+                if isinstance(data, dict) and data.get('format') == BUNDLE_FORMAT:
+                    bundle = data['categories']
+                else:
+                    logger.warning('Ignoring question bundle with unknown format: %s', path)
+            except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError, ValueError) as e:
+                logger.warning('Could not read question bundle %s: %s', path, e)
+        self._bundles[cache_key] = bundle
+        return bundle
+
+    def _bundled_category(
+        self, exam_id: str | None, category: str, file_path: str, signature: tuple[int, int]
+    ) -> list[dict] | None:
+        """Questions of a category from the exam's bundle, or None if absent or stale."""
+        entry = self._bundle(exam_id).get(category)
+        if entry is None:
+            return None
+        if (
+            os.path.join(self.questions_dir, entry['path']) != file_path
+            or tuple(entry['signature']) != signature
+        ):
+            logger.info('Question bundle is stale for %s; reading JSON', file_path)
+            return None
+        return entry['questions']
+
+    def write_bundle(
+        self,
+        path: str,
+        exam_id: str | None = None,
+        categories: list[str] | None = None,
+    ) -> int:
+        """Write the validated questions of an exam to a bundle file.
+
+        Each category is stored with the mtime and size of its JSON file, so
+        a loader can tell when the bundle no longer matches the sources.
+        Returns the number of questions written.
+        """
+        if categories is None:
+            categories = self._discover_categories(exam_id)
+
+        entries = {}
+        for category in categories:
+            file_path = self._resolve_category_path(exam_id, category)
+            if not file_path or not os.path.exists(file_path):
+                continue
+            # stat before reading: a concurrent edit then makes the entry stale
+            stat = os.stat(file_path)
+            entries[category] = {
+                'path': os.path.relpath(file_path, self.questions_dir),
+                'signature': (stat.st_mtime_ns, stat.st_size),
+                'questions': self._read_category(file_path),
+            }
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(
+                {'format': BUNDLE_FORMAT, 'exam_id': exam_id, 'categories': entries},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, path)
+        return sum(len(entry['questions']) for entry in entries.values())
+
+    def _read_category(self, file_path: str) -> list[dict]:
+        """Parse and validate one category file."""
         try:
             with open(file_path) as f:
                 data = json.load(f)
@@ -179,14 +399,26 @@ class QuestionLoader:
         categories: list[str] | None = None,
     ) -> dict | None:
         """Get a specific question by ID."""
-        all_questions = self.load_all_questions(exam_id=exam_id, categories=categories)
+        return self._load_exam(exam_id, categories).by_id.get(question_id)
 
-        for _category, questions in all_questions.items():
-            for question in questions:
-                if question.get('id') == question_id:
-                    return question
+    def get_questions_by_ids(
+        self,
+        question_ids: list[str],
+        exam_id: str | None = None,
+        categories: list[str] | None = None,
+    ) -> dict[str, dict]:
+        """Get several questions by ID at once; unknown IDs are left out."""
+        by_id = self._load_exam(exam_id, categories).by_id
+        return {qid: by_id[qid] for qid in question_ids if qid in by_id}
 
-        return None
+    def get_question_category(
+        self,
+        question_id: str,
+        exam_id: str | None = None,
+        categories: list[str] | None = None,
+    ) -> str | None:
+        """Get the category (file) a question was loaded from."""
+        return self._load_exam(exam_id, categories).category_by_id.get(question_id)
 
     def get_questions_by_category(
         self,
@@ -209,7 +441,7 @@ class QuestionLoader:
         exam_id: str | None = None,
     ) -> list[dict]:
         """Get random questions from a category."""
-        questions = self.load_category(category, exam_id=exam_id)
+        questions, _signature = self._cached_category(category, exam_id)
         unique_questions = list({q.get('id'): q for q in questions}.values())
 
         if len(unique_questions) <= count:
@@ -221,5 +453,22 @@ class QuestionLoader:
         """Force reload of questions from files."""
         if exam_id:
             self._questions_cache.pop(exam_id, None)
+            self._exam_checked_at.pop(exam_id, None)
+            self._category_cache = {
+                key: entry for key, entry in self._category_cache.items() if key[0] != exam_id
+            }
         else:
             self._questions_cache = {}
+            self._exam_checked_at = {}
+            self._category_cache = {}
+        self._bundles = {}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        """Category cache hits vs. bundle and disk loads in this process."""
+        with self._lock:
+            counters = dict(self._counters)
+        return {**counters, 'categories_cached': len(self._category_cache)}
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from models import Attempt, QuestionReview, db
+from models.upsert import upsert
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+
+def _quality(correct: bool, hints_used: int | None) -> int:
+    """SM-2 response quality (0-5) of an attempt: 4 correct, 3 correct with hints, 1 wrong"""
+    if not correct:
+        return 1
+    return 3 if hints_used else 4
+
+
+def next_review(state: dict | None, correct: bool, hints_used: int | None, reviewed_at: datetime) -> dict:
+    """The review state after one more attempt, following SM-2.
+
+    ``state`` holds ``ease``, ``interval_days`` and ``repetitions`` (None
+    for a question never attempted). A wrong answer starts the question
+    over with a one-day interval; correct ones go 1 day, 6 days, then the
+    previous interval times the ease.
+    """
+    ease = state['ease'] if state else DEFAULT_EASE
+    interval = state['interval_days'] if state else 0
+    repetitions = state['repetitions'] if state else 0
+
+    quality = _quality(correct, hints_used)
+    if quality >= 3:
+        if repetitions == 0:
+            interval = 1
+        elif repetitions == 1:
+            interval = 6
+        else:
+            interval = round(interval * ease)
+        repetitions += 1
+    else:
+        repetitions = 0
+        interval = 1
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+    return {
+        'ease': ease,
+        'interval_days': interval,
+        'repetitions': repetitions,
+        'last_correct': bool(correct),
+        'last_reviewed_at': reviewed_at,
+        'due_at': reviewed_at + timedelta(days=interval),
+    }
+
+
+class ReviewService:
+    """Per-question spaced-repetition schedule of one user in one exam.
+
+    Each attempted question has a ``QuestionReview`` row that is advanced as
+    attempts are recorded (:meth:`record`). Smart mode asks for the
+    questions that are due and leaves out the ones scheduled for later;
+    both are range reads of the (user, exam, due_at) index, selected as plain
+    Core rows because a long-time user has thousands of them.
+    """
+
+    def __init__(self, user_id: int, exam_id: str):
+        self.user_id = user_id
+        self.exam_id = exam_id
+
+    def _select_ids(self):
+        table = QuestionReview.__table__
+        return select(table.c.question_id).where(table.c.user_id == self.user_id, table.c.exam_id == self.exam_id)
+
+    def record(self, entries: list[dict]) -> None:
+        """Advance the reviews of newly recorded attempts (see ``apply_attempts``). Does not commit.
+
+        Must run after ``StreakService.record_activity`` for the same user and
+        exam in the same transaction, which serializes concurrent writers.
+        Attempts older than a question's last review (a late journal replay)
+        are left for :meth:`rebuild`.
+        """
+        table = QuestionReview.__table__
+        question_ids = {entry['question_id'] for entry in entries}
+        states = {
+            row.question_id: dict(row._mapping)
+            for row in db.session.execute(select(
+                table.c.question_id, table.c.ease, table.c.interval_days,
+                table.c.repetitions, table.c.last_reviewed_at,
+            ).where(
+                table.c.user_id == self.user_id,
+                table.c.exam_id == self.exam_id,
+                table.c.question_id.in_(question_ids),
+            ))
+        }
+
+        changed = {}
+        for entry in sorted(entries, key=lambda e: e['timestamp']):
+            reviewed_at = datetime.fromisoformat(entry['timestamp'])
+            state = states.get(entry['question_id'])
+            if state is not None and state['last_reviewed_at'] > reviewed_at:
+                continue
+            state = next_review(state, entry['correct'], entry.get('hints_used'), reviewed_at)
+            states[entry['question_id']] = changed[entry['question_id']] = state
+
+        for question_id, state in changed.items():
+            upsert(
+                table,
+                values=dict(user_id=self.user_id, exam_id=self.exam_id, question_id=question_id, **state),
+                conflict_columns=['user_id', 'exam_id', 'question_id'],
+                set_=state,
+            )
+
+    def due_query(self, now: datetime):
+        """Ids of the questions due for review at ``now``, most overdue first."""
+        due_at = QuestionReview.__table__.c.due_at
+        return self._select_ids().where(due_at <= now).order_by(due_at)
+
+    def scheduled_query(self, now: datetime):
+        """Ids of the questions answered recently enough that they are not due at ``now``."""
+        return self._select_ids().where(QuestionReview.__table__.c.due_at > now)
+
+    def due_question_ids(self, now: datetime | None = None, limit: int | None = None) -> list[str]:
+        query = self.due_query(now or datetime.utcnow())
+        if limit is not None:
+            query = query.limit(limit)
+        return list(db.session.scalars(query).all())
+
+    def scheduled_question_ids(self, now: datetime | None = None) -> set[str]:
+        return set(db.session.scalars(self.scheduled_query(now or datetime.utcnow())).all())
+
+    def rebuild(self) -> int:
+        """Recompute every review from the attempt history. Does not commit.
+
+        Returns the number of questions with a review.
+        """
+        attempts = db.session.query(
+            Attempt.question_id, Attempt.correct, Attempt.hints_used, Attempt.timestamp
+        ).filter(
+            Attempt.user_id == self.user_id, Attempt.exam_id == self.exam_id, Attempt.timestamp.isnot(None)
+        ).order_by(Attempt.timestamp, Attempt.id)
+        states: dict[str, dict] = {}
+        for question_id, correct, hints_used, timestamp in attempts:
+            states[question_id] = next_review(states.get(question_id), correct, hints_used, timestamp)
+
+        QuestionReview.query.filter_by(user_id=self.user_id, exam_id=self.exam_id).delete()
+        if states:
+            db.session.execute(QuestionReview.__table__.insert(), [
+                {'user_id': self.user_id, 'exam_id': self.exam_id, 'question_id': question_id, **state}
+                for question_id, state in states.items()
+            ])
+        return len(states)
@@ -0,0 +1,269 @@
+import json
+import logging
+import math
+import os
+import queue
+import select
+import shutil
+import subprocess
+import sys
+import threading
+
+from services.admission import AdmissionController, pid_alive
+from services.compile_cache import CompileCache
+from services.compiler import DEFAULT_PARALLEL_RUNS, CompilerService
+from services.prelude import PreludeCache
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Grace period on top of the compile + run timeouts before a worker that has
+# not answered is considered wedged and replaced.
+_JOB_SLACK_SECONDS = 5
+
+
+def _worker_main(argv: list[str]) -> None:
+    """Entry point of a sandbox process: serve compile/run jobs until stdin closes.
+
+    Jobs and results are single JSON lines on stdin/stdout. The protocol
+    stream is moved off fd 1 first so nothing else can write into it.
+    """
+    options = json.loads(argv[0])
+    proto_out = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    cache = None
+    if options.get('cache_dir'):
+        cache = CompileCache(options['cache_dir'], options['cache_max_bytes'])
+    admission = None
+    if options.get('admission'):
+        admission = AdmissionController(**options['admission'])
+    compiler = CompilerService(
+        timeout=options['timeout'],
+        max_memory_mb=options['max_memory_mb'],
+        cache=cache,
+        scratch_dir=options['scratch_dir'],
+        admission=admission,
+        preludes=PreludeCache(options['pch_dir']) if options.get('pch_dir') else None,
+    )
+    for line in sys.stdin:
+        job = json.loads(line)
+        results = compiler.compile_and_run_many(job['code'], job['inputs'])
+        proto_out.write(json.dumps(results) + '\n')
+        proto_out.flush()
+
+
+class _Worker:
+    def __init__(self, index: int, options: dict):
+        self.index = index
+        self.scratch_dir = options['scratch_dir']
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'services.sandbox_pool', json.dumps(options)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=REPO_ROOT,
+            text=True,
+            encoding='utf-8',
+        )
+
+    def request(self, job: dict, timeout: float) -> list[dict] | None:
+        """Send ``job`` and wait for its result; None if the worker did not answer in time."""
+        assert self.process.stdin is not None and self.process.stdout is not None
+        self.process.stdin.write(json.dumps(job) + '\n')
+        self.process.stdin.flush()
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            return None
+        line = self.process.stdout.readline()
+        if not line:
+            raise EOFError('sandbox worker exited')
+        return json.loads(line)
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """End the process and delete its scratch directory."""
+        try:
+            if self.process.stdin is not None:
+                self.process.stdin.close()
+            self.process.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        if self.process.stdout is not None:
+            self.process.stdout.close()
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+class SandboxPool:
+    """Pre-started sandbox processes that compile and run C code on request.
+
+    Each worker is a small, long-lived interpreter (a fresh ``python -m``
+    process, so it does not inherit the web worker's heap) with its own
+    pre-created scratch directory. Jobs are sent over a pipe, so the web
+    worker never forks gcc or the student program itself. At most ``size``
+    jobs run at once and at most ``queue_depth`` more may wait; anything
+    beyond that is rejected immediately instead of piling up.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        queue_depth: int,
+        scratch_root: str,
+        timeout: int = 3,
+        max_memory_mb: int = 50,
+        cache: CompileCache | None = None,
+        admission: AdmissionController | None = None,
+        preludes: PreludeCache | None = None,
+    ):
+        self.size = size
+        self.queue_depth = queue_depth
+        self.scratch_root = scratch_root
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self.cache = cache
+        self.admission = admission
+        self.preludes = preludes
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        self._slots = threading.BoundedSemaphore(size + queue_depth)
+        self._lock = threading.Lock()
+        self._workers: list[_Worker] = []
+        self._started_pid: int | None = None
+        self._counters = {'jobs': 0, 'rejected': 0, 'restarts': 0, 'in_flight': 0}
+
+    def start(self) -> None:
+        """Start the worker processes; safe to call repeatedly."""
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            # A pool inherited across fork belongs to the parent; start afresh.
+            self._remove_stale_scratch()
+            self._idle = queue.Queue()
+            self._workers = []
+            for index in range(self.size):
+                worker = self._spawn(index)
+                self._workers.append(worker)
+                self._idle.put(worker)
+            self._started_pid = os.getpid()
+
+    def _remove_stale_scratch(self) -> None:
+        """Delete scratch directories left behind by web workers that have exited."""
+        try:
+            entries = list(os.scandir(self.scratch_root))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            pid, _, index = entry.name.partition('-')
+            if pid.isdigit() and index.isdigit() and not pid_alive(int(pid)):
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _spawn(self, index: int) -> _Worker:
+        options = {
+            'timeout': self.timeout,
+            'max_memory_mb': self.max_memory_mb,
+            'scratch_dir': os.path.join(self.scratch_root, f'{os.getpid()}-{index}'),
+            'cache_dir': self.cache.cache_dir if self.cache is not None else None,
+            'cache_max_bytes': self.cache.max_bytes if self.cache is not None else 0,
+            'admission': {
+                'lock_dir': self.admission.lock_dir,
+                'max_concurrent': self.admission.max_concurrent,
+                'max_waiting': self.admission.max_waiting,
+                'max_wait_seconds': self.admission.max_wait_seconds,
+            } if self.admission is not None else None,
+            'pch_dir': self.preludes.pch_dir if self.preludes is not None else None,
+        }
+        return _Worker(index, options)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.stop(timeout=0.1)
+        replacement = self._spawn(worker.index)
+        with self._lock:
+            self._workers[worker.index] = replacement
+            self._counters['restarts'] += 1
+        return replacement
+
+    def _job_timeout(self, input_count: int) -> float:
+        """Longest a healthy worker can take: wait for a gcc slot, build the prelude, compile, run."""
+        runs = math.ceil(input_count / DEFAULT_PARALLEL_RUNS)
+        waits = 0.0
+        if self.admission is not None:
+            waits += self.admission.max_wait_seconds
+        if self.preludes is not None:
+            waits += self.preludes.timeout
+        return waits + self.timeout * (1 + runs) + _JOB_SLACK_SECONDS
+
+    def run_job(self, code: str, inputs: list[str]) -> list[dict]:
+        """Run one compile_and_run_many job on a free worker."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counters['rejected'] += 1
+            return [{
+                'success': False,
+                'stage': 'queue',
+                'error': 'The code runner is busy right now. Please try again in a moment.',
+                'retry_after': 1
+            } for _ in inputs]
+
+        try:
+            self.start()
+            with self._lock:
+                self._counters['jobs'] += 1
+                self._counters['in_flight'] += 1
+            try:
+                worker, results = self._dispatch(self._idle.get(), code, inputs)
+                self._idle.put(worker)
+                return results
+            finally:
+                with self._lock:
+                    self._counters['in_flight'] -= 1
+        finally:
+            self._slots.release()
+
+    def _dispatch(self, worker: _Worker, code: str, inputs: list[str]) -> tuple[_Worker, list[dict]]:
+        """Send a job to ``worker``; a wedged or dead worker is replaced before returning."""
+        try:
+            results = worker.request({'code': code, 'inputs': inputs}, self._job_timeout(len(inputs)))
+            if results is not None:
+                return worker, results
+            # Student programs are killed after their own timeout inside the
+            # worker, so a worker past the whole budget means the host is
+            # overloaded: report busy rather than a wrong answer.
+            logger.warning('Sandbox worker %s timed out; replacing it', worker.index)
+            return self._replace(worker), [{
+                'success': False,
+                'stage': 'sandbox',
+                'error': 'The code runner is overloaded right now. Please try again in a moment.',
+                'retry_after': 5
+            } for _ in inputs]
+        except (EOFError, OSError, ValueError) as e:
+            logger.warning('Sandbox worker %s died (%s); replacing it', worker.index, e)
+        return self._replace(worker), [
+            {'success': False, 'stage': 'execution', 'error': 'Code runner crashed'} for _ in inputs
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._counters['in_flight']
+            return {
+                'size': self.size,
+                'queue_depth': self.queue_depth,
+                'busy': min(in_flight, self.size),
+                'queued': max(in_flight - self.size, 0),
+                'jobs': self._counters['jobs'],
+                'rejected': self._counters['rejected'],
+                'restarts': self._counters['restarts'],
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._started_pid = None
+        for worker in workers:
+            worker.stop()
+
+
+if __name__ == '__main__':
+    _worker_main(sys.argv[1:])
@@ -0,0 +1,118 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func
+
+from models import Attempt, UserExamStats, db
+from models.upsert import upsert
+
+
+def attempt_day():
+    """SQL expression for the UTC day of an attempt"""
+    return func.date(Attempt.timestamp)
+
+
+def parse_sql_date(value) -> date:
+    """A day selected with :func:`attempt_day` as a ``date``.
+
+    SQLite returns DATE() as 'YYYY-MM-DD' text, other backends as a date.
+    """
+    return date.fromisoformat(str(value)[:10])
+
+
+class StreakService:
+    """Practice streaks (consecutive UTC days with an attempt) per user and exam.
+
+    The streak is kept up to date in ``UserExamStats`` as attempts are
+    recorded, so reading it is a single-row lookup; :meth:`rebuild`
+    recomputes it from the attempt history (used by the backfill command).
+    """
+
+    def __init__(self, user_id: int, exam_id: str):
+        self.user_id = user_id
+        self.exam_id = exam_id
+
+    def _stats(self) -> UserExamStats | None:
+        return UserExamStats.query.filter_by(user_id=self.user_id, exam_id=self.exam_id).first()
+
+    def _get_or_create(self) -> UserExamStats:
+        stats = self._stats()
+        if stats is None:
+            stats = UserExamStats(
+                user_id=self.user_id,
+                exam_id=self.exam_id,
+                current_streak=0,
+                longest_streak=0,
+            )
+            db.session.add(stats)
+        return stats
+
+    def record_activity(self, day: date | None = None) -> None:
+        """Extend the streak for an attempt made on ``day`` (default: today, UTC).
+
+        A single upsert in the current transaction; the caller commits
+        together with the attempt.
+        """
+        day = day or datetime.utcnow().date()
+        table = UserExamStats.__table__
+        last = table.c.last_active_day
+        # All SET expressions see the row as it was before the update
+        current = case(
+            (last >= day, table.c.current_streak),  # same day, or an out-of-order timestamp
+            (last == day - timedelta(days=1), table.c.current_streak + 1),
+            else_=1,
+        )
+        upsert(
+            table,
+            values=dict(
+                user_id=self.user_id,
+                exam_id=self.exam_id,
+                current_streak=1,
+                longest_streak=1,
+                last_active_day=day,
+            ),
+            conflict_columns=['user_id', 'exam_id'],
+            set_=dict(
+                current_streak=current,
+                longest_streak=case((current > table.c.longest_streak, current), else_=table.c.longest_streak),
+                last_active_day=case((last >= day, last), else_=day),
+            ),
+        )
+
+    def current_streak(self, today: date | None = None) -> int:
+        """Consecutive days practiced up to and including today; 0 if not practiced today."""
+        return self.current_streak_of(self._stats(), today)
+
+    @staticmethod
+    def current_streak_of(stats: UserExamStats | None, today: date | None = None) -> int:
+        """Like :meth:`current_streak`, for a stats row that is already loaded."""
+        today = today or datetime.utcnow().date()
+        if stats is None or stats.last_active_day != today:
+            return 0
+        return stats.current_streak
+
+    def active_days_query(self):
+        """Distinct UTC days with an attempt, oldest first."""
+        day = attempt_day()
+        return db.session.query(day).filter(
+            Attempt.user_id == self.user_id, Attempt.exam_id == self.exam_id
+        ).group_by(day).order_by(day)
+
+    def from_history(self) -> dict:
+        """Streak column values recomputed from the attempt history."""
+        rows = self.active_days_query().all()
+        days = [parse_sql_date(row_day) for (row_day,) in rows if row_day is not None]
+
+        current = longest = 0
+        previous = None
+        for active_day in days:
+            current = current + 1 if previous is not None and active_day - previous == timedelta(days=1) else 1
+            longest = max(longest, current)
+            previous = active_day
+        return {'current_streak': current, 'longest_streak': longest, 'last_active_day': previous}
+
+    def rebuild(self) -> UserExamStats:
+        """Recompute the streak columns from the attempt history. Does not commit."""
+        stats = self._get_or_create()
+        for name, value in self.from_history().items():
+            setattr(stats, name, value)
+        return stats
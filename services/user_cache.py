@@ -0,0 +1,69 @@
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from models import User, db
+
+
+class UserCache:
+    """Per-worker TTL cache of the logged-in user's row for Flask-Login's user loader.
+
+    Entries are plain column snapshots, never live ORM objects, so nothing
+    is shared between sessions or threads; a hit is turned back into a
+    ``User`` attached to the current session with ``merge(load=False)``,
+    which issues no query (relationships still load lazily as before).
+
+    Updating or deleting a user through the ORM drops its entry in this
+    worker, and so does logging out; other workers notice within
+    ``ttl_seconds``.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict[int, tuple[float, dict]] = {}
+        self._counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._columns = [column.key for column in inspect(User).column_attrs]
+        event.listen(User, 'after_update', self._on_change)
+        event.listen(User, 'after_delete', self._on_change)
+
+    def _on_change(self, _mapper, _connection, target: User) -> None:
+        self.invalidate(target.id)
+
+    def get(self, user_id: int) -> User | None:
+        """The user with ``user_id`` in the current session, from the cache when fresh."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._counters['hits'] += 1
+                values = entry[1]
+            else:
+                self._counters['misses'] += 1
+                values = None
+        if values is not None:
+            cached = User(**values)
+            make_transient_to_detached(cached)
+            return db.session.merge(cached, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            snapshot = {key: getattr(user, key) for key in self._columns}
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) < self.max_entries:
+                    self._entries[user_id] = (now + self.ttl_seconds, snapshot)
+        return user
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self._counters['invalidations'] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, 'entries': len(self._entries)}
@@ -0,0 +1,372 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import AbstractContextManager, nullcontext
+from datetime import date, datetime
+
+from flask import Flask, has_app_context
+from sqlalchemy.exc import DataError, IntegrityError
+
+from models import Attempt, db
+from services.adaptive import AdaptiveLearningService
+from services.dashboard_summary import DashboardSummaryService
+from services.reviews import ReviewService
+from services.streaks import StreakService
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no orphan detection across processes
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = '.jsonl'
+# Attempts that kept failing to write; not matched by the journal glob, so never replayed
+DEAD_LETTER_NAME = 'dead-letter.ndjson'
+# Errors caused by the attempts themselves rather than by the database being unavailable
+_BAD_ENTRY_ERRORS = (IntegrityError, DataError, KeyError, TypeError, ValueError)
+
+
+def apply_attempts(entries: list[dict]) -> None:
+    """Add attempts plus their progress, streak, summary and review updates to the current transaction.
+
+    Progress increments are summed per category and streak days collected per
+    exam first, so a batch costs one insert plus one upsert per category and
+    per active day, one summary update per exam and one review upsert per
+    question, rather than a few statements per attempt.
+    """
+    rows = []
+    progress: dict[tuple[int, str, str], list[int]] = defaultdict(lambda: [0, 0])
+    active_days: dict[tuple[int, str], set[date]] = defaultdict(set)
+    by_exam: dict[tuple[int, str], list[dict]] = defaultdict(list)
+    for entry in entries:
+        timestamp = datetime.fromisoformat(entry['timestamp'])
+        rows.append({
+            'user_id': entry['user_id'],
+            'question_id': entry['question_id'],
+            'category': entry['category'],
+            'exam_id': entry['exam_id'],
+            'correct': entry['correct'],
+            'time_spent': entry['time_spent'],
+            'submitted_answer': entry['submitted_answer'],
+            'hints_used': entry['hints_used'],
+            'timestamp': timestamp,
+            'journal_id': entry.get('journal_id'),
+            'session_id': entry.get('session_id'),
+        })
+        counts = progress[(entry['user_id'], entry['exam_id'], entry['category'])]
+        counts[0] += 1
+        counts[1] += 1 if entry['correct'] else 0
+        active_days[(entry['user_id'], entry['exam_id'])].add(timestamp.date())
+        by_exam[(entry['user_id'], entry['exam_id'])].append(entry)
+    if not rows:
+        return
+
+    db.session.execute(Attempt.__table__.insert(), rows)
+    for (user_id, exam_id, category), (attempted, correct) in progress.items():
+        AdaptiveLearningService(user_id, exam_id=exam_id).add_progress(category, attempted, correct)
+    for (user_id, exam_id), days in active_days.items():
+        streaks = StreakService(user_id, exam_id)
+        for day in sorted(days):
+            streaks.record_activity(day)
+        # After the streak upsert, which creates the stats row and locks it
+        DashboardSummaryService(user_id, exam_id).record(by_exam[(user_id, exam_id)])
+        ReviewService(user_id, exam_id).record(by_exam[(user_id, exam_id)])
+
+
+def apply_attempt(entry: dict) -> None:
+    """Add one attempt plus its progress and streak updates to the current transaction."""
+    apply_attempts([entry])
+
+
+def _read_journal(path: str) -> list[dict]:
+    entries = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A line still being written by its owner; it is picked up next time
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class AttemptWriter:
+    """Write-behind buffer for recorded attempts.
+
+    ``record`` appends the attempt to this process's journal file and to an
+    in-memory buffer; a background thread writes buffered attempts, with their
+    progress and streak updates, in one transaction whenever ``batch_size``
+    attempts are waiting or every ``flush_interval`` seconds. The journal is
+    deleted only once its attempts are committed, so a crash loses nothing:
+    journals whose owner died are replayed by :meth:`recover`. Every attempt
+    carries a ``journal_id`` (unique in the database), so replaying an
+    attempt that was already written is a no-op.
+
+    Journal segments are ``flock``-ed by the process that owns them, which is
+    how other processes tell a live journal from an orphaned one. Readers that
+    need fresh data call :meth:`sync_user`, which also applies that user's
+    attempts still sitting in other workers' journals.
+
+    A batch rejected because of its data (a constraint error, a malformed
+    entry) is retried attempt by attempt; an attempt rejected ``max_failures``
+    times is appended to ``dead-letter.ndjson`` in the journal directory and
+    dropped, so it cannot block the attempts behind it.
+    """
+
+    def __init__(
+        self,
+        journal_dir: str,
+        batch_size: int = 50,
+        flush_interval: float = 0.2,
+        fsync: bool = True,
+        max_failures: int = 3,
+    ):
+        self.journal_dir = journal_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_failures = max_failures
+        self.app: Flask | None = None
+        os.makedirs(journal_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started_pid: int | None = None
+        self._buffer: list[dict] = []
+        self._segment: tuple[str, int] | None = None  # (path, fd) of the journal being appended to
+        self._sealed: list[tuple[str, int]] = []
+        self._segment_seq = 0
+        self._rejections: dict[str, int] = {}  # journal id -> times its attempt was rejected
+        self._counters = {
+            'recorded': 0, 'flushed': 0, 'batches': 0, 'replayed': 0, 'failures': 0, 'dead_lettered': 0,
+        }
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+
+    def _ensure_started(self) -> None:
+        # Called with self._lock held
+        if self._started_pid == os.getpid():
+            return
+        # State inherited across fork belongs to the parent
+        self._buffer = []
+        self._segment = None
+        self._sealed = []
+        self._started_pid = os.getpid()
+        thread = threading.Thread(target=self._run, name='attempt-writer', daemon=True)
+        thread.start()
+        atexit.register(self.flush)
+
+    def _open_segment(self) -> int:
+        # Called with self._lock held
+        if self._segment is None:
+            self._segment_seq += 1
+            path = os.path.join(
+                self.journal_dir, f'{os.getpid()}-{uuid.uuid4().hex[:8]}-{self._segment_seq}{JOURNAL_SUFFIX}'
+            )
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            self._segment = (path, fd)
+        return self._segment[1]
+
+    def record(self, entry: dict) -> None:
+        """Journal an attempt (see :func:`apply_attempt` for its fields) and buffer it."""
+        entry = {**entry, 'journal_id': uuid.uuid4().hex}
+        line = (json.dumps(entry) + '\n').encode('utf-8')
+        with self._lock:
+            self._ensure_started()
+            fd = self._open_segment()
+            os.write(fd, line)
+            if self.fsync:
+                os.fsync(fd)
+            self._buffer.append(entry)
+            self._counters['recorded'] += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Write-behind flush failed; will retry')
+
+    def flush(self) -> int:
+        """Write this process's buffered attempts now; returns how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._buffer = self._buffer, []
+                if self._segment is not None:
+                    self._sealed.append(self._segment)
+                    self._segment = None
+                sealed = list(self._sealed)
+            if not entries and not sealed:
+                return 0
+            try:
+                written, retry = self._apply_or_dead_letter(entries)
+            except Exception:
+                with self._lock:
+                    self._buffer[:0] = entries
+                    self._counters['failures'] += 1
+                raise
+            with self._lock:
+                self._buffer[:0] = retry
+                self._counters['flushed'] += written
+                self._counters['batches'] += 1
+                if retry:
+                    # The journal segments still hold attempts to retry
+                    return written
+                self._sealed = [s for s in self._sealed if s not in sealed]
+            # Committed: the journal segments are no longer needed
+            for path, fd in sealed:
+                _remove(path)
+                os.close(fd)
+            return written
+
+    def _apply_or_dead_letter(self, entries: list[dict], owned: bool = True) -> tuple[int, list[dict]]:
+        """Write ``entries``; returns the number written and the entries to retry later.
+
+        Errors other than bad data (e.g. the database being down) propagate.
+        Entries not ``owned`` by this process (another live worker's journal)
+        are left to their owner rather than dead-lettered.
+        """
+        try:
+            return self._apply(entries), []
+        except _BAD_ENTRY_ERRORS as e:
+            logger.warning('Write-behind batch of %s attempts rejected (%s); retrying one by one', len(entries), e)
+
+        written = 0
+        retry = []
+        for entry in entries:
+            try:
+                written += self._apply([entry])
+            except _BAD_ENTRY_ERRORS as e:
+                if not owned:
+                    continue
+                journal_id = entry.get('journal_id', '')
+                with self._lock:
+                    self._rejections[journal_id] = failures = self._rejections.get(journal_id, 0) + 1
+                    self._counters['failures'] += 1
+                if failures < self.max_failures:
+                    retry.append(entry)
+                    continue
+                self._dead_letter(entry, e)
+        return written, retry
+
+    def _dead_letter(self, entry: dict, error: Exception) -> None:
+        logger.error('Moving attempt %s to the dead-letter file after %s failures: %s',
+                     entry.get('journal_id'), self.max_failures, error)
+        line = json.dumps({'entry': entry, 'error': str(error), 'failed_at': datetime.utcnow().isoformat()})
+        fd = os.open(os.path.join(self.journal_dir, DEAD_LETTER_NAME), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            os.write(fd, (line + '\n').encode('utf-8'))
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        with self._lock:
+            self._rejections.pop(entry.get('journal_id', ''), None)
+            self._counters['dead_lettered'] += 1
+
+    def _apply(self, entries: list[dict]) -> int:
+        """Write the attempts not yet in the database in one transaction."""
+        if not entries:
+            return 0
+        context: AbstractContextManager
+        if has_app_context():
+            context = nullcontext()
+        else:
+            assert self.app is not None, 'AttemptWriter.init_app() was not called'
+            context = self.app.app_context()
+        with context:
+            for attempt in range(2):
+                ids = [e['journal_id'] for e in entries]
+                existing = {
+                    row[0] for row in
+                    db.session.query(Attempt.journal_id).filter(Attempt.journal_id.in_(ids))
+                }
+                fresh = [e for e in entries if e['journal_id'] not in existing]
+                try:
+                    apply_attempts(fresh)
+                    db.session.commit()
+                    return len(fresh)
+                except IntegrityError:
+                    # Another process wrote some of these attempts concurrently
+                    db.session.rollback()
+                    if attempt:
+                        raise
+                except Exception:
+                    db.session.rollback()
+                    raise
+        return 0
+
+    def _foreign_journals(self) -> list[str]:
+        with self._lock:
+            own = {path for path, _fd in self._sealed}
+            if self._segment is not None:
+                own.add(self._segment[0])
+        paths = glob.glob(os.path.join(self.journal_dir, f'*{JOURNAL_SUFFIX}'))
+        return [path for path in sorted(paths) if path not in own]
+
+    def _replay_foreign(self, user_id: int | None) -> int:
+        """Apply orphaned journals (then delete them) and, for ``user_id``, live ones."""
+        replayed = 0
+        for path in self._foreign_journals():
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                orphaned = False
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        orphaned = True
+                    except BlockingIOError:
+                        pass
+                entries = _read_journal(path)
+                if not orphaned:
+                    entries = [e for e in entries if user_id is not None and e.get('user_id') == user_id]
+                written, retry = self._apply_or_dead_letter(entries, owned=orphaned)
+                replayed += written
+                if orphaned and not retry:
+                    # Another worker may have replayed and removed it first
+                    _remove(path)
+            finally:
+                os.close(fd)
+        with self._lock:
+            self._counters['replayed'] += replayed
+        return replayed
+
+    def recover(self) -> int:
+        """Replay journals left behind by crashed processes; returns attempts written."""
+        return self._replay_foreign(user_id=None)
+
+    def sync_user(self, user_id: int) -> None:
+        """Make every recorded attempt of ``user_id`` visible to database reads."""
+        self.flush()
+        self._replay_foreign(user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, 'buffered': len(self._buffer)}
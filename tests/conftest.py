@@ -1,32 +1,41 @@
 """Shared pytest fixtures.
 
 The app boots in DEBUG with an in-memory SQLite database so tests are
-fully isolated from the developer's instance/practice.db.
+fully isolated from the developer's instance/practice.db. Set
+TEST_DATABASE_URL to run the suite against another database instead, e.g.
+``TEST_DATABASE_URL=postgresql://localhost/practice_test`` (its tables are
+dropped and recreated).
 """
 
 from __future__ import annotations
 
 import os
+from datetime import datetime
 
 # Force a safe, debug-mode environment before importing the app module.
 # These env vars are read by config.Config at import time.
 os.environ.setdefault('DEBUG', 'True')
 os.environ.setdefault('FLASK_SECRET_KEY', 'test-secret')
-os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL', 'sqlite:///:memory:')
+os.environ['DATABASE_URL'] = TEST_DATABASE_URL
 os.environ.setdefault('FORCE_HTTPS', 'false')
 
 import pytest  # noqa: E402
+from flask import g  # noqa: E402
 
 from app import app as flask_app  # noqa: E402
+from models import Attempt, User  # noqa: E402
 from models import db as _db  # noqa: E402
 
+EXAM = 'c_programming'
+
 
 @pytest.fixture(scope='session')
 def app():
     flask_app.config.update(
         TESTING=True,
         WTF_CSRF_ENABLED=False,
-        SQLALCHEMY_DATABASE_URI='sqlite:///:memory:',
+        SQLALCHEMY_DATABASE_URI=TEST_DATABASE_URL,
     )
     with flask_app.app_context():
         _db.drop_all()
@@ -48,3 +57,76 @@ def db(app):
     for table in reversed(_db.metadata.sorted_tables):
         _db.session.execute(table.delete())
     _db.session.commit()
+    _db.session.expunge_all()
+    # Test requests reuse the session-wide app context, so Flask-Login's
+    # per-context user cache would otherwise leak into the next test.
+    g.pop('_login_user', None)
+
+
+@pytest.fixture()
+def user(db):
+    """A stored user to attach attempts to."""
+    user = User(name='Student', email='user@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture()
+def other_user(db):
+    """A second stored user, for checks that one user's data stays their own."""
+    user = User(name='Other', email='other@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture()
+def logged_in(client, db):
+    """A test client with a freshly registered student logged in."""
+    client.post('/auth/register', data={
+        'name': 'Student',
+        'email': 'student@example.com',
+        'password': 'hunter22',
+        'confirm_password': 'hunter22',
+    })
+    client.post('/auth/login', data={'email': 'student@example.com', 'password': 'hunter22'})
+    return client
+
+
+@pytest.fixture()
+def attempt_entry():
+    """Factory for attempts as ``apply_attempts`` and the write-behind journal take them."""
+    def make(user_id, *, question_id='q1', category='pointers', correct=True, at=None, **extra):
+        return {
+            'user_id': user_id,
+            'question_id': question_id,
+            'category': category,
+            'exam_id': EXAM,
+            'correct': correct,
+            'time_spent': 10,
+            'submitted_answer': 'A',
+            'hints_used': 0,
+            'timestamp': (at or datetime.utcnow()).isoformat(),
+            **extra,
+        }
+    return make
+
+
+@pytest.fixture()
+def add_attempt(db):
+    """Factory adding an ``Attempt`` row to the session (not committed)."""
+    def add(user_id, **columns):
+        attempt = Attempt(**{
+            'user_id': user_id,
+            'question_id': 'q',
+            'category': 'pointers',
+            'exam_id': EXAM,
+            'correct': True,
+            'time_spent': 10,
+            'timestamp': datetime.utcnow(),
+            **columns,
+        })
+        db.session.add(attempt)
+        return attempt
+    return add
@@ -0,0 +1,69 @@
+"""Tests for adaptive practice session generation."""
+
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+import pytest
+
+from services.adaptive import AdaptiveLearningService, _Draw
+
+
+@pytest.fixture()
+def service(db, monkeypatch):
+    service = AdaptiveLearningService(user_id=1, exam_id='c_programming')
+    monkeypatch.setattr(service, 'get_recommended_categories', lambda categories: ['weak'])
+    return service
+
+
+def _pool(**sizes):
+    return {cat: [{'id': f'{cat}_{i}', 'category': cat} for i in range(n)] for cat, n in sizes.items()}
+
+
+def test_draw_yields_every_item_once():
+    items = list(range(50))
+    draw = _Draw(items)
+    drawn = [draw.next() for _ in range(50)]
+    assert sorted(drawn) == items
+    assert draw.left == 0
+    assert items == list(range(50))
+
+
+def test_draw_is_uniform():
+    rng_state = random.getstate()
+    random.seed(1234)
+    try:
+        firsts = Counter(_Draw(['a', 'b', 'c', 'd']).next() for _ in range(8000))
+        seconds = Counter()
+        for _ in range(8000):
+            draw = _Draw(['a', 'b', 'c', 'd'])
+            draw.next()
+            seconds[draw.next()] += 1
+    finally:
+        random.setstate(rng_state)
+    for counts in (firsts, seconds):
+        assert all(1800 < counts[item] < 2200 for item in 'abcd')
+
+
+def test_session_mixes_weak_and_review_questions(service):
+    questions = service.generate_practice_session(_pool(weak=20, other=20, more=20), session_size=10)
+    ids = [q['id'] for q in questions]
+    assert len(ids) == len(set(ids)) == 10
+    assert Counter(q['category'] for q in questions)['weak'] == 7
+
+
+def test_short_categories_are_filled_from_the_rest(service):
+    pool = _pool(weak=2, other=3)
+    pool['other'].append(dict(pool['weak'][0]))  # listed in two categories
+    questions = service.generate_practice_session(pool, session_size=10)
+    assert sorted(q['id'] for q in questions) == ['other_0', 'other_1', 'other_2', 'weak_0', 'weak_1']
+
+
+def test_calibrated_sessions_run_from_easiest_to_hardest(db, monkeypatch):
+    pool = _pool(weak=6)
+    difficulties = {f'weak_{i}': 1.5 - i for i in range(5)}  # weak_5 is uncalibrated: average
+    service = AdaptiveLearningService(user_id=1, exam_id='c_programming', difficulties=difficulties)
+    monkeypatch.setattr(service, 'get_recommended_categories', lambda categories: ['weak'])
+    ids = [q['id'] for q in service.generate_practice_session(pool, session_size=6)]
+    assert ids == ['weak_4', 'weak_3', 'weak_2', 'weak_5', 'weak_1', 'weak_0']
@@ -0,0 +1,89 @@
+"""Tests for services.admission.AdmissionController (host-wide compiler slots)."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from services.admission import AdmissionController, AdmissionRejected
+
+fcntl = pytest.importorskip('fcntl')
+
+
+def test_slot_is_released_after_use(tmp_path):
+    ctl = AdmissionController(str(tmp_path), max_concurrent=1, max_waiting=0, max_wait_seconds=0)
+    with ctl.slot():
+        assert ctl.stats()['in_use'] == 1
+    assert ctl.stats()['in_use'] == 0
+    with ctl.slot():
+        pass
+    assert ctl.stats()['admitted'] == 2
+
+
+def test_rejects_immediately_when_queue_full(tmp_path):
+    ctl = AdmissionController(str(tmp_path), max_concurrent=1, max_waiting=0, max_wait_seconds=10)
+    # A second controller on the same directory models another gunicorn worker
+    other = AdmissionController(str(tmp_path), max_concurrent=1, max_waiting=0, max_wait_seconds=10)
+    with ctl.slot():
+        with pytest.raises(AdmissionRejected) as exc:
+            with other.slot():
+                pass
+    assert exc.value.retry_after >= 1
+    assert other.stats()['rejected'] == 1
+
+
+def test_waiter_times_out(tmp_path):
+    ctl = AdmissionController(str(tmp_path), max_concurrent=1, max_waiting=1, max_wait_seconds=0.1)
+    with ctl.slot():
+        with pytest.raises(AdmissionRejected):
+            with ctl.slot():
+                pass
+    assert ctl.stats()['timed_out'] == 1
+
+
+def test_waiter_is_admitted_when_slot_frees(tmp_path):
+    ctl = AdmissionController(str(tmp_path), max_concurrent=1, max_waiting=1, max_wait_seconds=5)
+    holding = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with ctl.slot():
+            holding.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    holding.wait(5)
+    threading.Timer(0.2, release.set).start()
+    with ctl.slot():
+        pass
+    thread.join()
+    stats = ctl.stats()
+    assert stats['queued'] == 1
+    assert stats['wait_seconds_max'] > 0
+
+
+def test_counters_are_shared_by_every_process_on_the_host(tmp_path):
+    # Sandbox processes admit the compiles; the web worker reports the metrics
+    sandbox = AdmissionController(str(tmp_path), max_concurrent=1, max_waiting=0, max_wait_seconds=0)
+    web = AdmissionController(str(tmp_path), max_concurrent=1, max_waiting=0, max_wait_seconds=0)
+    with sandbox.slot():
+        assert web.stats()['in_use'] == 1
+    assert web.stats()['admitted'] == 1
+
+
+def test_stats_reads_occupancy_without_locking(tmp_path, monkeypatch):
+    ctl = AdmissionController(str(tmp_path), max_concurrent=2, max_waiting=0, max_wait_seconds=0)
+    with ctl.slot():
+        locked = []
+        monkeypatch.setattr(fcntl, 'flock', lambda fd, op: locked.append(op))
+        assert ctl.stats()['in_use'] == 1
+        monkeypatch.undo()
+    assert locked == []
+
+
+def test_slot_of_a_crashed_holder_is_not_counted(tmp_path):
+    ctl = AdmissionController(str(tmp_path), max_concurrent=1, max_waiting=0, max_wait_seconds=0)
+    (tmp_path / 'slot-0.lock').write_text('999999999')
+    assert ctl.stats()['in_use'] == 0
@@ -0,0 +1,69 @@
+"""Tests for the item-difficulty calibration job and the difficulty cache."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from models import Attempt, QuestionDifficulty, User
+from services.difficulty import DifficultyCache
+
+np = pytest.importorskip('numpy')
+
+EXAM = 'c_programming'
+
+
+@pytest.fixture()
+def responses(db):
+    """Attempts simulated from a Rasch model with known question difficulties."""
+    rng = np.random.default_rng(7)
+    abilities = rng.normal(0, 1, 150)
+    difficulties = np.linspace(-2, 2, 12)
+    db.session.execute(User.__table__.insert(), [
+        {'name': f'U{i}', 'email': f'u{i}@example.com', 'password_hash': 'x'} for i in range(len(abilities))
+    ])
+    user_ids = [user.id for user in User.query.order_by(User.id)]
+    rows = []
+    for user_id, ability in zip(user_ids, abilities, strict=True):
+        for question, difficulty in enumerate(difficulties):
+            for _ in range(2):
+                correct = rng.random() < 1 / (1 + np.exp(difficulty - ability))
+                rows.append({
+                    'user_id': user_id, 'question_id': f'q{question:02d}', 'category': 'arrays',
+                    'exam_id': EXAM, 'correct': bool(correct), 'timestamp': datetime(2024, 1, 1),
+                })
+    db.session.execute(Attempt.__table__.insert(), rows)
+    db.session.commit()
+    return difficulties
+
+
+def test_calibration_recovers_difficulties(db, responses):
+    from services.calibration import calibrate
+
+    # A small chunk size so the attempts are streamed and fitted in many chunks
+    assert calibrate(chunk_size=500) == {EXAM: len(responses)}
+    rows = QuestionDifficulty.query.filter_by(exam_id=EXAM).order_by(QuestionDifficulty.question_id).all()
+    fitted = np.array([row.difficulty for row in rows])
+    assert np.corrcoef(fitted, responses)[0, 1] > 0.95
+    assert all(row.attempts == 300 for row in rows)
+    assert rows[0].correct_rate > rows[-1].correct_rate
+
+    # Recalibrating replaces the exam's rows
+    assert calibrate([EXAM], chunk_size=10_000) == {EXAM: len(responses)}
+    assert QuestionDifficulty.query.count() == len(responses)
+
+
+def test_cache_loads_an_exam_once_per_ttl(db):
+    db.session.add(QuestionDifficulty(
+        exam_id=EXAM, question_id='q1', difficulty=1.5, attempts=10, correct_rate=0.2,
+        calibrated_at=datetime(2024, 1, 1),
+    ))
+    db.session.commit()
+    cache = DifficultyCache(ttl_seconds=60)
+    assert cache.get(EXAM) == {'q1': 1.5}
+    QuestionDifficulty.query.delete()
+    db.session.commit()
+    assert cache.get(EXAM) == {'q1': 1.5}
+    cache.invalidate(EXAM)
+    assert cache.get(EXAM) == {}
@@ -0,0 +1,65 @@
+"""Tests for services.compile_cache.CompileCache (no compiler required)."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from services.compile_cache import CompileCache
+
+
+@pytest.fixture()
+def cache(tmp_path: Path) -> CompileCache:
+    return CompileCache(str(tmp_path / 'cache'), max_bytes=100)
+
+
+def _binary(tmp_path: Path, name: str, size: int) -> str:
+    path = tmp_path / name
+    path.write_bytes(b'x' * size)
+    return str(path)
+
+
+def test_key_depends_on_source_and_flags():
+    a = CompileCache.key_for('int main(){}', ['-O0'])
+    assert a == CompileCache.key_for('int main(){}', ['-O0'])
+    assert a != CompileCache.key_for('int main(){ }', ['-O0'])
+    assert a != CompileCache.key_for('int main(){}', ['-O2'])
+
+
+def test_miss_then_hit(cache, tmp_path):
+    dest = str(tmp_path / 'out')
+    assert cache.fetch('k1', dest) is False
+    cache.store('k1', _binary(tmp_path, 'b1', 10))
+    assert cache.fetch('k1', dest) is True
+    assert os.path.getsize(dest) == 10
+    assert os.access(dest, os.X_OK)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores']) == (1, 1, 1)
+
+
+def test_lru_eviction_keeps_recently_used(cache, tmp_path):
+    cache.store('old', _binary(tmp_path, 'b1', 40))
+    cache.store('used', _binary(tmp_path, 'b2', 40))
+    assert cache.fetch('old', str(tmp_path / 'touch'))  # 'old' is now most recent
+    cache.store('new', _binary(tmp_path, 'b3', 40))
+    assert cache.fetch('used', str(tmp_path / 'o1')) is False
+    assert cache.fetch('old', str(tmp_path / 'o2')) is True
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= 100
+
+
+def test_state_survives_new_instance(cache, tmp_path):
+    cache.store('k1', _binary(tmp_path, 'b1', 10))
+    reopened = CompileCache(cache.cache_dir, max_bytes=100)
+    assert reopened.fetch('k1', str(tmp_path / 'out')) is True
+    assert reopened.stats()['stores'] == 1
+
+
+def test_missing_file_is_treated_as_miss(cache, tmp_path):
+    cache.store('k1', _binary(tmp_path, 'b1', 10))
+    os.remove(os.path.join(cache.cache_dir, 'k1'))
+    assert cache.fetch('k1', str(tmp_path / 'out')) is False
+    assert cache.stats()['entries'] == 0
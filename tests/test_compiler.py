@@ -0,0 +1,195 @@
+"""Tests for services.compiler.CompilerService.
+
+These shell out to gcc, so they are skipped on machines without a compiler.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from services.compiler import BUSY_STAGES, CompilerService
+
+pytestmark = pytest.mark.skipif(shutil.which('gcc') is None, reason='gcc not installed')
+
+ECHO_DOUBLE = '''
+#include <stdio.h>
+int main(void) {
+    int n;
+    if (scanf("%d", &n) != 1) return 1;
+    printf("%d\\n", n * 2);
+    return 0;
+}
+'''
+
+
+@pytest.fixture()
+def compiler():
+    return CompilerService(timeout=5)
+
+
+def test_compile_and_run_single(compiler):
+    result = compiler.compile_and_run(ECHO_DOUBLE, '21')
+    assert result['success'] is True
+    assert result['stdout'].strip() == '42'
+
+
+def test_run_many_preserves_input_order(compiler):
+    results = compiler.compile_and_run_many(ECHO_DOUBLE, ['1', '2', '3', '4', '5'])
+    assert [r['stdout'].strip() for r in results] == ['2', '4', '6', '8', '10']
+
+
+def test_parallel_runs_keep_the_memory_limit(compiler):
+    hog = '#include <stdio.h>\n#include <stdlib.h>\nint main(void) { puts(malloc(200 << 20) ? "got" : "none"); }\n'
+    results = compiler.compile_and_run_many(hog, ['', ''])
+    assert [r['stdout'].strip() for r in results] == ['none', 'none']
+
+
+def test_compile_error_reported_for_every_input(compiler):
+    results = compiler.compile_and_run_many('int main(void) { return }', ['1', '2'])
+    assert len(results) == 2
+    assert all(r['success'] is False and r['stage'] == 'compilation' for r in results)
+
+
+def test_run_many_with_no_inputs(compiler):
+    assert compiler.compile_and_run_many(ECHO_DOUBLE, []) == []
+
+
+def test_identical_source_is_served_from_cache(tmp_path):
+    from services.compile_cache import CompileCache
+
+    cache = CompileCache(str(tmp_path / 'cache'), max_bytes=10 * 1024 * 1024)
+    compiler = CompilerService(timeout=5, cache=cache)
+    assert compiler.compile_and_run(ECHO_DOUBLE, '1')['stdout'].strip() == '2'
+    assert compiler.compile_and_run(ECHO_DOUBLE, '5')['stdout'].strip() == '10'
+    stats = compiler.stats()['cache']
+    assert (stats['misses'], stats['hits']) == (1, 1)
+
+
+def test_sandbox_pool_runs_jobs_in_worker_processes(tmp_path):
+    from services.sandbox_pool import SandboxPool
+
+    pool = SandboxPool(1, 0, str(tmp_path / 'sandbox'), timeout=5)
+    compiler = CompilerService(timeout=5, pool=pool)
+    try:
+        results = compiler.compile_and_run_many(ECHO_DOUBLE, ['3', '4'])
+        assert [r['stdout'].strip() for r in results] == ['6', '8']
+        assert compiler.stats()['pool']['jobs'] == 1
+        # Scratch directory is reused and left empty between jobs
+        scratch_dirs = list((tmp_path / 'sandbox').iterdir())
+        assert len(scratch_dirs) == 1 and list(scratch_dirs[0].iterdir()) == []
+    finally:
+        pool.shutdown()
+    assert list((tmp_path / 'sandbox').iterdir()) == []
+
+
+def test_sandbox_pool_removes_scratch_of_exited_workers(tmp_path):
+    from services.sandbox_pool import SandboxPool
+
+    exited = subprocess.Popen(['true'])
+    exited.wait()
+    stale = tmp_path / 'sandbox' / f'{exited.pid}-0'
+    live = tmp_path / 'sandbox' / f'{os.getppid()}-0'
+    for scratch in (stale, live):
+        scratch.mkdir(parents=True)
+
+    pool = SandboxPool(1, 0, str(tmp_path / 'sandbox'), timeout=5)
+    pool.start()
+    try:
+        assert not stale.exists() and live.exists()
+    finally:
+        pool.shutdown()
+
+
+def test_sandbox_pool_rejects_when_queue_is_full(tmp_path):
+    from services.sandbox_pool import SandboxPool
+
+    pool = SandboxPool(0, 0, str(tmp_path / 'sandbox'), timeout=5)
+    result = CompilerService(pool=pool).compile_and_run(ECHO_DOUBLE, '1')
+    assert result['success'] is False and result['stage'] == 'queue'
+    assert pool.stats()['rejected'] == 1
+
+
+def test_sandbox_pool_deadline_covers_admission_wait_and_prelude_build(tmp_path):
+    from services.admission import AdmissionController
+    from services.prelude import PreludeCache
+    from services.sandbox_pool import SandboxPool
+
+    plain = SandboxPool(0, 0, str(tmp_path / 'sandbox'), timeout=3)
+    pool = SandboxPool(
+        0, 0, str(tmp_path / 'sandbox'), timeout=3,
+        admission=AdmissionController(str(tmp_path / 'locks'), 1, 1, 7.5),
+        preludes=PreludeCache(str(tmp_path / 'pch'), timeout=10),
+    )
+    assert pool._job_timeout(4) == plain._job_timeout(4) + 7.5 + 10
+
+
+def test_sandbox_pool_timeout_is_reported_busy(tmp_path, monkeypatch):
+    from services.sandbox_pool import SandboxPool
+
+    pool = SandboxPool(1, 0, str(tmp_path / 'sandbox'), timeout=5)
+    monkeypatch.setattr(pool, '_job_timeout', lambda input_count: 0)
+    try:
+        result = CompilerService(pool=pool).compile_and_run(ECHO_DOUBLE, '1')
+        assert result['success'] is False and result['stage'] in BUSY_STAGES
+        assert pool.stats()['restarts'] == 1
+        assert len(list((tmp_path / 'sandbox').iterdir())) == 1
+    finally:
+        pool.shutdown()
+
+
+def test_split_prelude():
+    from services.prelude import split_prelude
+
+    prelude, rest, lines = split_prelude('#include <stdio.h>\n\nint x;\n')
+    assert (prelude, rest, lines) == ('#include <stdio.h>\n\n', 'int x;\n', 2)
+    assert split_prelude('int x;\n') == ('', 'int x;\n', 0)
+
+
+def test_prelude_key_ignores_blank_lines_and_spacing(tmp_path):
+    from services.compiler import GCC_FLAGS
+    from services.prelude import PreludeCache
+
+    preludes = PreludeCache(str(tmp_path / 'pch'))
+    keys = {preludes._key(p, GCC_FLAGS) for p in ('#include <stdio.h>\n', '#include <stdio.h>  \n\n\n',
+                                                   '  #include <stdio.h>\n\n')}
+    assert len(keys) == 1
+
+
+def test_precompiled_prelude_is_built_once_and_keeps_line_numbers(tmp_path):
+    from services.prelude import PreludeCache
+
+    compiler = CompilerService(timeout=5, preludes=PreludeCache(str(tmp_path / 'pch')))
+    assert compiler.prepare_preludes([ECHO_DOUBLE, '#include <stdio.h>\n\n\n/* YOUR CODE HERE */\n']) == 1
+    assert compiler.compile_and_run(ECHO_DOUBLE, '4')['stdout'].strip() == '8'
+    assert compiler.compile_and_run(ECHO_DOUBLE.replace('* 2', '* 3'), '4')['stdout'].strip() == '12'
+    built = [p for p in (tmp_path / 'pch').iterdir() if not p.name.startswith('.')]
+    assert len(built) == 1 and (built[0] / 'prelude.h.gch').exists()
+
+    broken = '#include <stdio.h>\n\nint main(void) {\n    return nope;\n}\n'
+    result = compiler.compile_and_run(broken)
+    assert result['stage'] == 'compilation'
+    assert ':4:' in result['error']
+
+
+def test_submissions_do_not_build_precompiled_headers(tmp_path):
+    from services.prelude import PreludeCache
+
+    compiler = CompilerService(timeout=5, preludes=PreludeCache(str(tmp_path / 'pch')))
+    result = compiler.compile_and_run('#include <stdlib.h>\n' + ECHO_DOUBLE, '4')
+    assert result['stdout'].strip() == '8'
+    assert list((tmp_path / 'pch').iterdir()) == []
+
+
+def test_least_recently_used_precompiled_headers_are_evicted(tmp_path):
+    from services.compiler import GCC_FLAGS
+    from services.prelude import PreludeCache
+
+    preludes = PreludeCache(str(tmp_path / 'pch'), max_bytes=1)
+    first = preludes.prepare('#include <stdio.h>\n', GCC_FLAGS)
+    second = preludes.prepare('#include <string.h>\n', GCC_FLAGS)
+    assert first is not None and second is not None
+    assert not os.path.exists(first) and os.path.exists(second)
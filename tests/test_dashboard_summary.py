@@ -0,0 +1,102 @@
+"""Tests for the materialized dashboard summary and the rebuild-summaries command."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from models import UserExamStats
+from services.dashboard_summary import RECENT_ATTEMPTS, DashboardSummaryService
+from services.write_behind import apply_attempts
+
+EXAM = 'c_programming'
+
+
+def test_recorded_attempts_match_a_rebuild(db, user, attempt_entry):
+    def entry(category, correct, minutes_ago):
+        return attempt_entry(user.id, category=category, correct=correct,
+                             at=datetime.utcnow() - timedelta(minutes=minutes_ago))
+
+    batches = [
+        [entry('pointers', True, 50), entry('arrays', False, 40)],
+        [entry('pointers', False, 30)],
+        # Arrives late, e.g. replayed from a write-behind journal
+        [entry('arrays', True, 60)] + [entry('loops', True, m) for m in range(12)],
+    ]
+    for batch in batches:
+        apply_attempts(batch)
+        db.session.commit()
+
+    summary = DashboardSummaryService(user.id, EXAM).read()
+    pointers = summary['category_counts']['pointers']
+    assert (pointers['attempted'], pointers['correct']) == (2, 1)
+    assert len(summary['recent_attempts']) == RECENT_ATTEMPTS
+    assert summary['recent_attempts'][0]['category'] == 'loops'
+    assert summary['current_streak'] >= 1  # two days if the test straddles midnight UTC
+
+    assert DashboardSummaryService(user.id, EXAM).rebuild() is False
+
+
+def test_legacy_rows_are_summarized_on_first_read(db, user, add_attempt):
+    add_attempt(user.id, category='arrays')
+    db.session.add(UserExamStats(user_id=user.id, exam_id=EXAM, current_streak=0, longest_streak=0))
+    db.session.commit()
+
+    summary = DashboardSummaryService(user.id, EXAM).read()
+    assert summary['category_counts']['arrays']['attempted'] == 1
+    assert summary['current_streak'] == 1
+
+
+def test_missing_row_is_upserted_on_first_read(db, user, add_attempt):
+    add_attempt(user.id, category='arrays', correct=False)
+    db.session.commit()
+
+    summary = DashboardSummaryService(user.id, EXAM).read()
+    assert summary['category_counts']['arrays'] == {
+        'attempted': 1, 'correct': 0, 'last_practiced': summary['recent_attempts'][0]['timestamp'].isoformat(),
+    }
+    stats = UserExamStats.query.filter_by(user_id=user.id, exam_id=EXAM).one()
+    assert (stats.total_attempted, stats.current_streak, stats.longest_streak) == (1, 1, 1)
+
+
+def test_dashboard_reads_only_the_summary_row(logged_in, db):
+    client = logged_in
+    client.post('/practice/submit', json={'question_id': 'div_001', 'answer': 'A'})
+    client.get('/progress/dashboard')
+
+    statements = []
+
+    def record(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        resp = client.get('/progress/dashboard')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert resp.status_code == 200
+    assert b'1 korrekte ud af 1' in resp.data
+    assert len(statements) == 1
+    assert 'FROM user_exam_stats' in statements[0]
+
+
+def test_rebuild_command_checks_and_repairs(app, db, user, attempt_entry):
+    apply_attempts([attempt_entry(user.id, category='arrays')])
+    db.session.commit()
+    stats = UserExamStats.query.filter_by(user_id=user.id, exam_id=EXAM).one()
+    stats.total_attempted = 7
+    stats.category_progress = json.dumps({})
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['rebuild-summaries', '--check'])
+    assert result.exit_code == 1
+    assert '1 of 1 summaries out of date' in result.output
+    assert UserExamStats.query.filter_by(user_id=user.id).one().total_attempted == 7
+
+    result = runner.invoke(args=['rebuild-summaries'])
+    assert 'Rebuilt 1 summaries (1 were out of date)' in result.output
+    assert runner.invoke(args=['rebuild-summaries', '--check']).exit_code == 0
@@ -74,3 +74,31 @@ def test_get_categories_for_unknown_exam(exams_file, app_ctx):
 def test_get_category_name_falls_back_to_titlecase(exams_file, app_ctx):
     svc = ExamService(exams_file)
     assert svc.get_category_name('c_programming', 'unknown_cat') == 'Unknown Cat'
+
+
+def test_category_lookups_use_the_exam_definitions(exams_file, app_ctx):
+    svc = ExamService(exams_file)
+    assert svc.get_category_name('ds', 'k1') == 'K1 Logic'
+    assert svc.get_category_ids_for_exam('c_programming') == ['arrays', 'pointers']
+    assert svc.get_category_ids_for_exam('nope') == []
+
+
+def test_edited_exams_file_is_reloaded(exams_file, app_ctx):
+    svc = ExamService(exams_file, recheck_seconds=0)
+    assert svc.get_exam('new') is None
+
+    data = json.loads(Path(exams_file).read_text())
+    data['exams'].append({'id': 'new', 'name': 'New', 'icon': 'N', 'categories': [{'id': 'x', 'name': 'X'}]})
+    Path(exams_file).write_text(json.dumps(data))
+
+    assert svc.get_exam('new')['name'] == 'New'
+    assert svc.get_category_name('new', 'x') == 'X'
+
+
+def test_broken_exams_file_keeps_the_previous_exams(exams_file, app_ctx):
+    svc = ExamService(exams_file, recheck_seconds=0)
+    assert svc.get_exam('ds') is not None
+
+    Path(exams_file).write_text('{ not json')
+
+    assert svc.get_exam('ds') is not None
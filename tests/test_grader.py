@@ -199,9 +199,9 @@ class TestCodeWritingWithStubbedCompiler:
 
     def test_passes_when_outputs_match(self, grader):
         grader.compiler = MagicMock()
-        grader.compiler.compile_and_run.return_value = {
+        grader.compiler.compile_and_run_many.return_value = [{
             'success': True, 'stdout': 'hello', 'error': None,
-        }
+        }]
         q = {
             'type': 'code_writing',
             'code_template': 'int main(){ /* YOUR CODE HERE */ }',
@@ -213,9 +213,9 @@ class TestCodeWritingWithStubbedCompiler:
 
     def test_fails_on_compile_error(self, grader):
         grader.compiler = MagicMock()
-        grader.compiler.compile_and_run.return_value = {
+        grader.compiler.compile_and_run_many.return_value = [{
             'success': False, 'error': 'gcc: error', 'stdout': '',
-        }
+        }]
         q = {
             'type': 'code_writing',
             'code_template': 'int main(){ /* YOUR CODE HERE */ }',
@@ -223,3 +223,50 @@ class TestCodeWritingWithStubbedCompiler:
         }
         result = grader.grade(q, 'broken;')
         assert result['correct'] is False
+
+    def test_compiles_once_for_all_test_cases(self, grader):
+        grader.compiler = MagicMock()
+        grader.compiler.compile_and_run_many.return_value = [
+            {'success': True, 'stdout': '2'},
+            {'success': True, 'stdout': '4'},
+            {'success': True, 'stdout': '7'},
+        ]
+        q = {
+            'type': 'code_writing',
+            'code_template': 'int main(){ /* YOUR CODE HERE */ }',
+            'test_cases': [
+                {'input': '1', 'expected_output': '2'},
+                {'input': '2', 'expected_output': '4'},
+                {'input': '3', 'expected_output': '6'},
+            ],
+        }
+        result = grader.grade(q, 'double_it();')
+        grader.compiler.compile_and_run_many.assert_called_once_with(
+            'int main(){ double_it(); }', ['1', '2', '3']
+        )
+        assert result['correct'] is False
+        assert [t['passed'] for t in result['test_results']] == [True, True, False]
+
+    def test_busy_runner_is_not_a_wrong_answer(self, grader):
+        grader.compiler = MagicMock()
+        grader.compiler.compile_and_run_many.return_value = [{
+            'success': False, 'stage': 'admission', 'error': 'Compiler busy, retry in 3 s', 'retry_after': 3,
+        }]
+        q = {
+            'type': 'code_writing',
+            'code_template': 'int main(){ /* YOUR CODE HERE */ }',
+            'test_cases': [{'input': '', 'expected_output': 'hello'}],
+        }
+        result = grader.grade(q, 'puts("hello");')
+        assert result['busy'] is True
+        assert result['retry_after'] == 3
+
+    def test_only_compiled_templates_are_prepared(self, grader):
+        grader.compiler = MagicMock()
+        grader.prepare_templates([
+            {'type': 'code_writing', 'code_template': '#include <stdio.h>\nint main(){ /* YOUR CODE HERE */ }'},
+            {'type': 'drag_drop', 'code_template': '#include <string.h>\n{b1}'},
+            {'type': 'multiple_choice'},
+        ])
+        (templates,), _ = grader.compiler.prepare_preludes.call_args
+        assert list(templates) == ['#include <stdio.h>\nint main(){ /* YOUR CODE HERE */ }']
@@ -0,0 +1,43 @@
+"""Tests for PostgreSQL connection settings and schema locking.
+
+The lock test needs a PostgreSQL database: run the suite with
+TEST_DATABASE_URL pointing at one (see conftest.py).
+"""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import text
+
+from config import _database_uri, _engine_options
+from models.migrations import SCHEMA_LOCK_KEY, schema_lock
+
+
+def test_postgres_urls_use_psycopg():
+    assert _database_uri('postgres://app@db/practice') == 'postgresql+psycopg://app@db/practice'
+    assert _database_uri('postgresql://app@db/practice') == 'postgresql+psycopg://app@db/practice'
+    assert _database_uri('postgresql+psycopg://app@db/practice') == 'postgresql+psycopg://app@db/practice'
+    assert _database_uri('sqlite:///practice.db') == 'sqlite:///practice.db'
+
+
+def test_postgres_pools_share_the_connection_budget_between_workers():
+    options = _engine_options('postgresql+psycopg://app@db/practice', 6, 90, 4, 1800)
+    assert options['pool_size'] == 6
+    assert options['pool_size'] + options['max_overflow'] == 22
+    assert options['pool_pre_ping'] is True
+    assert options['pool_recycle'] == 1800
+
+    crowded = _engine_options('postgresql+psycopg://app@db/practice', 6, 90, 30, 1800)
+    assert crowded['pool_size'] == 3
+    assert crowded['max_overflow'] == 0
+
+
+def test_schema_lock_excludes_other_processes(db):
+    if db.engine.dialect.name != 'postgresql':
+        pytest.skip('advisory locks are PostgreSQL-only')
+    with schema_lock(db.engine):
+        with db.engine.connect() as other:
+            assert other.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': SCHEMA_LOCK_KEY}).scalar() is False
+    with db.engine.connect() as other:
+        assert other.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': SCHEMA_LOCK_KEY}).scalar() is True
+        other.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': SCHEMA_LOCK_KEY})
@@ -0,0 +1,88 @@
+"""Tests for practice sessions: attempts are linked to the session they were made in,
+and the run's state is kept server-side with only its id in the cookie."""
+
+from __future__ import annotations
+
+import json
+
+from models import Attempt, PracticeSession
+from routes.practice import practice_store
+from services.practice_store import FilePracticeStore
+
+
+def _start(client, count=3) -> PracticeSession:
+    # A category without code questions, so every answer is graded inline
+    client.post('/practice/start', data={'mode': 'category', 'category': 'control_flow', 'question_count': count})
+    with client.session_transaction() as sess:
+        return PracticeSession.query.filter_by(id=sess['practice_session_id']).one()
+
+
+def test_start_records_the_drawn_questions(logged_in):
+    practice_session = _start(logged_in)
+    state = practice_store.load(practice_session.id)
+    assert json.loads(practice_session.question_ids) == state['question_ids']
+    assert (state['index'], state['answered']) == (0, [])
+    assert practice_session.completed_at is None
+
+
+def test_cookie_only_carries_the_session_id(logged_in):
+    practice_session = _start(logged_in, count=2)
+    with logged_in.session_transaction() as sess:
+        assert sess['practice_session_id'] == practice_session.id
+        assert not {'practice_questions', 'answered_questions', 'question_start_time'} & set(sess.keys())
+
+    question_id = practice_store.load(practice_session.id)['question_ids'][0]
+    logged_in.post('/practice/submit', json={'question_id': question_id, 'answer': 'wrong'})
+    logged_in.get('/practice/next')
+    state = practice_store.load(practice_session.id)
+    assert (state['index'], state['answered']) == (1, [question_id])
+
+
+def test_summary_only_counts_this_sessions_attempts(logged_in):
+    earlier = _start(logged_in, count=1)
+    question_id = json.loads(earlier.question_ids)[0]
+    logged_in.post('/practice/submit', json={'question_id': question_id, 'answer': 'wrong'})
+    logged_in.get('/practice/complete')
+
+    practice_session = _start(logged_in, count=2)
+    question_ids = json.loads(practice_session.question_ids)
+    for question_id in question_ids:
+        logged_in.post('/practice/submit', json={'question_id': question_id, 'answer': 'wrong'})
+    # Answering again replaces the earlier attempt in the summary
+    logged_in.post('/practice/submit', json={'question_id': question_ids[0], 'answer': 'still wrong'})
+
+    assert Attempt.query.filter_by(session_id=practice_session.id).count() == 3
+    resp = logged_in.get('/practice/complete')
+    assert resp.status_code == 200
+    assert resp.data.count(b'still wrong</span>') == 1
+    assert resp.data.count(b'>wrong</span>') == 1
+    assert PracticeSession.query.filter_by(id=practice_session.id).one().completed_at is not None
+    with logged_in.session_transaction() as sess:
+        assert 'practice_session_id' not in sess
+    assert practice_store.load(practice_session.id) is None
+
+
+def test_attempts_outside_the_session_are_not_linked(logged_in):
+    _start(logged_in, count=1)
+    other = 'div_001'  # not a control_flow question
+    logged_in.post('/practice/submit', json={'question_id': other, 'answer': 'A'})
+    assert Attempt.query.filter_by(question_id=other).one().session_id is None
+
+
+def test_another_users_session_id_is_ignored(logged_in):
+    practice_session = _start(logged_in, count=1)
+    state = practice_store.load(practice_session.id)
+    practice_store.save(practice_session.id, {**state, 'user_id': state['user_id'] + 1})
+    assert logged_in.get('/practice/question').status_code == 302
+
+
+def test_file_store_round_trip(tmp_path):
+    store = FilePracticeStore(str(tmp_path))
+    session_id = 'ab' * 16
+    assert store.load(session_id) is None
+    store.save(session_id, {'index': 3})
+    assert store.load(session_id) == {'index': 3}
+    assert store.load('../' + session_id) is None
+    store.delete(session_id)
+    assert store.load(session_id) is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,168 @@
+"""Tests for /practice/submit: inline grading and the background code-grading queue."""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import event
+
+from models import Attempt, GradingJob, Progress, User, UserExamStats
+from routes import practice
+
+
+@pytest.fixture()
+def stub_compiler(monkeypatch):
+    compiler = MagicMock()
+    compiler.compile_and_run_many.return_value = [{'success': True, 'stdout': '6\n5\n'}]
+    monkeypatch.setattr(practice.grader_service, 'compiler', compiler)
+    return compiler
+
+
+def _poll(client, poll_url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        resp = client.get(poll_url)
+        if resp.status_code != 202 or time.monotonic() > deadline:
+            return resp
+        assert resp.headers['Retry-After'] == '1'
+        time.sleep(0.05)
+
+
+def _practice_state(client):
+    with client.session_transaction() as sess:
+        practice_session_id = sess['practice_session_id']
+    return practice_session_id, practice.practice_store.load(practice_session_id)
+
+
+def test_multiple_choice_is_graded_inline(logged_in):
+    resp = logged_in.post('/practice/submit', json={'question_id': 'div_001', 'answer': 'A'})
+    assert resp.status_code == 200
+    assert resp.get_json()['correct'] is True
+    assert Attempt.query.count() == 1
+
+
+def test_submit_records_everything_in_one_commit(logged_in, db):
+    commits = []
+    session = db.session()
+    listener = lambda _session: commits.append(1)  # noqa: E731
+    event.listen(session, 'after_commit', listener)
+    try:
+        logged_in.post('/practice/submit', json={'question_id': 'div_001', 'answer': 'A'})
+        logged_in.post('/practice/submit', json={'question_id': 'div_001', 'answer': 'B'})
+    finally:
+        event.remove(session, 'after_commit', listener)
+
+    assert len(commits) == 2
+    progress = Progress.query.one()
+    assert (progress.total_attempted, progress.total_correct) == (2, 1)
+    assert UserExamStats.query.one().current_streak == 1
+
+
+def test_submit_in_a_practice_session_is_one_commit(logged_in, db):
+    logged_in.post('/practice/start', data={'mode': 'category', 'category': 'control_flow', 'question_count': 1})
+    practice_session_id, state = _practice_state(logged_in)
+    question_id = state['question_ids'][0]
+
+    commits = []
+    session = db.session()
+    listener = lambda _session: commits.append(1)  # noqa: E731
+    event.listen(session, 'after_commit', listener)
+    try:
+        logged_in.post('/practice/submit', json={'question_id': question_id, 'answer': 'A'})
+    finally:
+        event.remove(session, 'after_commit', listener)
+
+    assert len(commits) == 1
+    assert _practice_state(logged_in)[1]['answered'] == [question_id]
+    assert Attempt.query.filter_by(session_id=practice_session_id).count() == 1
+
+
+def test_code_question_is_queued_and_pollable(logged_in, stub_compiler):
+    resp = logged_in.post('/practice/submit', json={'question_id': 'prog_001', 'answer': 'int gcd();'})
+    assert resp.status_code == 202
+    body = resp.get_json()
+    assert body['status'] == 'queued'
+
+    result = _poll(logged_in, body['poll_url'])
+    assert result.status_code == 200
+    payload = result.get_json()
+    assert payload['status'] == 'done'
+    assert payload['correct'] is True
+    assert GradingJob.query.get(body['job_id']).status == 'done'
+    assert Attempt.query.filter_by(question_id='prog_001').count() == 1
+    assert Progress.query.filter_by(category='programming_challenges').one().total_correct == 1
+
+
+def test_poll_for_someone_elses_job_is_404(logged_in, db, other_user):
+    job = GradingJob(id='f' * 32, user_id=other_user.id, question_id='prog_001')
+    db.session.add(job)
+    db.session.commit()
+    assert logged_in.get(f'/practice/submit/{job.id}').status_code == 404
+
+
+def test_sync_mode_grades_code_inline(logged_in, stub_compiler, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ASYNC_GRADING', False)
+    resp = logged_in.post('/practice/submit', json={'question_id': 'prog_001', 'answer': 'int gcd();'})
+    assert resp.status_code == 200
+    assert resp.get_json()['correct'] is True
+
+
+def test_busy_runner_returns_503_and_records_nothing(logged_in, stub_compiler, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ASYNC_GRADING', False)
+    stub_compiler.compile_and_run_many.return_value = [{
+        'success': False, 'stage': 'admission', 'error': 'Compiler busy, retry in 2 s', 'retry_after': 2,
+    }]
+    resp = logged_in.post('/practice/submit', json={'question_id': 'prog_001', 'answer': 'int gcd();'})
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '2'
+    assert resp.get_json()['status'] == 'busy'
+    assert Attempt.query.count() == 0
+
+
+def test_code_question_counts_as_answered_once_graded(logged_in, stub_compiler, monkeypatch):
+    logged_in.post('/practice/start', data={'mode': 'category', 'category': 'programming_challenges',
+                                            'question_count': 1})
+    _, state = _practice_state(logged_in)
+    question_id = state['question_ids'][0]
+
+    release = threading.Event()
+    grade = practice.grader_service.grade
+    monkeypatch.setattr(practice.grader_service, 'grade', lambda *args: release.wait(5) and grade(*args))
+    body = logged_in.post('/practice/submit', json={'question_id': question_id, 'answer': 'x'}).get_json()
+    assert logged_in.get(body['poll_url']).status_code == 202
+    assert _practice_state(logged_in)[1]['answered'] == []
+
+    release.set()
+    assert _poll(logged_in, body['poll_url']).get_json()['status'] == 'done'
+    assert _practice_state(logged_in)[1]['answered'] == [question_id]
+
+
+def test_unfinished_job_is_reported_failed_once_stale(logged_in, db, app):
+    user = User.query.filter_by(email='student@example.com').one()
+    job = GradingJob(id='a' * 32, user_id=user.id, question_id='prog_001', status='running',
+                     created_at=datetime.utcnow() - timedelta(seconds=app.config['GRADING_JOB_STALE_SECONDS'] + 1))
+    db.session.add(job)
+    db.session.commit()
+    resp = logged_in.get(f'/practice/submit/{job.id}')
+    assert resp.status_code == 500
+    assert resp.get_json()['status'] == 'error'
+    assert db.session.get(GradingJob, job.id).status == 'error'
+
+
+def test_old_finished_jobs_are_pruned_on_submit(logged_in, stub_compiler, db, app, monkeypatch):
+    monkeypatch.setattr(practice, '_grading_jobs_pruned_at', 0.0)
+    user = User.query.filter_by(email='student@example.com').one()
+    old = datetime.utcnow() - timedelta(seconds=app.config['GRADING_JOB_RETENTION_SECONDS'] + 1)
+    db.session.add_all([
+        GradingJob(id='b' * 32, user_id=user.id, question_id='prog_001', status='done', finished_at=old),
+        GradingJob(id='c' * 32, user_id=user.id, question_id='prog_001', status='done',
+                   finished_at=datetime.utcnow()),
+    ])
+    db.session.commit()
+    body = logged_in.post('/practice/submit', json={'question_id': 'prog_001', 'answer': 'x'}).get_json()
+    _poll(logged_in, body['poll_url'])
+    assert {job.id for job in GradingJob.query} == {'c' * 32, body['job_id']}
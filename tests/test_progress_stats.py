@@ -0,0 +1,43 @@
+"""Tests for the SQL aggregates behind /progress/stats."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from models import User
+from routes.progress import category_totals, daily_totals
+
+
+def test_category_totals(db, user, add_attempt):
+    add_attempt(user.id, time_spent=5)
+    add_attempt(user.id, correct=False, time_spent=7)
+    add_attempt(user.id, category='arrays', time_spent=3)
+    add_attempt(user.id, category='arrays', time_spent=3, exam_id='oop_java')
+    db.session.commit()
+
+    assert category_totals(user.id, 'c_programming') == {
+        'pointers': {'correct': 1, 'total': 2, 'time': 12},
+        'arrays': {'correct': 1, 'total': 1, 'time': 3},
+    }
+
+
+def test_daily_totals_only_covers_requested_window(db, user, add_attempt):
+    now = datetime.utcnow()
+    add_attempt(user.id, timestamp=now)
+    add_attempt(user.id, correct=False, timestamp=now)
+    add_attempt(user.id, timestamp=now - timedelta(days=2))
+    add_attempt(user.id, timestamp=now - timedelta(days=30))
+    db.session.commit()
+
+    today = now.date()
+    totals = daily_totals(user.id, 'c_programming', since=today - timedelta(days=13))
+    assert totals == {today: (2, 1), today - timedelta(days=2): (1, 1)}
+
+
+def test_stats_page_renders_aggregates(logged_in, db, add_attempt):
+    student = User.query.filter_by(email='student@example.com').one()
+    add_attempt(student.id, category='fundamentals')
+    db.session.commit()
+
+    resp = logged_in.get('/progress/stats')
+    assert resp.status_code == 200
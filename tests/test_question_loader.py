@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import json
+import os
 from pathlib import Path
 
 import pytest
@@ -105,6 +106,18 @@ class TestLoading:
         assert q is not None
         assert q['id'] == 'q2'
 
+    def test_id_index_covers_every_category(self, loader):
+        assert loader.get_question_by_id('q1', exam_id='ds_exam')['id'] == 'q1'
+        assert loader.get_question_category('q2', exam_id='ds_exam') == 'arrays'
+        assert loader.get_question_by_id('missing', exam_id='ds_exam') is None
+        assert loader.get_question_category('missing', exam_id='ds_exam') is None
+
+    def test_reload_rebuilds_id_index(self, loader, questions_root: Path):
+        assert loader.get_question_by_id('q1', exam_id='ds_exam') is not None
+        (questions_root / 'ds_exam' / 'arrays.json').write_text(json.dumps({'questions': []}))
+        loader.reload_questions('ds_exam')
+        assert loader.get_question_by_id('q1', exam_id='ds_exam') is None
+
     def test_discover_categories(self, loader):
         cats = loader._discover_categories('ds_exam')
         assert sorted(cats) == ['arrays', 'empty']
@@ -121,6 +134,72 @@ class TestLoading:
         assert loader.load_all_questions(exam_id='ds_exam', categories=['arrays']) == {}
 
 
+class TestCategoryCache:
+    @staticmethod
+    def _rewrite(path: Path, questions: list[dict]) -> None:
+        stat = path.stat()
+        path.write_text(json.dumps({'questions': questions}))
+        # Make the change visible even on filesystems with coarse mtimes
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_repeated_loads_are_served_from_memory(self, loader):
+        loader.load_category('arrays', exam_id='ds_exam')
+        loader.get_random_questions('arrays', count=1, exam_id='ds_exam')
+        loader.get_questions_by_category('arrays', exam_id='ds_exam')
+        stats = loader.stats()
+        assert stats['disk_loads'] == 1
+        assert stats['hits'] == 2
+
+    def test_id_lookups_count_one_hit_each(self, loader, monkeypatch):
+        assert loader.get_question_by_id('q1', exam_id='ds_exam') is not None
+        hits = loader.stats()['hits']
+        checks = []
+        monkeypatch.setattr(loader, '_cached_category', lambda *args, **kwargs: checks.append(args))
+        for _ in range(10):
+            assert loader.get_question_by_id('q1', exam_id='ds_exam') is not None
+        assert loader.stats()['hits'] == hits + 10
+        assert checks == []  # no per-category freshness check between rechecks
+
+    def test_returned_lists_do_not_alias_the_cache(self, loader):
+        loader.load_category('arrays', exam_id='ds_exam').clear()
+        assert len(loader.load_category('arrays', exam_id='ds_exam')) == 2
+
+    def test_edited_file_is_reloaded(self, questions_root: Path):
+        loader = QuestionLoader(str(questions_root), recheck_seconds=0)
+        assert loader.get_question_by_id('q1', exam_id='ds_exam') is not None
+        self._rewrite(questions_root / 'ds_exam' / 'arrays.json', [])
+        assert loader.load_category('arrays', exam_id='ds_exam') == []
+        assert loader.get_question_by_id('q1', exam_id='ds_exam') is None
+        assert loader.stats()['disk_loads'] == 3  # arrays twice, empty once
+
+
+class TestBundle:
+    def test_bundle_is_loaded_instead_of_json(self, loader, questions_root: Path, tmp_path: Path):
+        bundle_dir = tmp_path / 'bundles'
+        assert loader.write_bundle(str(bundle_dir / 'ds_exam.pickle'), exam_id='ds_exam') == 2
+
+        bundled = QuestionLoader(str(questions_root), bundle_dir=str(bundle_dir))
+        assert bundled.get_question_by_id('q2', exam_id='ds_exam')['id'] == 'q2'
+        assert bundled.stats()['bundle_loads'] == 2
+        assert bundled.stats()['disk_loads'] == 0
+
+    def test_stale_bundle_falls_back_to_json(self, loader, questions_root: Path, tmp_path: Path):
+        bundle_dir = tmp_path / 'bundles'
+        loader.write_bundle(str(bundle_dir / 'ds_exam.pickle'), exam_id='ds_exam')
+        TestCategoryCache._rewrite(questions_root / 'ds_exam' / 'arrays.json', [])
+
+        bundled = QuestionLoader(str(questions_root), bundle_dir=str(bundle_dir))
+        assert bundled.load_category('arrays', exam_id='ds_exam') == []
+        assert bundled.load_category('empty', exam_id='ds_exam') == []
+        assert bundled.stats()['disk_loads'] == 1
+        assert bundled.stats()['bundle_loads'] == 1
+
+    def test_missing_bundle_reads_json(self, questions_root: Path, tmp_path: Path):
+        bundled = QuestionLoader(str(questions_root), bundle_dir=str(tmp_path / 'nowhere'))
+        assert len(bundled.load_category('arrays', exam_id='ds_exam')) == 2
+        assert bundled.stats()['disk_loads'] == 1
+
+
 class TestOptionsNormalisation:
     def test_list_options_pass_through_unchanged(self, tmp_path: Path):
         exam_dir = tmp_path / 'demo'
@@ -0,0 +1,74 @@
+"""Tests for per-question spaced-repetition reviews and how smart mode uses them."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from models import QuestionReview
+from services.adaptive import AdaptiveLearningService
+from services.reviews import MIN_EASE, ReviewService, next_review
+from services.write_behind import apply_attempts
+
+EXAM = 'c_programming'
+START = datetime(2024, 3, 1, 12, 0)
+
+
+def test_intervals_grow_with_correct_answers_and_reset_on_a_wrong_one():
+    state = None
+    intervals = []
+    for correct in (True, True, True, False, True):
+        state = next_review(state, correct, 0, START)
+        intervals.append(state['interval_days'])
+    assert intervals == [1, 6, 15, 1, 1]
+    assert state['due_at'] == START + timedelta(days=1)
+
+    for _ in range(10):
+        state = next_review(state, False, 0, START)
+    assert state['ease'] == MIN_EASE
+
+
+def test_recorded_attempts_match_a_rebuild(db, user, attempt_entry):
+    apply_attempts([
+        attempt_entry(user.id, question_id='q1', correct=True, at=START),
+        attempt_entry(user.id, question_id='q2', correct=False, at=START),
+    ])
+    db.session.commit()
+    apply_attempts([
+        attempt_entry(user.id, question_id='q1', correct=True, at=START + timedelta(days=1)),
+        attempt_entry(user.id, question_id='q1', correct=True, at=START + timedelta(days=7), hints_used=1),
+    ])
+    db.session.commit()
+
+    def reviews():
+        return {
+            row.question_id: (row.repetitions, row.interval_days, round(row.ease, 6), row.due_at)
+            for row in QuestionReview.query.filter_by(user_id=user.id)
+        }
+
+    recorded = reviews()
+    assert recorded['q1'][:2] == (3, 15)
+    assert recorded['q2'][:2] == (0, 1)
+
+    assert ReviewService(user.id, EXAM).rebuild() == 2
+    db.session.commit()
+    assert reviews() == recorded
+
+
+def test_due_questions_come_first_and_scheduled_ones_last(db, user, attempt_entry):
+    now = datetime.utcnow()
+    apply_attempts([
+        attempt_entry(user.id, question_id='weak_0', correct=False, at=now - timedelta(days=3)),  # due two days ago
+        attempt_entry(user.id, question_id='weak_1', correct=True, at=now),  # due tomorrow
+    ])
+    db.session.commit()
+    reviews = ReviewService(user.id, EXAM)
+    assert reviews.due_question_ids() == ['weak_0']
+    assert reviews.scheduled_question_ids() == {'weak_1'}
+
+    service = AdaptiveLearningService(user.id, exam_id=EXAM)
+    pool = {'weak': [{'id': f'weak_{i}', 'category': 'weak'} for i in range(4)]}
+    for _ in range(20):
+        ids = {q['id'] for q in service.generate_practice_session(pool, session_size=2)}
+        assert 'weak_0' in ids and 'weak_1' not in ids
+    # Not due yet, but better than a short session
+    assert len(service.generate_practice_session(pool, session_size=4)) == 4
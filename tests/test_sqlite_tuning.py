@@ -0,0 +1,33 @@
+"""Tests for the SQLite connection profile."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from config import SQLITE_PROFILES, Config, ConfigError, _engine_options
+from models.sqlite_tuning import apply_sqlite_pragmas
+
+
+def test_production_profile_is_applied_to_every_connection(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "tuned.db"}')
+    apply_sqlite_pragmas(engine, SQLITE_PROFILES['production'])
+
+    for _ in range(2):
+        with engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+            assert conn.execute(text('PRAGMA cache_size')).scalar() == -64 * 1024
+        engine.dispose()
+
+
+def test_engine_options_only_pool_file_databases():
+    assert _engine_options('sqlite:///:memory:', 6, 90, 1, 1800) == {}
+    assert _engine_options('sqlite:////srv/app/practice.db', 6, 90, 1, 1800)['pool_size'] == 6
+
+
+def test_unknown_profile_is_a_config_error(monkeypatch):
+    monkeypatch.setattr(Config, 'SQLITE_PROFILE', 'fast')
+    with pytest.raises(ConfigError, match='SQLITE_PROFILE'):
+        Config.validate()
@@ -0,0 +1,45 @@
+"""Tests for incremental streak tracking and the backfill command."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+from models import UserExamStats
+from services.streaks import StreakService
+
+EXAM = 'c_programming'
+
+
+def test_record_activity_extends_and_resets(db, user):
+    service = StreakService(user.id, EXAM)
+    start = date(2024, 3, 1)
+    for offset in (0, 0, 1, 2, 5, 6):
+        service.record_activity(start + timedelta(days=offset))
+    db.session.commit()
+
+    stats = UserExamStats.query.filter_by(user_id=user.id, exam_id=EXAM).one()
+    assert (stats.current_streak, stats.longest_streak) == (2, 3)
+    assert stats.last_active_day == start + timedelta(days=6)
+    assert service.current_streak(today=start + timedelta(days=6)) == 2
+    assert service.current_streak(today=start + timedelta(days=7)) == 0
+
+
+def test_rebuild_matches_incremental(db, user, add_attempt):
+    today = datetime.utcnow()
+    for days_ago in (10, 9, 8, 1, 0, 0):
+        add_attempt(user.id, timestamp=today - timedelta(days=days_ago))
+    db.session.commit()
+
+    stats = StreakService(user.id, EXAM).rebuild()
+    db.session.commit()
+    assert (stats.current_streak, stats.longest_streak) == (2, 3)
+    assert StreakService(user.id, EXAM).current_streak() == 2
+
+
+def test_backfill_command(app, db, user, add_attempt):
+    add_attempt(user.id, correct=False)
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['backfill-streaks'])
+    assert 'Rebuilt streaks for 1' in result.output
+    assert StreakService(user.id, EXAM).current_streak() == 1
@@ -0,0 +1,62 @@
+"""Tests for the logged-in user cache behind Flask-Login's user loader."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event
+
+import app as app_module
+from models import User
+from services.user_cache import UserCache
+
+
+@pytest.fixture()
+def statements(db):
+    executed = []
+
+    def record(_conn, _cursor, statement, *_args):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_cached_user_is_loaded_without_a_query(db, user, statements):
+    cache = UserCache(ttl_seconds=60)
+    assert cache.get(user.id).name == 'Student'
+    db.session.expunge_all()  # as at the end of a request
+    statements.clear()
+
+    loaded = cache.get(user.id)
+    assert loaded.name == 'Student'
+    assert loaded in db.session
+    assert statements == []
+    assert cache.stats()['hits'] == 1
+
+
+def test_updating_a_user_drops_the_cached_row(db, user):
+    user_id = user.id
+    cache = UserCache(ttl_seconds=60)
+    cache.get(user_id).name = 'Renamed'
+    db.session.commit()
+    db.session.expunge_all()
+
+    assert cache.get(user_id).name == 'Renamed'
+    assert cache.stats()['misses'] == 2
+
+
+def test_expired_entries_are_reloaded(db, user):
+    cache = UserCache(ttl_seconds=0)
+    cache.get(user.id)
+    cache.get(user.id)
+    assert cache.stats()['hits'] == 0
+
+
+def test_logout_drops_the_cached_row(logged_in):
+    user_id = User.query.filter_by(email='student@example.com').one().id
+    app_module.user_cache.get(user_id)
+    assert user_id in app_module.user_cache._entries
+
+    logged_in.get('/auth/logout')
+    assert user_id not in app_module.user_cache._entries
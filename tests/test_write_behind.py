@@ -0,0 +1,119 @@
+"""Tests for write-behind attempt recording and journal replay."""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+
+import pytest
+
+from models import Attempt, Progress, UserExamStats
+from routes import practice
+from services.write_behind import DEAD_LETTER_NAME, AttemptWriter
+
+
+@pytest.fixture()
+def writer(app, tmp_path):
+    writer = AttemptWriter(str(tmp_path / 'journal'), flush_interval=3600)
+    writer.init_app(app)
+    yield writer
+    writer.flush()
+
+
+def _journals(writer):
+    return sorted(os.listdir(writer.journal_dir))
+
+
+def test_buffered_attempts_are_journaled_then_written_in_one_batch(writer, user, attempt_entry):
+    writer.record(attempt_entry(user.id, correct=True))
+    writer.record(attempt_entry(user.id, correct=False))
+    assert Attempt.query.count() == 0
+    assert len(_journals(writer)) == 1
+
+    assert writer.flush() == 2
+    assert Attempt.query.count() == 2
+    progress = Progress.query.one()
+    assert (progress.total_attempted, progress.total_correct) == (2, 1)
+    assert UserExamStats.query.one().current_streak == 1
+    assert _journals(writer) == []
+    assert writer.stats()['batches'] == 1
+
+
+def test_orphaned_journal_is_replayed_once(writer, user, attempt_entry):
+    path = os.path.join(writer.journal_dir, 'dead-worker.jsonl')
+    with open(path, 'w') as f:
+        for journal_id in ('a' * 32, 'b' * 32):
+            f.write(json.dumps(attempt_entry(user.id, journal_id=journal_id)) + '\n')
+        f.write('{"truncated')
+
+    assert writer.recover() == 2
+    assert writer.recover() == 0
+    assert Attempt.query.count() == 2
+    assert not os.path.exists(path)
+
+
+def test_rejected_attempt_is_dead_lettered_without_blocking_the_rest(writer, user, other_user, attempt_entry):
+    writer.record(attempt_entry(user.id))
+    writer.record(attempt_entry(999_999))  # no such user: FK error on PostgreSQL
+    writer.record(attempt_entry(other_user.id, timestamp='not a timestamp'))
+    dead_letter = os.path.join(writer.journal_dir, DEAD_LETTER_NAME)
+
+    for _ in range(writer.max_failures - 1):
+        writer.sync_user(user.id)
+        assert not os.path.exists(dead_letter)
+    writer.flush()
+
+    with open(dead_letter) as f:
+        rejected = [json.loads(line)['entry'] for line in f]
+    assert 'not a timestamp' in [entry['timestamp'] for entry in rejected]
+    assert writer.stats()['buffered'] == 0
+    assert _journals(writer) == [DEAD_LETTER_NAME]
+    assert writer.stats()['dead_lettered'] == len(rejected)
+    assert Attempt.query.count() == 3 - len(rejected)
+
+
+def test_orphaned_journal_already_removed_by_another_worker(writer, user, monkeypatch, attempt_entry):
+    path = os.path.join(writer.journal_dir, 'dead-worker.jsonl')
+    with open(path, 'w') as f:
+        f.write(json.dumps(attempt_entry(user.id, journal_id='a' * 32)) + '\n')
+    apply = writer._apply
+
+    def replayed_elsewhere_too(entries):
+        written = apply(entries)
+        os.remove(path)
+        return written
+
+    monkeypatch.setattr(writer, '_apply', replayed_elsewhere_too)
+    assert writer.recover() == 1
+
+
+def test_sync_user_reads_live_journals_of_other_workers(writer, user, other_user, attempt_entry):
+    path = os.path.join(writer.journal_dir, 'live-worker.jsonl')
+    with open(path, 'w') as f:
+        f.write(json.dumps(attempt_entry(user.id, journal_id='a' * 32)) + '\n')
+        f.write(json.dumps(attempt_entry(other_user.id, journal_id='b' * 32)) + '\n')
+    owner = os.open(path, os.O_RDWR)
+    fcntl.flock(owner, fcntl.LOCK_EX)
+    try:
+        writer.sync_user(user.id)
+        assert [a.user_id for a in Attempt.query.all()] == [user.id]
+        assert os.path.exists(path)
+    finally:
+        os.close(owner)
+
+    # Once the owner is gone, the rest is replayed without duplicating the first
+    assert writer.recover() == 1
+    assert Attempt.query.count() == 2
+
+
+def test_submit_in_write_behind_mode_is_visible_on_the_dashboard(logged_in, writer, monkeypatch):
+    monkeypatch.setattr(practice, 'attempt_writer', writer)
+    client = logged_in
+
+    resp = client.post('/practice/submit', json={'question_id': 'div_001', 'answer': 'A'})
+    assert resp.get_json()['correct'] is True
+    assert Attempt.query.count() == 0
+
+    assert client.get('/progress/dashboard').status_code == 200
+    assert Attempt.query.count() == 1